@@ -1,94 +1,26 @@
-import time
-from selenium import webdriver
-from selenium.webdriver.firefox.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+import os
+import sys
 from collections import defaultdict, Counter
 import re
 from difflib import SequenceMatcher
 
+# Módulos compartidos de los scrapers (src/backend/src/scripts/scrapers/common)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..',
+                                                'src', 'backend', 'src', 'scripts', 'scrapers')))
+from common.vtex_facets import extract_product_types
+from common.category_tree import category_url_for
+
 def extract_product_types_from_category(category_url):
     """
     Extrae todos los tipos de producto de cualquier categoría de Carrefour.
     Retorna una lista de tipos de producto limpios.
-    """
-    # Configurar opciones de Firefox
-    options = Options()
-    options.headless = False  # Cambiar a True para headless si es necesario
-
-    # Inicializar el driver
-    driver = webdriver.Firefox(options=options)
-
-    product_types = []
-
-    try:
-        driver.get(category_url)
-
-        # Esperar a que la página cargue completamente
-        WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "valtech-carrefourar-search-result-3-x-filter__container--tipo-de-producto"))
-        )
-
-        # Verificar si el contenedor existe
-        containers = driver.find_elements(By.CLASS_NAME, "valtech-carrefourar-search-result-3-x-filter__container--tipo-de-producto")
-        if not containers:
-            print("No se encontró el contenedor de tipos de producto.")
-            return []
-
-        container = containers[0]
-        print("Contenedor encontrado.")
-
-        # Intentar cerrar cualquier modal o popup que pueda obstruir
-        try:
-            modal_close = driver.find_element(By.CLASS_NAME, "dy-modal-close")
-            modal_close.click()
-            time.sleep(1)
-            print("Modal cerrado.")
-        except:
-            pass
-
-        # Hacer clic en el título del filtro para expandirlo
-        try:
-            filter_title = container.find_element(By.XPATH, ".//span[contains(text(), 'Tipo de producto')]")
-            driver.execute_script("arguments[0].click();", filter_title)
-            print("Filtro expandido.")
-            time.sleep(3)
-        except Exception as e:
-            print(f"No se pudo expandir el filtro: {e}")
-            try:
-                driver.execute_script("arguments[0].click();", container)
-                time.sleep(3)
-                print("Filtro expandido haciendo clic en el contenedor.")
-            except Exception as e2:
-                print(f"No se pudo expandir el filtro con JS: {e2}")
-
-        # Buscar y hacer clic en el botón "Ver más" para expandir completamente el filtro
-        try:
-            see_more_button = container.find_element(By.CLASS_NAME, "valtech-carrefourar-search-result-3-x-seeMoreButton")
-            driver.execute_script("arguments[0].click();", see_more_button)
-            print("Botón 'Ver más' activado.")
-            time.sleep(3)
-        except Exception as e:
-            print(f"No se encontró el botón 'Ver más' o no se pudo activar: {e}")
-
-        # Encontrar todos los labels dentro del contenedor
-        labels = container.find_elements(By.CLASS_NAME, "vtex-checkbox__label")
-
-        # Extraer los tipos de producto
-        for label in labels:
-            text = label.text
-            # Remover el número entre paréntesis usando regex
-            clean_text = re.sub(r'\s*\(\d+\)$', '', text).strip()
-            if clean_text:
-                product_types.append(clean_text)
-
-    except Exception as e:
-        print(f"Error durante la extracción: {e}")
-
-    finally:
-        driver.quit()
 
+    Los valores y cantidades del filtro "Tipo de producto" salen de la API de
+    facets de VTEX (common/vtex_facets.py); el navegador solo se usa si la API
+    cambia de formato.
+    """
+    product_types = extract_product_types(category_url)
+    print(f"{len(product_types)} tipos de producto encontrados.")
     return product_types
 
 def analyze_category_context(category_url):
@@ -2475,7 +2407,7 @@ def split_large_clusters(clusters):
 
 if __name__ == "__main__":
     # Sistema de aprendizaje para categoría Limpieza
-    category_url = "https://www.carrefour.com.ar/Limpieza"
+    category_url = category_url_for("carrefour", "Limpieza")
 
     # Inicializar sistema de aprendizaje
     learning_system = SubcategoryLearningSystem()
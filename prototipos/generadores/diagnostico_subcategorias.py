@@ -1,82 +1,26 @@
-import time
-from selenium import webdriver
-from selenium.webdriver.firefox.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import re
+import os
+import sys
+
+# Módulos compartidos de los scrapers (src/backend/src/scripts/scrapers/common)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..',
+                                                'src', 'backend', 'src', 'scripts', 'scrapers')))
+from common.vtex_facets import PRODUCT_TYPE_FACET, extract_facet_values
+from common.category_tree import category_url_for
 
 def extract_and_analyze_product_types(category_url):
     """
     Extrae y analiza todos los tipos de producto de la categoría Limpieza de Carrefour.
     Muestra estadísticas detalladas para diagnosticar por qué no se clasifican ciertas subcategorías.
+
+    Usa la API de facets de VTEX (common/vtex_facets.py), con el navegador como respaldo.
     """
-    # Configurar opciones de Firefox
-    options = Options()
-    options.headless = False
-
-    driver = webdriver.Firefox(options=options)
-    product_types = []
-
-    try:
-        driver.get(category_url)
-
-        # Esperar a que la página cargue
-        WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "valtech-carrefourar-search-result-3-x-filter__container--tipo-de-producto"))
-        )
-
-        # Expandir filtro
-        containers = driver.find_elements(By.CLASS_NAME, "valtech-carrefourar-search-result-3-x-filter__container--tipo-de-producto")
-        if not containers:
-            print("❌ No se encontró contenedor de tipos de producto")
-            return []
-
-        container = containers[0]
-
-        # Cerrar modal si existe
-        try:
-            modal_close = driver.find_element(By.CLASS_NAME, "dy-modal-close")
-            modal_close.click()
-            time.sleep(1)
-        except:
-            pass
-
-        # Expandir filtro
-        try:
-            filter_title = container.find_element(By.XPATH, ".//span[contains(text(), 'Tipo de producto')]")
-            driver.execute_script("arguments[0].click();", filter_title)
-            time.sleep(3)
-        except:
-            try:
-                driver.execute_script("arguments[0].click();", container)
-                time.sleep(3)
-            except:
-                pass
-
-        # Ver más si existe
-        try:
-            see_more_button = container.find_element(By.CLASS_NAME, "valtech-carrefourar-search-result-3-x-seeMoreButton")
-            driver.execute_script("arguments[0].click();", see_more_button)
-            time.sleep(3)
-        except:
-            pass
-
-        # Extraer productos
-        labels = container.find_elements(By.CLASS_NAME, "vtex-checkbox__label")
-
-        for label in labels:
-            text = label.text
-            clean_text = re.sub(r'\s*\(\d+\)$', '', text).strip()
-            if clean_text:
-                product_types.append(clean_text)
-
-    except Exception as e:
-        print(f"❌ Error: {e}")
-    finally:
-        driver.quit()
-
-    return product_types
+    result = extract_facet_values([category_url], PRODUCT_TYPE_FACET)[category_url]
+    if result["error"] and not result["values"]:
+        print(f"❌ Error: {result['error']}")
+        return []
+
+    print(f"✅ {len(result['values'])} tipos de producto vía {result['source']} en {result['elapsedMs']:.0f} ms")
+    return [value["name"] for value in result["values"]]
 
 def analyze_missing_subcategories(product_types):
     """
@@ -144,7 +88,7 @@ def analyze_missing_subcategories(product_types):
             print("  ❌ NINGÚN PRODUCTO ENCONTRADO PARA ESTA SUBCATEGORÍA")
 
 # URL de la categoría Limpieza de Carrefour
-limpieza_url = "https://www.carrefour.com.ar/limpieza"
+limpieza_url = category_url_for("carrefour", "limpieza")
 
 print("🚀 Extrayendo productos de la categoría Limpieza de Carrefour...")
 product_types = extract_and_analyze_product_types(limpieza_url)
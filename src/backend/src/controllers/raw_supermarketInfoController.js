@@ -10,6 +10,24 @@ const getSupermarketInfo = () => getSupermarketInfoModel();
 // Obtener el modelo de Dia cuando sea necesario
 const getDiaSupermarketInfo = () => getDiaSupermarketInfoModel();
 
+// Modelos de Supermarket-info de jumbo_raw, vea_raw y disco_raw
+const { getJumboSupermarketInfoModel } = require('../models/product_raw/jumbo_raw/jumboSupermarketInfo');
+const { getVeaSupermarketInfoModel } = require('../models/product_raw/vea_raw/veaSupermarketInfo');
+const { getDiscoSupermarketInfoModel } = require('../models/product_raw/disco_raw/discoSupermarketInfo');
+
+// Modelo por código de supermercado: cada cadena se escribe en su propia base raw
+// (los documentos de dia van a dia_raw, no a la base de carrefour).
+// Los códigos desconocidos se rechazan con 400 en lugar de caer en otra base.
+const supermarketInfoModelsByCode = {
+  carrefour: getSupermarketInfo,
+  dia: getDiaSupermarketInfo,
+  jumbo: getJumboSupermarketInfoModel,
+  vea: getVeaSupermarketInfoModel,
+  disco: getDiscoSupermarketInfoModel
+};
+const getSupermarketInfoByCode = (code) => supermarketInfoModelsByCode[code]();
+const unknownSupermarketCodes = (codes) => codes.filter(code => !supermarketInfoModelsByCode.hasOwnProperty(code));
+
 // ==================== SUPERMARKET INFO CONTROLLERS ====================
 
 // Get all SupermarketInfo entries with filters
@@ -158,6 +176,112 @@ exports.createSupermarketInfos = async (req, res) => {
   }
 };
 
+// Get change-detection validators (fingerprint, ETag, Last-Modified) for several codes
+exports.getSupermarketInfoValidators = async (req, res) => {
+  try {
+    const codes = (req.query.codes || '').split(',').filter(Boolean);
+    console.log('getSupermarketInfoValidators called with codes:', codes);
+
+    const unknownCodes = unknownSupermarketCodes(codes);
+    if (unknownCodes.length) {
+      return res.status(400).json({ error: `Unknown supermarket codes: ${unknownCodes.join(', ')}` });
+    }
+
+    const validators = {};
+    for (const code of codes) {
+      const doc = await getSupermarketInfoByCode(code).findOne(
+        { code },
+        { contentFingerprint: 1, homepageEtag: 1, homepageLastModified: 1, lastHomepageScraped: 1 }
+      ).lean();
+      if (doc) {
+        const { _id, ...fields } = doc;
+        validators[code] = fields;
+      }
+    }
+
+    res.json({ validators });
+  } catch (error) {
+    console.error('Error in getSupermarketInfoValidators:', error);
+    res.status(500).json({ error: error.message });
+  }
+};
+
+// Upsert multiple SupermarketInfo entries by code in a single request.
+// Documents whose contentFingerprint matches the stored one only get their timestamp touched.
+exports.upsertSupermarketInfos = async (req, res) => {
+  try {
+    const supermarketInfosData = Array.isArray(req.body) ? req.body : req.body.supermarketInfos;
+    console.log('upsertSupermarketInfos called with codes:', (supermarketInfosData || []).map(doc => doc && doc.code));
+
+    if (!Array.isArray(supermarketInfosData)) {
+      return res.status(400).json({ error: 'Body must be an array of supermarket info entries' });
+    }
+    if (supermarketInfosData.some(doc => !doc || !doc.code)) {
+      return res.status(400).json({ error: 'Every supermarket info entry must have a code' });
+    }
+    const unknownCodes = unknownSupermarketCodes([...new Set(supermarketInfosData.map(doc => doc.code))]);
+    if (unknownCodes.length) {
+      return res.status(400).json({ error: `Unknown supermarket codes: ${unknownCodes.join(', ')}` });
+    }
+
+    // Agrupar por código para escribir cada cadena en su propia base
+    const docsByCode = {};
+    supermarketInfosData.forEach(doc => {
+      docsByCode[doc.code] = docsByCode[doc.code] || [];
+      docsByCode[doc.code].push(doc);
+    });
+
+    const results = [];
+    const counts = { created: 0, updated: 0, unchanged: 0 };
+
+    // Campos que se actualizan aunque el contenido no haya cambiado
+    const touchFields = ['lastHomepageScraped', 'homepageEtag', 'homepageLastModified'];
+
+    for (const [code, docs] of Object.entries(docsByCode)) {
+      const model = getSupermarketInfoByCode(code);
+      const existing = await model.findOne({ code }, { contentFingerprint: 1 }).lean();
+
+      const operations = docs.map(doc => {
+        const { _id, createdAt, updatedAt, ...fields } = doc;
+
+        // Mismo fingerprint: solo se actualiza el timestamp (y los validadores HTTP)
+        if (existing && fields.contentFingerprint && existing.contentFingerprint === fields.contentFingerprint) {
+          const touch = {};
+          touchFields.forEach(field => {
+            if (fields[field] !== undefined) touch[field] = fields[field];
+          });
+          return {
+            status: 'unchanged',
+            operation: Object.keys(touch).length ? { updateOne: { filter: { code }, update: { $set: touch } } } : null
+          };
+        }
+
+        return {
+          status: null,
+          operation: { updateOne: { filter: { code }, update: { $set: fields }, upsert: true } }
+        };
+      });
+
+      const writes = operations.filter(op => op.operation);
+      const result = writes.length
+        ? await model.bulkWrite(writes.map(op => op.operation), { ordered: false })
+        : {};
+      const upsertedIndexes = new Set(Object.keys(result.upsertedIds || {}).map(Number));
+
+      operations.forEach(op => {
+        const status = op.status || (upsertedIndexes.has(writes.indexOf(op)) ? 'created' : 'updated');
+        counts[status] += 1;
+        results.push({ code, status });
+      });
+    }
+
+    res.json({ results, counts });
+  } catch (error) {
+    console.error('Error in upsertSupermarketInfos:', error);
+    res.status(500).json({ error: error.message });
+  }
+};
+
 // Update SupermarketInfo
 exports.updateSupermarketInfo = async (req, res) => {
   try {
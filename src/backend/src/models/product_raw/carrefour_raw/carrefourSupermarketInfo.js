@@ -91,7 +91,10 @@ const supermarketSchema = new mongoose.Schema({
   // Estados y timestamps
   active: { type: Boolean, default: true },
   lastScraped: { type: Date }, // Último scraping de productos
-  lastHomepageScraped: { type: Date } // Último scraping de homepage
+  lastHomepageScraped: { type: Date }, // Último scraping de homepage
+  contentFingerprint: { type: String }, // Hash del contenido extraído (detección de cambios)
+  homepageEtag: { type: String }, // ETag de la homepage en el último scraping
+  homepageLastModified: { type: String } // Last-Modified de la homepage en el último scraping
 }, {
   collection: 'supermarket-info', // Nombre de colección explícito para evitar pluralización
   timestamps: true // Habilita createdAt y updatedAt automáticos
@@ -47,6 +47,9 @@ const priceHistorySchema = new mongoose.Schema({
   },
   scrapeSource: String, // URL específica donde se encontró el precio
   scrapeBatchId: String, // ID del batch de scraping
+  // Última vez que se vio este mismo precio (el historial solo agrega filas cuando
+  // cambian price, listPrice, discount o isAvailable; ver common/price_history.py)
+  lastSeenAt: Date,
 
   // Información de stock/disponibilidad
   isAvailable: {
@@ -87,6 +90,7 @@ priceHistorySchema.index({ scrapedAt: -1 });
 priceHistorySchema.index({ 'productData.category': 1, scrapedAt: -1 });
 priceHistorySchema.index({ 'productData.brand': 1, scrapedAt: -1 });
 priceHistorySchema.index({ isOnOffer: 1, scrapedAt: -1 });
+priceHistorySchema.index({ 'productData.sku': 1, scrapedAt: -1 });
 
 // Virtual para calcular cambio porcentual (requiere comparación con precio anterior)
 priceHistorySchema.virtual('priceChangePercent').get(function() {
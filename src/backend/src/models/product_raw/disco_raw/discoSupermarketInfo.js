@@ -1,9 +1,11 @@
 const mongoose = require('mongoose');
 
 const supermarketSchema = new mongoose.Schema({
-  _id: { type: String, required: true }, // Usar string personalizado como ID
+  _id: { type: mongoose.Schema.Types.ObjectId, auto: true }, // ObjectId autogenerado
+  code: { type: String, required: true, unique: true }, // Código único como "disco"
   name: { type: String, required: true },
   logo: { type: String },
+  isoLogo: { type: String }, // Isotipo/logo alternativo
   website: { type: String },
 
   // Información geográfica y regional
@@ -52,15 +54,50 @@ const supermarketSchema = new mongoose.Schema({
     description: { type: String },
     keywords: [{ type: String }],
     ogImage: { type: String },
-    favicon: { type: String }
+    favicon: { type: String },
+    robots: { type: String }, // Meta robots directive
+    storefront: { type: String }, // Storefront framework
+    copyright: { type: String }, // Copyright holder
+    author: { type: String } // Content author
+  },
+
+  // Políticas y términos legales
+  legalInfo: {
+    termsAndConditions: { type: String }, // URL de términos y condiciones
+    privacyPolicy: { type: String }, // URL de política de privacidad
+    consumerDefense: { type: String }, // URL de defensa del consumidor
+    cookiePolicy: { type: String } // URL de política de cookies
+  },
+
+  // Información de Progressive Web App (PWA)
+  pwa: {
+    enabled: { type: Boolean, default: false },
+    manifest: { type: String }, // URL del manifest.json
+    themeColor: { type: String }, // Color del tema (#005BAA)
+    icons: [{
+      src: { type: String },
+      sizes: { type: String },
+      type: { type: String }
+    }]
+  },
+
+  // Información de cookies y consentimiento
+  cookieConsent: {
+    provider: { type: String }, // Proveedor de gestión de cookies (ej: "OneTrust")
+    privacyUrl: { type: String }, // URL de política de privacidad en cookies
+    consentRequired: { type: Boolean, default: true }
   },
 
   // Estados y timestamps
   active: { type: Boolean, default: true },
   lastScraped: { type: Date }, // Último scraping de productos
   lastHomepageScraped: { type: Date }, // Último scraping de homepage
-  createdAt: { type: Date, default: Date.now },
-  updatedAt: { type: Date, default: Date.now }
+  contentFingerprint: { type: String }, // Hash del contenido extraído (detección de cambios)
+  homepageEtag: { type: String }, // ETag de la homepage en el último scraping
+  homepageLastModified: { type: String } // Last-Modified de la homepage en el último scraping
+}, {
+  collection: 'supermarket-info', // Nombre de colección explícito para evitar pluralización
+  timestamps: true // Habilita createdAt y updatedAt automáticos
 });
 
 // Índices para optimización
@@ -68,10 +105,19 @@ supermarketSchema.index({ active: 1, country: 1 });
 supermarketSchema.index({ platform: 1 });
 supermarketSchema.index({ 'analytics.googleAnalytics': 1 });
 
-// Middleware para actualizar updatedAt
-supermarketSchema.pre('save', function(next) {
-  this.updatedAt = new Date();
-  next();
-});
+// Función para obtener el modelo Supermarket-info en la base disco_raw (evita registro duplicado)
+function getDiscoSupermarketInfoModel() {
+  const discoConnection = global.databaseConnections?.disco;
+  if (!discoConnection) {
+    throw new Error('Database connection for disco not found');
+  }
+
+  try {
+    return discoConnection.model('SupermarketInfo', null, 'supermarket-info');
+  } catch (error) {
+    // Si no existe, crearlo con el nombre de colección explícito
+    return discoConnection.model('SupermarketInfo', supermarketSchema, 'supermarket-info');
+  }
+}
 
-module.exports = mongoose.model('Supermarket-info', supermarketSchema);
\ No newline at end of file
+module.exports = { getDiscoSupermarketInfoModel };
\ No newline at end of file
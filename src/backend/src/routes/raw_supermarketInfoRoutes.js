@@ -8,6 +8,9 @@ router.get('/', (req, res, next) => {
   next();
 }, supermarketInfoController.getSupermarketInfos);
 
+// GET /api/supermarketinfo/validators?codes=a,b - Change-detection validators by code
+router.get('/validators', supermarketInfoController.getSupermarketInfoValidators);
+
 // GET /api/supermarketinfo/:id - Get single SupermarketInfo by ID
 router.get('/:id', supermarketInfoController.getSupermarketInfo);
 
@@ -23,6 +26,9 @@ router.post('/', supermarketInfoController.createSupermarketInfo);
 // POST /api/supermarketinfo/bulk - Bulk create SupermarketInfo entries
 router.post('/bulk', supermarketInfoController.createSupermarketInfos);
 
+// POST /api/supermarketinfo/upsert - Idempotent bulk upsert by code (one request for every chain)
+router.post('/upsert', supermarketInfoController.upsertSupermarketInfos);
+
 // PUT /api/supermarketinfo/:id - Update SupermarketInfo
 router.put('/:id', supermarketInfoController.updateSupermarketInfo);
 
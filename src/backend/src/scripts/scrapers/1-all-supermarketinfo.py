@@ -0,0 +1,75 @@
+import os
+import sys
+import logging
+import argparse
+from dotenv import load_dotenv
+import colorama
+
+# Initialize colorama for colored console output
+colorama.init(autoreset=True)
+
+# Load environment variables from backend directory
+script_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.abspath(os.path.join(script_dir, '..', '..', '..'))
+env_path = os.path.join(backend_dir, '.env')
+load_dotenv(env_path)
+
+sys.path.insert(0, script_dir)
+from common.chains import CHAINS
+from common.supermarket_info import run_all_chains
+from common.snapshot_server import stand_in_urls
+from common.timing import PhaseTimer, DEFAULT_TIMINGS_FILE, DEFAULT_PROMETHEUS_TEXTFILE
+from common.checkpoint import Checkpoint
+
+# Configure logging with better format
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(threadName)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S',
+    handlers=[
+        logging.FileHandler('supermarket_info.log'),
+        logging.StreamHandler()
+    ]
+)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh supermarket info for every chain in one run")
+    parser.add_argument(
+        "--chains",
+        nargs="+",
+        choices=list(CHAINS),
+        default=list(CHAINS),
+        help="Chains to scrape (default: all)"
+    )
+    parser.add_argument("--max-browsers", type=int, default=3, help="Maximum simultaneous Firefox instances")
+    parser.add_argument(
+        "--extraction-mode",
+        choices=["snapshot", "live", "offline", "http"],
+        default="snapshot",
+        help="snapshot: gather the DOM in one execute_script call; live: one WebDriver call per element; "
+             "offline: parse the newest saved outerHTML without a browser; "
+             "http: plain GET + static parse, Selenium only if a required field is missing"
+    )
+    parser.add_argument("--conditional-get", action="store_true",
+                        help="Send the stored ETag/Last-Modified first and skip the browser on 304")
+    parser.add_argument("--skip-unchanged", action="store_true",
+                        help="Do not write when the content fingerprint matches the stored one")
+    parser.add_argument("--stand-in", help="Fetch homepages from a local stand-in (common/snapshot_server.py) at this URL")
+    parser.add_argument("--timings-file", default=DEFAULT_TIMINGS_FILE,
+                        help="JSON lines file for per-phase timing spans (empty string disables it)")
+    parser.add_argument("--prometheus-textfile", default=DEFAULT_PROMETHEUS_TEXTFILE,
+                        help="Also write per-phase timings in Prometheus textfile format to this path")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Ignore the checkpoint of an interrupted run and scrape every chain again")
+    args = parser.parse_args()
+
+    run_all_chains(
+        args.chains,
+        max_browsers=args.max_browsers,
+        extraction_mode=args.extraction_mode,
+        conditional_get=args.conditional_get,
+        skip_unchanged=args.skip_unchanged,
+        homepage_urls=stand_in_urls(args.stand_in, args.chains) if args.stand_in else None,
+        timer=PhaseTimer(args.timings_file, args.prometheus_textfile),
+        checkpoint=Checkpoint("supermarket_info", interval=1, fresh=args.fresh)
+    )
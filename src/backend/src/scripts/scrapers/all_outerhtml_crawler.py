@@ -0,0 +1,100 @@
+import os
+import sys
+import logging
+import argparse
+import colorama
+from concurrent.futures import ThreadPoolExecutor
+
+# Initialize colorama for colored console output
+colorama.init(autoreset=True)
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+from common.chains import CHAINS
+from common.parallel_crawler import DEFAULT_CRAWLER_TIMINGS_FILE, crawl_all_chains
+from common.frontier import DEFAULT_BUDGET, DEFAULT_MAX_DEPTH, crawl_frontier
+from common.timing import PhaseTimer
+from common.lean_browser import LEAN_ENV
+from common.checkpoint import DEFAULT_INTERVAL, Checkpoint
+from common.page_settle import SETTLE_PROFILES
+from common.snapshot_store import DEFAULT_KEEP
+
+# Configure logging with better format
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(threadName)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S',
+    handlers=[
+        logging.FileHandler('outerhtml_crawler.log'),
+        logging.StreamHandler()
+    ]
+)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extrae el outerHTML de las páginas clave de todas las cadenas en paralelo")
+    parser.add_argument(
+        "--chains",
+        nargs="+",
+        choices=list(CHAINS),
+        default=list(CHAINS),
+        help="Cadenas a crawlear (por defecto todas)"
+    )
+    parser.add_argument("--max-workers", type=int, default=4, help="Navegadores simultáneos (límite global)")
+    parser.add_argument("--per-domain", type=int, default=2, help="Páginas simultáneas por dominio")
+    parser.add_argument("--browser", choices=["edge", "firefox"], default="edge")
+    parser.add_argument(
+        "--settle-timeout",
+        action="append",
+        default=[],
+        metavar="TIPO=SEGUNDOS",
+        help=f"Timeout de asentamiento por tipo de página ({', '.join(SETTLE_PROFILES)}); repetible"
+    )
+    parser.add_argument("--keep-versions", type=int, default=DEFAULT_KEEP,
+                        help="Versiones retenidas por página en el almacén de snapshots")
+    parser.add_argument("--frontier", action="store_true",
+                        help="Descubrir categorías y productos desde la home en lugar de usar las páginas clave")
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET,
+                        help="Con --frontier: páginas a visitar por cadena en esta corrida")
+    parser.add_argument("--max-depth", type=int, default=DEFAULT_MAX_DEPTH,
+                        help="Con --frontier: profundidad máxima de descubrimiento desde la home")
+    parser.add_argument("--lean", action="store_true",
+                        help="Perfil liviano: sin imágenes/fuentes/video y con trackers bloqueados (common/lean_browser.py)")
+    parser.add_argument("--checkpoint-interval", type=int, default=DEFAULT_INTERVAL,
+                        help="Páginas entre escrituras del checkpoint (1 = después de cada página)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Ignorar el checkpoint de una corrida interrumpida y empezar de cero")
+    args = parser.parse_args()
+    if args.lean:
+        os.environ[LEAN_ENV] = "1"
+
+    settle_profiles = {page_type: dict(profile) for page_type, profile in SETTLE_PROFILES.items()}
+    for item in args.settle_timeout:
+        page_type, _, seconds = item.partition('=')
+        settle_profiles.setdefault(page_type, {})["timeout"] = float(seconds)
+
+    if args.frontier:
+        # Un navegador por cadena: la frontera de cada cadena se recorre en orden de prioridad
+        timer = PhaseTimer(DEFAULT_CRAWLER_TIMINGS_FILE, prometheus_path=None)
+        with ThreadPoolExecutor(max_workers=max(1, min(args.max_workers, len(args.chains))),
+                                thread_name_prefix="frontier") as executor:
+            futures = {
+                code: executor.submit(crawl_frontier, code, args.budget, browser=args.browser,
+                                      settle_profiles=settle_profiles, timer=timer, keep=args.keep_versions,
+                                      max_depth=args.max_depth)
+                for code in args.chains
+            }
+        failed = [code for code, future in futures.items() if future.exception() is not None]
+        for code in failed:
+            logging.error(f"Crawling por frontera de {code} falló: {futures[code].exception()}")
+        timer.print_summary()
+        sys.exit(1 if failed else 0)
+
+    crawl_all_chains(
+        args.chains,
+        max_workers=args.max_workers,
+        per_domain=args.per_domain,
+        browser=args.browser,
+        settle_profiles=settle_profiles,
+        keep=args.keep_versions,
+        checkpoint=Checkpoint("outerhtml_crawler", interval=args.checkpoint_interval, fresh=args.fresh)
+    )
@@ -0,0 +1 @@
+"""Shared helpers for the supermarket scrapers and HTML crawlers."""
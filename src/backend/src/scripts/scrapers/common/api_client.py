@@ -0,0 +1,80 @@
+"""
+Pooled REST client for the backend's supermarket-info endpoints.
+
+Uses one persistent requests.Session (keep-alive, bounded connection pool) and
+the idempotent bulk endpoint POST /api/supermarketinfo/upsert, so saving any
+number of chains is a single round trip. Because the upsert is keyed by code,
+retrying a failed request is safe.
+"""
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from common.backend_server import DEFAULT_BASE_URL
+
+
+class SupermarketInfoClient:
+    def __init__(self, base_url=DEFAULT_BASE_URL, timeout=10, pool_size=10, retries=3):
+        self.base_url = base_url.rstrip('/')
+        self.upsert_url = f"{self.base_url}/api/supermarketinfo/upsert"
+        self.validators_url = f"{self.base_url}/api/supermarketinfo/validators"
+        self.timeout = timeout
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=frozenset(["GET", "POST", "PUT"])
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Content-Type': 'application/json'})
+
+    def upsert_many(self, documents):
+        """
+        Create or update several supermarket-info documents by code in one request.
+
+        Args:
+            documents (list): Documents, each with its "code".
+
+        Returns:
+            dict: {"results": [{"code", "status"}], "counts": {"created", "updated", "unchanged"}}
+        """
+        response = self.session.post(self.upsert_url, json=documents, timeout=self.timeout)
+        if response.status_code != 200:
+            raise Exception(f"Upsert failed with status {response.status_code}: {response.text[:200]}")
+
+        result = response.json()
+        logging.info(f"Upserted {len(documents)} supermarket info document(s): {result.get('counts')}")
+        return result
+
+    def get_validators(self, codes):
+        """
+        Stored change-detection validators for several chains in one request.
+
+        Returns:
+            dict: {code: {"contentFingerprint", "homepageEtag", "homepageLastModified", "lastHomepageScraped"}}
+        """
+        response = self.session.get(self.validators_url, params={"codes": ",".join(codes)}, timeout=self.timeout)
+        if response.status_code != 200:
+            raise Exception(f"Validators request failed with status {response.status_code}: {response.text[:200]}")
+        return response.json().get("validators", {})
+
+    def upsert(self, document):
+        """Create or update a single supermarket-info document by code"""
+        return self.upsert_many([document])
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,195 @@
+"""
+Shared lifecycle manager for the Node.js backend used by the scrapers.
+
+Every scraper in a process talks to the same BackendServer (get_backend_server()):
+
+- If something already answers on the health endpoint it is reused and never
+  stopped by us.
+- Otherwise `npm start` is spawned once and readiness is polled with
+  exponential backoff instead of fixed sleeps.
+- start()/stop() are reference counted, so nested or concurrent users share the
+  process and only the last stop() shuts it down. An atexit hook makes sure a
+  server we spawned does not outlive the run.
+"""
+import os
+import sys
+import time
+import atexit
+import shutil
+import signal
+import logging
+import threading
+import subprocess
+
+import requests
+from colorama import Fore, Style
+
+DEFAULT_BASE_URL = os.environ.get("SCRAPER_API_BASE_URL", "http://localhost:5000")
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..'))
+
+
+class BackendServer:
+    def __init__(self, base_url=DEFAULT_BASE_URL, health_path="/api/health", backend_dir=BACKEND_DIR,
+                 startup_timeout=90, initial_delay=0.25, max_delay=3.0):
+        self.base_url = base_url.rstrip('/')
+        self.health_url = f"{self.base_url}{health_path}"
+        self.backend_dir = backend_dir
+        self.startup_timeout = startup_timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+
+        self.process = None
+        self.log_file = None
+        self.users = 0
+        self.lock = threading.RLock()
+
+    def is_ready(self):
+        """Return True if the backend answers its health endpoint"""
+        try:
+            return requests.get(self.health_url, timeout=2).status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+
+    @property
+    def owned(self):
+        """True if the running server was spawned by this manager"""
+        return self.process is not None and self.process.poll() is None
+
+    def wait_until_ready(self):
+        """Poll the health endpoint with exponential backoff until ready or timed out"""
+        deadline = time.time() + self.startup_timeout
+        delay = self.initial_delay
+        attempt = 0
+        while time.time() < deadline:
+            attempt += 1
+            if self.is_ready():
+                logging.info(f"Backend ready after {attempt} health check(s)")
+                return True
+            if self.process is not None and self.process.poll() is not None:
+                logging.error(f"Backend process exited with code {self.process.returncode} during startup")
+                return False
+            time.sleep(min(delay, max(0.0, deadline - time.time())))
+            delay = min(delay * 2, self.max_delay)
+        return False
+
+    def _spawn(self):
+        npm = shutil.which('npm')
+        if not npm:
+            raise Exception("npm executable not found in PATH")
+
+        log_path = os.path.join(self.backend_dir, 'backend_server.log')
+        self.log_file = open(log_path, 'ab')
+        popen_kwargs = {}
+        if sys.platform == 'win32':
+            popen_kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            popen_kwargs["start_new_session"] = True
+
+        # Output goes to a file: an unread PIPE blocks the server once its buffer fills
+        self.process = subprocess.Popen(
+            [npm, 'start'],
+            cwd=self.backend_dir,
+            stdout=self.log_file,
+            stderr=subprocess.STDOUT,
+            **popen_kwargs
+        )
+        logging.info(f"Spawned backend (pid {self.process.pid}), output in {log_path}")
+
+    def start(self):
+        """Make sure a backend is available and register one more user of it"""
+        with self.lock:
+            if self.ensure_running():
+                self.users += 1
+                return True
+            return False
+
+    def ensure_running(self):
+        """Reuse a running backend or spawn one; restart ours if it died"""
+        with self.lock:
+            if self.is_ready():
+                if not self.owned:
+                    logging.info(f"Reusing backend already running at {self.base_url}")
+                return True
+
+            if self.process is not None:
+                logging.warning("Backend stopped responding, restarting it")
+                self._terminate()
+
+            print(f"{Fore.CYAN}Starting backend server...{Style.RESET_ALL}")
+            logging.info(f"Starting backend server in {self.backend_dir}")
+            try:
+                self._spawn()
+            except Exception as e:
+                print(f"{Fore.RED}Error starting server: {e}{Style.RESET_ALL}")
+                logging.error(f"Error starting server: {e}")
+                return False
+
+            if self.wait_until_ready():
+                print(f"{Fore.GREEN}Server is ready!{Style.RESET_ALL}")
+                logging.info("Server started successfully")
+                return True
+
+            print(f"{Fore.RED}Server failed to start properly{Style.RESET_ALL}")
+            logging.error("Server failed to start")
+            self._terminate()
+            return False
+
+    def stop(self):
+        """Release one user; the last one shuts down a server we spawned"""
+        with self.lock:
+            self.users = max(0, self.users - 1)
+            if self.users == 0 and self.process is not None:
+                print(f"{Fore.CYAN}Stopping backend server...{Style.RESET_ALL}")
+                logging.info("Stopping backend server")
+                self._terminate()
+                print(f"{Fore.GREEN}Server stopped{Style.RESET_ALL}")
+                logging.info("Server stopped successfully")
+
+    def _terminate(self):
+        """Stop the whole process tree (npm -> node) we spawned"""
+        process, self.process = self.process, None
+        try:
+            if process is not None and process.poll() is None:
+                if sys.platform == 'win32':
+                    subprocess.run(['taskkill', '/T', '/F', '/PID', str(process.pid)],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                else:
+                    os.killpg(process.pid, signal.SIGTERM)
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    # Force kill if graceful shutdown fails
+                    if sys.platform != 'win32':
+                        os.killpg(process.pid, signal.SIGKILL)
+                    process.kill()
+                    process.wait()
+        except Exception as e:
+            print(f"{Fore.RED}Error stopping server: {e}{Style.RESET_ALL}")
+            logging.error(f"Error stopping server: {e}")
+        finally:
+            if self.log_file:
+                self.log_file.close()
+                self.log_file = None
+
+    def __enter__(self):
+        if not self.start():
+            raise Exception("Failed to start backend server")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+_shared_server = None
+_shared_lock = threading.Lock()
+
+
+def get_backend_server():
+    """Process-wide BackendServer shared by every scraper"""
+    global _shared_server
+    with _shared_lock:
+        if _shared_server is None:
+            _shared_server = BackendServer()
+            atexit.register(_shared_server._terminate)
+        return _shared_server
@@ -0,0 +1,435 @@
+"""
+Warm browser pool shared by every scraper script.
+
+Starting Firefox/Edge costs seconds per script and we run dozens of scripts a
+day. This module runs a small local daemon that keeps N headless sessions
+warm and lends them out:
+
+    python common/browser_pool.py --firefox 3 --edge 2       # start the daemon
+    set BROWSER_POOL_URL=http://127.0.0.1:4455                # in the scrapers' env
+
+Scrapers call create_driver("firefox" | "edge", options). With BROWSER_POOL_URL
+set it leases a session and attaches to it through webdriver.Remote; quit() on
+that driver returns the session to the pool instead of closing the browser.
+Without the variable (or if the daemon is down) it cold-starts a local browser
+exactly as before, so every script still runs standalone.
+
+Pooled sessions use the pool's own headless profile (build_browser_options),
+not the options passed by the caller.
+
+The daemon health-checks idle sessions, resets them between leases (cookies,
+about:blank), recycles a session after max_pages page loads or max_age
+seconds, and reclaims leases whose client died without releasing them.
+
+HTTP API (JSON):
+    POST /lease    {"browser", "timeout"} -> {"leaseId", "browser", "executor", "sessionId", "capabilities"}
+    POST /release  {"leaseId", "pages"}
+    GET  /status
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+from selenium import webdriver
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_POOL_PORT = 4455
+POOL_URL_ENV = "BROWSER_POOL_URL"
+
+EDGE_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+)
+
+
+def build_browser_options(browser, lean=None):
+    """
+    Headless options used for pooled sessions and local cold starts.
+
+    Flags are per browser: Firefox only gets --headless (it ignores Chromium
+    switches); Edge also gets the Chromium sandbox/shared-memory switches for
+    containers, the automation-flag override and a desktop Chrome user agent.
+
+    With lean (default: the SCRAPER_LEAN_BROWSER env var) images, fonts and media are
+    disabled and requests go through the filtering proxy (see common/lean_browser.py).
+    """
+    if browser == "firefox":
+        from selenium.webdriver.firefox.options import Options
+        options = Options()
+        options.add_argument("--headless")
+    elif browser == "edge":
+        from selenium.webdriver.edge.options import Options
+        options = Options()
+        options.add_argument("--headless")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--disable-blink-features=AutomationControlled")
+        options.add_argument(f"--user-agent={EDGE_USER_AGENT}")
+    else:
+        raise ValueError(f"Unsupported browser '{browser}' (use 'firefox' or 'edge')")
+
+    from common.lean_browser import apply_lean_profile, lean_enabled
+    if lean if lean is not None else lean_enabled():
+        apply_lean_profile(options, browser)
+    return options
+
+
+def _start_local_browser(browser, options=None):
+    options = options or build_browser_options(browser)
+    if browser == "firefox":
+        return webdriver.Firefox(options=options)
+    if browser == "edge":
+        return webdriver.Edge(options=options)
+    raise ValueError(f"Unsupported browser '{browser}' (use 'firefox' or 'edge')")
+
+
+class PooledSession:
+    def __init__(self, browser):
+        self.browser = browser
+        self.driver = _start_local_browser(browser)
+        self.created = time.time()
+        self.pages = 0
+        self.lease_id = None
+        self.leased_at = None
+
+    @property
+    def executor(self):
+        return self.driver.service.service_url
+
+    def is_healthy(self):
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def reset(self):
+        """Leave the session clean for the next lease"""
+        self.driver.delete_all_cookies()
+        self.driver.get("about:blank")
+
+    def close(self):
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logging.warning(f"Error closing pooled {self.browser} session: {e}")
+
+
+class BrowserPool:
+    def __init__(self, browser, size=3, max_pages=200, max_age=3600, lease_ttl=900):
+        self.browser = browser
+        self.size = size
+        self.max_pages = max_pages
+        self.max_age = max_age
+        self.lease_ttl = lease_ttl
+
+        self.idle = []
+        self.leased = {}
+        self.recycled = 0
+        self.condition = threading.Condition()
+
+    def start(self):
+        """Start every session in parallel"""
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            sessions = list(executor.map(lambda _: PooledSession(self.browser), range(self.size)))
+        with self.condition:
+            self.idle.extend(sessions)
+            self.condition.notify_all()
+        logging.info(f"{self.browser} pool ready with {self.size} warm session(s)")
+
+    def _replace(self, session, reason):
+        """Close a session and start a fresh one in its place (outside the lock)"""
+        logging.info(f"Recycling {self.browser} session after {session.pages} page(s): {reason}")
+        session.close()
+        try:
+            fresh = PooledSession(self.browser)
+        except Exception as e:
+            logging.error(f"Could not start a replacement {self.browser} session: {e}")
+            return
+        with self.condition:
+            self.recycled += 1
+            self.idle.append(fresh)
+            self.condition.notify()
+
+    def _needs_recycle(self, session):
+        if session.pages >= self.max_pages:
+            return f"{session.pages} pages"
+        if time.time() - session.created >= self.max_age:
+            return "max age reached"
+        return None
+
+    def lease(self, timeout=60):
+        """
+        Lend an idle, healthy session.
+
+        Returns:
+            PooledSession, or None if none became available within timeout.
+        """
+        deadline = time.time() + timeout
+        while True:
+            with self.condition:
+                while not self.idle:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return None
+                    self.condition.wait(remaining)
+                session = self.idle.pop()
+
+            if session.is_healthy():
+                session.lease_id = uuid.uuid4().hex
+                session.leased_at = time.time()
+                with self.condition:
+                    self.leased[session.lease_id] = session
+                return session
+            self._replace(session, "failed health check")
+
+    def release(self, lease_id, pages=0):
+        """Take a session back, resetting or recycling it"""
+        with self.condition:
+            session = self.leased.pop(lease_id, None)
+        if session is None:
+            return False
+
+        session.pages += pages
+        session.lease_id = session.leased_at = None
+        reason = self._needs_recycle(session)
+        if not reason:
+            try:
+                session.reset()
+            except Exception as e:
+                reason = f"reset failed: {e}"
+        if reason:
+            self._replace(session, reason)
+        else:
+            with self.condition:
+                self.idle.append(session)
+                self.condition.notify()
+        return True
+
+    def maintain(self):
+        """Health-check idle sessions and reclaim expired leases"""
+        with self.condition:
+            expired = [lease_id for lease_id, s in self.leased.items() if time.time() - s.leased_at > self.lease_ttl]
+            idle, self.idle = self.idle, []
+
+        for lease_id in expired:
+            logging.warning(f"Reclaiming {self.browser} lease {lease_id} (not released within {self.lease_ttl}s)")
+            self.release(lease_id)
+
+        for session in idle:
+            reason = self._needs_recycle(session) or (None if session.is_healthy() else "failed health check")
+            if reason:
+                self._replace(session, reason)
+            else:
+                with self.condition:
+                    self.idle.append(session)
+                    self.condition.notify()
+
+    def status(self):
+        with self.condition:
+            return {
+                "browser": self.browser,
+                "size": self.size,
+                "idle": len(self.idle),
+                "leased": len(self.leased),
+                "recycled": self.recycled,
+                "pages": sum(s.pages for s in self.idle + list(self.leased.values())),
+            }
+
+    def shutdown(self):
+        with self.condition:
+            sessions = self.idle + list(self.leased.values())
+            self.idle, self.leased = [], {}
+        for session in sessions:
+            session.close()
+
+
+class BrowserPoolRequestHandler(BaseHTTPRequestHandler):
+    # Set by make_pool_server(): {browser: BrowserPool}
+    pools = {}
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/status':
+            self._reply(200, {browser: pool.status() for browser, pool in self.pools.items()})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        try:
+            payload = self._read_json()
+        except ValueError:
+            self._reply(400, {"error": "invalid JSON"})
+            return
+
+        if self.path.rstrip('/') == '/lease':
+            pool = self.pools.get(payload.get("browser", "firefox"))
+            if pool is None:
+                self._reply(404, {"error": f"no pool for browser '{payload.get('browser')}'"})
+                return
+            session = pool.lease(timeout=float(payload.get("timeout", 60)))
+            if session is None:
+                self._reply(503, {"error": "no session available"})
+                return
+            self._reply(200, {
+                "leaseId": session.lease_id,
+                "browser": session.browser,
+                "executor": session.executor,
+                "sessionId": session.driver.session_id,
+                "capabilities": session.driver.capabilities,
+            })
+        elif self.path.rstrip('/') == '/release':
+            released = any(pool.release(payload.get("leaseId"), int(payload.get("pages", 0)))
+                           for pool in self.pools.values())
+            self._reply(200 if released else 404, {"released": released})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def log_message(self, format, *args):
+        logging.debug(f"browser pool: {format % args}")
+
+
+def make_pool_server(pools, host="127.0.0.1", port=DEFAULT_POOL_PORT):
+    """Build (without starting) the pool daemon's HTTP server for {browser: BrowserPool}"""
+    handler = type('BoundBrowserPoolRequestHandler', (BrowserPoolRequestHandler,), {'pools': pools})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+class LeasedRemote(webdriver.Remote):
+    """webdriver.Remote attached to a pooled session; quit() hands it back to the pool"""
+
+    def __init__(self, lease, pool_url):
+        self.lease = lease
+        self.pool_url = pool_url
+        self.pages = 0
+        super().__init__(command_executor=lease["executor"],
+                         options=build_browser_options(lease["browser"], lean=False))
+
+    def start_session(self, capabilities):
+        # Attach to the warm session instead of creating a new one
+        self.session_id = self.lease["sessionId"]
+        self.caps = self.lease.get("capabilities") or {}
+
+    def get(self, url):
+        self.pages += 1
+        super().get(url)
+
+    def quit(self):
+        try:
+            requests.post(f"{self.pool_url}/release", json={"leaseId": self.lease["leaseId"], "pages": self.pages},
+                          timeout=30)
+            logging.info(f"Returned {self.lease['browser']} session to the pool after {self.pages} page(s)")
+        except requests.exceptions.RequestException as e:
+            logging.warning(f"Could not return session to the browser pool: {e}")
+        finally:
+            self.stop_client()
+            self.command_executor.close()
+
+
+def lease_driver(browser="firefox", pool_url=None, timeout=60):
+    """
+    Lease a warm session from the pool daemon.
+
+    Raises:
+        Exception: If the pool is unreachable or has no free session in time.
+    """
+    pool_url = (pool_url or os.environ[POOL_URL_ENV]).rstrip('/')
+    response = requests.post(f"{pool_url}/lease", json={"browser": browser, "timeout": timeout}, timeout=timeout + 10)
+    if response.status_code != 200:
+        raise Exception(f"Browser pool lease failed with status {response.status_code}: {response.text[:200]}")
+    return LeasedRemote(response.json(), pool_url)
+
+
+def create_driver(browser="firefox", options=None, pool_url=None):
+    """
+    WebDriver for a scraper: a leased warm session when a pool is configured,
+    otherwise a local cold-started browser.
+
+    Args:
+        browser (str): "firefox" or "edge".
+        options: Options for the local fallback (ignored for pooled sessions).
+        pool_url (str): Pool daemon URL (default: $BROWSER_POOL_URL).
+
+    Returns:
+        WebDriver
+    """
+    pool_url = pool_url or os.environ.get(POOL_URL_ENV)
+    if pool_url:
+        try:
+            driver = lease_driver(browser, pool_url)
+            logging.info(f"Leased warm {browser} session from {pool_url}")
+            return driver
+        except Exception as e:
+            logging.warning(f"Browser pool unavailable ({e}), starting a local {browser}")
+    return _start_local_browser(browser, options)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep warm headless browser sessions for the scrapers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_POOL_PORT)
+    parser.add_argument("--firefox", type=int, default=3, help="Warm Firefox sessions")
+    parser.add_argument("--edge", type=int, default=0, help="Warm Edge sessions")
+    parser.add_argument("--max-pages", type=int, default=200, help="Recycle a session after this many page loads")
+    parser.add_argument("--max-age", type=int, default=3600, help="Recycle a session after this many seconds")
+    parser.add_argument("--health-interval", type=int, default=30, help="Seconds between health checks")
+    parser.add_argument("--lean", action="store_true",
+                        help="Warm sessions with the lean profile (no images/fonts/media, trackers blocked)")
+    args = parser.parse_args()
+    if args.lean:
+        from common.lean_browser import LEAN_ENV
+        os.environ[LEAN_ENV] = "1"
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S',
+        handlers=[logging.FileHandler('browser_pool.log'), logging.StreamHandler()]
+    )
+
+    pools = {}
+    for browser, size in (("firefox", args.firefox), ("edge", args.edge)):
+        if size > 0:
+            pools[browser] = BrowserPool(browser, size, args.max_pages, args.max_age)
+            pools[browser].start()
+    if not pools:
+        sys.exit("No sessions requested (use --firefox N and/or --edge N)")
+
+    def maintain_forever():
+        while True:
+            time.sleep(args.health_interval)
+            for pool in pools.values():
+                pool.maintain()
+
+    threading.Thread(target=maintain_forever, name="pool-health", daemon=True).start()
+    server = make_pool_server(pools, args.host, args.port)
+    print(f"Browser pool listening on http://{args.host}:{args.port} ({', '.join(f'{b}: {p.size}' for b, p in pools.items())})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for pool in pools.values():
+            pool.shutdown()
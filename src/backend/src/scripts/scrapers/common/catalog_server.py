@@ -0,0 +1,261 @@
+"""
+Local HTTP stand-in for the VTEX catalog search API.
+
+Serves recorded search results from fixtures/vtex_catalog/<code>/<key>.json
+(see vtex_catalog.record_fixture and vtex_catalog.fixture_key) at
+
+    http://<host>:<port>/<code>/api/catalog_system/pub/products/search/<path>?map=c&_from=0&_to=49
+    http://<host>:<port>/<code>/api/catalog_system/pub/products/search?fq=C:/1/2/&_from=0&_to=49
+
+slicing them by _from/_to and answering the `resources` header like VTEX.
+The facets endpoints (legacy and intelligent search, see vtex_facets.py) are
+answered from the same fixtures: "Tipo de producto" counts the third level of
+each product's category and "Marca" its brand. Subcategory searches are
+answered by filtering the top category's fixture, and fq=C:/<ids>/ filters are
+resolved with the saved category trees (fixtures/vtex_category_tree/<code>.json),
+which are also served by the category/tree/N endpoint with an ETag.
+
+fail_every=N answers 429 to every Nth request to exercise the retry path:
+
+    python common/catalog_server.py --port 8766 --fail-every 5
+    python common/vtex_catalog.py ingest --chains carrefour --stand-in http://localhost:8766
+"""
+import os
+import sys
+import json
+import hashlib
+import logging
+import argparse
+import itertools
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, unquote
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.vtex_catalog import SEARCH_PATH, FIXTURES_DIR, MAX_FROM, fixture_key
+from common.vtex_facets import FACETS_PATH, IS_FACETS_PATH, slugify
+from common.category_tree import TREE_PATH, SNAPSHOT_DIR, CategoryTree
+
+
+def load_fixtures(fixtures_dir=FIXTURES_DIR):
+    """{code: {key: [products]}} from <fixtures_dir>/<code>/<key>.json"""
+    fixtures = {}
+    if not os.path.isdir(fixtures_dir):
+        return fixtures
+    for code in sorted(os.listdir(fixtures_dir)):
+        chain_dir = os.path.join(fixtures_dir, code)
+        if not os.path.isdir(chain_dir):
+            continue
+        for name in sorted(os.listdir(chain_dir)):
+            if name.endswith(".json"):
+                with open(os.path.join(chain_dir, name), encoding='utf-8') as f:
+                    fixtures.setdefault(code, {})[name[:-len(".json")]] = json.load(f)
+    return fixtures
+
+
+def load_trees(snapshot_dir=SNAPSHOT_DIR):
+    """{code: category tree} from <snapshot_dir>/<code>.json"""
+    trees = {}
+    if os.path.isdir(snapshot_dir):
+        for name in sorted(os.listdir(snapshot_dir)):
+            if name.endswith(".json"):
+                with open(os.path.join(snapshot_dir, name), encoding='utf-8') as f:
+                    trees[name[:-len(".json")]] = json.load(f)
+    return trees
+
+
+def prune_tree(tree, depth):
+    """Copy of a category tree down to depth levels (what category/tree/N answers)"""
+    return [dict(node, children=prune_tree(node.get("children") or [], depth - 1) if depth > 1 else [])
+            for node in tree]
+
+
+def fixture_products(fixtures, segments):
+    """Fixture products of a category path: its own fixture, or its top category's filtered by path"""
+    segments = [part for part in segments if part]
+    if not segments:
+        return []
+    products = fixtures.get(fixture_key("/".join(segments)))
+    if products is not None:
+        return products
+    wanted = [slugify(part) for part in segments]
+    return [product for product in fixtures.get(fixture_key(segments[0]), [])
+            if [slugify(part) for part in (product.get("categories") or ["/"])[0].split('/') if part][:len(wanted)]
+            == wanted]
+
+
+def fixture_facets(fixtures, segments):
+    """{"Tipo de producto": Counter, "Marca": Counter} of the fixture products under a category path"""
+    types, brands = Counter(), Counter()
+    for product in fixture_products(fixtures, segments):
+        tree = [part for part in (product.get("categories") or ["/"])[0].split('/') if part]
+        if len(tree) > 2:
+            types[tree[2]] += 1
+        if product.get("brand"):
+            brands[product["brand"]] += 1
+    return {"Tipo de producto": types, "Marca": brands}
+
+
+class CatalogRequestHandler(BaseHTTPRequestHandler):
+    # Set by make_catalog_server()
+    fixtures = {}
+    trees = {}
+    fail_every = 0
+    counter = None
+
+    def do_GET(self):
+        if self.fail_every and next(self.counter) % self.fail_every == 0:
+            self._send_json(429, {"error": "Too Many Requests"}, {"Retry-After": "0"})
+            return
+
+        url = urlsplit(self.path)
+        code, _, rest = url.path.strip('/').partition('/')
+        if rest.startswith(FACETS_PATH.strip('/')):
+            self._send_facets(code, unquote(rest[len(FACETS_PATH):]).split('/'), legacy=True)
+            return
+        if rest.startswith(IS_FACETS_PATH.strip('/')):
+            # category-1/<a>/category-2/<b>
+            self._send_facets(code, unquote(rest[len(IS_FACETS_PATH):]).strip('/').split('/')[1::2], legacy=False)
+            return
+        if rest.startswith(TREE_PATH.strip('/')):
+            self._send_tree(code, rest[len(TREE_PATH):].strip('/'))
+            return
+        search = SEARCH_PATH.strip('/')
+        if not rest.startswith(search):
+            self.send_error(404, f"Unknown path '{url.path}'")
+            return
+
+        query = parse_qs(url.query)
+        if "fq" in query:
+            segments = self._fq_segments(code, query["fq"][0])
+        else:
+            segments = unquote(rest[len(search):]).split('/')
+        # VTEX answers an empty list for unknown categories
+        products = fixture_products(self.fixtures.get(code, {}), segments)
+
+        start = int(query.get("_from", ["0"])[0])
+        end = int(query.get("_to", [str(start + 9)])[0])
+        if start > MAX_FROM or end - start >= 50:
+            self._send_json(400, {"error": "_from/_to out of range"})
+            return
+
+        page = products[start:end + 1]
+        headers = {"resources": f"{start}-{start + max(len(page), 1) - 1}/{len(products)}"}
+        self._send_json(206 if end + 1 < len(products) else 200, page, headers)
+
+    def _fq_segments(self, code, fq):
+        """Path of the category of an fq=C:/1/23/ filter, from the saved tree"""
+        if code not in self.trees:
+            return []
+        tree = CategoryTree(code, self.trees[code])
+        ids = [int(part) for part in fq[2:].split('/') if part.isdigit()]
+        return list(tree.node(ids[-1])["path"]) if ids and ids[-1] in tree.nodes else []
+
+    def _send_tree(self, code, depth):
+        if code not in self.trees or not depth.isdigit():
+            self.send_error(404, f"No category tree for '{code}'")
+            return
+        body = json.dumps(prune_tree(self.trees[code], int(depth)), ensure_ascii=False).encode('utf-8')
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_facets(self, code, segments, legacy):
+        facets = fixture_facets(self.fixtures.get(code, {}), [part for part in segments if part])
+        if legacy:
+            self._send_json(200, {
+                "Departments": [], "CategoriesTrees": [], "PriceRanges": [],
+                "Brands": [{"Name": name, "Quantity": n} for name, n in facets.pop("Marca").most_common()],
+                "SpecificationFilters": {
+                    facet: [{"Name": name, "Quantity": n} for name, n in counts.most_common()]
+                    for facet, counts in facets.items() if counts
+                },
+            })
+        else:
+            self._send_json(200, {"facets": [
+                {"name": facet, "key": slugify(facet), "type": "TEXT",
+                 "values": [{"name": name, "quantity": n, "key": slugify(facet), "value": slugify(name)}
+                            for name, n in counts.most_common()]}
+                for facet, counts in facets.items()
+            ]})
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(f"catalog server: {format % args}")
+
+
+def make_catalog_server(host="127.0.0.1", port=0, fixtures=None, fail_every=0, trees=None):
+    """
+    Build (without starting) a catalog stand-in.
+
+    Args:
+        port (int): 0 picks a free port (see server.server_address).
+        fixtures (dict): {code: {fixture key: [products]}}; default: load_fixtures().
+        fail_every (int): Answer 429 to every Nth request (0 = never).
+        trees (dict): {code: category tree}; default: load_trees().
+
+    Returns:
+        ThreadingHTTPServer
+    """
+    handler = type('BoundCatalogRequestHandler', (CatalogRequestHandler,), {
+        'fixtures': load_fixtures() if fixtures is None else fixtures,
+        'trees': load_trees() if trees is None else trees,
+        'fail_every': fail_every,
+        'counter': itertools.count(1),
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start_catalog_server(host="127.0.0.1", port=0, fixtures=None, fail_every=0, trees=None):
+    """
+    Start a catalog stand-in in a daemon thread.
+
+    Returns:
+        tuple: (server, base_url); call server.shutdown() when done.
+    """
+    server = make_catalog_server(host, port, fixtures, fail_every, trees)
+    threading.Thread(target=server.serve_forever, name="catalog-server", daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recorded VTEX search results as a local catalog stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="Directory with <code>/<key>.json fixtures")
+    parser.add_argument("--fail-every", type=int, default=0, help="Answer 429 to every Nth request")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = make_catalog_server(args.host, args.port, load_fixtures(args.fixtures), args.fail_every)
+    fixtures = server.RequestHandlerClass.fixtures
+    print(f"Serving {sum(len(f) for f in fixtures.values())} categories of {', '.join(fixtures) or 'no chains'} "
+          f"at http://{args.host}:{args.port}/<code>{SEARCH_PATH}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
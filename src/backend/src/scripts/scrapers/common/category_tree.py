@@ -0,0 +1,271 @@
+"""
+Cached VTEX category tree of each chain.
+
+The scraping hierarchy (supermarket info -> categories -> subcategories ->
+product types -> products) starts from the category tree, which VTEX serves as
+JSON:
+
+    GET /api/catalog_system/pub/category/tree/3
+        -> [{"id", "name", "url", "hasChildren", "children": [...]}, ...]
+
+The tree is loaded once per chain and API origin and kept on disk in
+category_trees/<code>.json (category_trees/<code>@<host>.json for any other
+origin, e.g. the stand-in) with its ETag and source URL. Within the TTL the file is used as
+is; after it the tree is revalidated with If-None-Match (a 304 just renews
+the file), and if the site is unreachable the stale copy is used. Without any
+cached copy, a saved snapshot (fixtures/vtex_category_tree/<code>.json) is the
+last resort.
+
+CategoryTree keeps the nodes in dicts for in-memory lookups (path -> id,
+id -> children) and builds the storefront URL, the search path used by
+vtex_catalog and the fq filter of any category:
+
+    tree = get_category_tree("carrefour")
+    for node in tree.walk(max_level=2):
+        print(tree.category_url(node["id"]), tree.search_path(node["id"]))
+
+    python common/category_tree.py carrefour --level 2
+    python common/category_tree.py carrefour --stand-in http://localhost:8766 --refresh
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from urllib.parse import urlsplit
+
+import requests
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.chains import CHAINS, SCRAPERS_DIR, get_chain
+from common.vtex_catalog import API_HEADERS
+from common.vtex_facets import slugify
+
+TREE_PATH = "/api/catalog_system/pub/category/tree"
+DEFAULT_DEPTH = 3
+DEFAULT_TTL_HOURS = float(os.environ.get("CATEGORY_TREE_TTL_HOURS", "24"))
+DEFAULT_CACHE_DIR = os.environ.get("CATEGORY_TREE_CACHE_DIR", os.path.join(SCRAPERS_DIR, "category_trees"))
+SNAPSHOT_DIR = os.path.join(SCRAPERS_DIR, "fixtures", "vtex_category_tree")
+
+
+def _normalize_path(path):
+    """'/Almacen/Aceites y vinagres/' -> ('almacen', 'aceites-y-vinagres')"""
+    return tuple(slugify(part) for part in path.split('/') if part)
+
+
+class CategoryTree:
+    """
+    In-memory index of a VTEX category tree.
+
+    Args:
+        code (str): Chain code.
+        tree (list): Response of category/tree/N.
+        base_url (str): Storefront base URL for the URL builders.
+    """
+
+    def __init__(self, code, tree, base_url=None):
+        self.code = code
+        self.base_url = (base_url or get_chain(code)["base_url"]).rstrip('/')
+        self.nodes = {}
+        self.by_path = {}
+        self.root_ids = []
+
+        # Iterative walk: (node, parent id, parent path)
+        stack = [(node, None, ()) for node in reversed(tree)]
+        while stack:
+            raw, parent, parent_path = stack.pop()
+            node_id = raw["id"]
+            url_path = urlsplit(raw.get("url") or "").path
+            path = _normalize_path(url_path) or parent_path + (slugify(raw["name"]),)
+            children = raw.get("children") or []
+            self.nodes[node_id] = {
+                "id": node_id,
+                "name": raw["name"],
+                "path": path,
+                "level": len(path),
+                "parent": parent,
+                "children": [child["id"] for child in children],
+            }
+            self.by_path[path] = node_id
+            if parent is None:
+                self.root_ids.append(node_id)
+            stack.extend((child, node_id, path) for child in reversed(children))
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def node(self, category_id):
+        return self.nodes[category_id]
+
+    def id_for(self, path):
+        """Category id of a path ('almacen/aceites-y-vinagres', '/Almacen/Aceites y vinagres'), or None"""
+        return self.by_path.get(_normalize_path(path))
+
+    def children(self, category_id):
+        return [self.nodes[child] for child in self.nodes[category_id]["children"]]
+
+    def roots(self):
+        return [self.nodes[node_id] for node_id in self.root_ids]
+
+    def ancestors(self, category_id):
+        """Ids from the root down to (and including) category_id"""
+        ids = []
+        while category_id is not None:
+            ids.append(category_id)
+            category_id = self.nodes[category_id]["parent"]
+        return ids[::-1]
+
+    def walk(self, max_level=None):
+        """Nodes depth first, parents before children, down to max_level (1 = top categories)"""
+        stack = list(reversed(self.root_ids))
+        while stack:
+            node = self.nodes[stack.pop()]
+            yield node
+            if max_level is None or node["level"] < max_level:
+                stack.extend(reversed(node["children"]))
+
+    def leaves(self):
+        return [node for node in self.walk() if not node["children"]]
+
+    def search_path(self, category_id):
+        """Category path for vtex_catalog (e.g. 'almacen/aceites-y-vinagres')"""
+        return "/".join(self.nodes[category_id]["path"])
+
+    def fq(self, category_id):
+        """VTEX fq filter of the category (e.g. 'C:/1/23/')"""
+        return "C:/" + "".join(f"{node_id}/" for node_id in self.ancestors(category_id))
+
+    def category_url(self, category_id):
+        """Storefront URL of the category page"""
+        return f"{self.base_url}/{self.search_path(category_id)}"
+
+
+def _api_base(code, api_base_url=None):
+    return (api_base_url or get_chain(code)['base_url']).rstrip('/')
+
+
+def _cache_path(code, cache_dir, api_base_url=None):
+    """Cache file of a chain's tree; trees from another origin (a stand-in) never share the real one's file"""
+    if not api_base_url or _api_base(code, api_base_url) == _api_base(code):
+        return os.path.join(cache_dir, f"{code}.json")
+    parts = urlsplit(api_base_url)
+    origin = slugify(f"{parts.netloc} {parts.path}")
+    return os.path.join(cache_dir, f"{code}@{origin}.json")
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(path, entry):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(entry, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_category_tree(code, depth=DEFAULT_DEPTH, ttl_hours=DEFAULT_TTL_HOURS, cache_dir=DEFAULT_CACHE_DIR,
+                       api_base_url=None, refresh=False, timeout=20):
+    """
+    Load a chain's category tree: disk cache within the TTL, else the API (conditional
+    GET), else the stale cache, else the saved snapshot.
+
+    Args:
+        depth (int): Levels requested to category/tree/N.
+        ttl_hours (float): Age after which the cache is revalidated.
+        api_base_url (str): Send the API request to this origin (e.g. the stand-in).
+        refresh (bool): Revalidate even within the TTL.
+
+    Returns:
+        CategoryTree
+
+    Raises:
+        Exception: No API answer, no cache and no snapshot.
+    """
+    base = _api_base(code, api_base_url)
+    path = _cache_path(code, cache_dir, api_base_url)
+    cached = _read_json(path)
+    if cached and (cached.get("depth", 0) < depth or not (cached.get("source") or "").startswith(f"{base}/")):
+        # Shallower tree, or one fetched from another origin
+        cached = None
+    if cached and not refresh and time.time() - cached["fetchedAt"] < ttl_hours * 3600:
+        return CategoryTree(code, cached["tree"])
+
+    url = f"{base}{TREE_PATH}/{depth}"
+    headers = dict(API_HEADERS)
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    try:
+        response = requests.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and cached:
+            cached["fetchedAt"] = time.time()
+            _write_cache(path, cached)
+            logging.info(f"{code}: category tree not modified")
+            return CategoryTree(code, cached["tree"])
+        response.raise_for_status()
+        tree = response.json()
+        if not isinstance(tree, list):
+            raise ValueError(f"unexpected category tree payload: {str(tree)[:200]}")
+        _write_cache(path, {"fetchedAt": time.time(), "etag": response.headers.get("ETag"), "depth": depth,
+                            "source": url, "tree": tree})
+        logging.info(f"{code}: category tree loaded from {url}")
+        return CategoryTree(code, tree)
+    except Exception as e:
+        if cached:
+            logging.warning(f"{code}: could not refresh the category tree ({e}), using the cached copy")
+            return CategoryTree(code, cached["tree"])
+        snapshot = _read_json(os.path.join(SNAPSHOT_DIR, f"{code}.json"))
+        if snapshot is not None:
+            logging.warning(f"{code}: could not load the category tree ({e}), using the saved snapshot")
+            return CategoryTree(code, snapshot)
+        raise Exception(f"No category tree for {code}: {e}")
+
+
+_trees = {}
+_trees_lock = threading.Lock()
+
+
+def get_category_tree(code, api_base_url=None, refresh=False):
+    """Process-wide CategoryTree of a chain and API origin (loaded once, see load_category_tree)"""
+    key = (code, _api_base(code, api_base_url))
+    with _trees_lock:
+        if refresh or key not in _trees:
+            _trees[key] = load_category_tree(code, api_base_url=api_base_url, refresh=refresh)
+        return _trees[key]
+
+
+def category_url_for(code, path):
+    """Storefront URL of a category path, from the tree when it is known"""
+    try:
+        tree = get_category_tree(code)
+        category_id = tree.id_for(path)
+        if category_id is not None:
+            return tree.category_url(category_id)
+    except Exception as e:
+        logging.warning(f"{code}: category tree unavailable ({e})")
+    return f"{get_chain(code)['base_url'].rstrip('/')}/{path.strip('/')}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load, cache and print a chain's VTEX category tree")
+    parser.add_argument("chain", choices=list(CHAINS))
+    parser.add_argument("--level", type=int, default=None, help="Deepest level to print (1 = top categories)")
+    parser.add_argument("--stand-in", help="Base URL of the catalog stand-in (common/catalog_server.py)")
+    parser.add_argument("--refresh", action="store_true", help="Revalidate the cache even within the TTL")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    api_base_url = f"{args.stand_in.rstrip('/')}/{args.chain}" if args.stand_in else None
+    tree = load_category_tree(args.chain, api_base_url=api_base_url, refresh=args.refresh)
+    for node in tree.walk(args.level):
+        print(f"{'  ' * (node['level'] - 1)}{node['name']} [{node['id']}] {tree.category_url(node['id'])}")
+    print(f"{len(tree)} categories, {len(tree.leaves())} leaves")
@@ -0,0 +1,198 @@
+"""
+Per-chain configuration registry.
+
+Everything that differs between the five supermarket sites lives here, so the
+scraper engines stay chain-agnostic. Add a chain by adding an entry.
+"""
+import os
+import re
+
+SCRAPERS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHAINS = {
+    "carrefour": {
+        "code": "carrefour",
+        "name": "Carrefour",
+        "base_url": "https://www.carrefour.com.ar",
+        "domain": "www.carrefour.com.ar",
+        "logo_alt": "Carrefour",
+        "specific_urls": {
+            "home": "/",
+            "categoria_almacen": "/Almacen",
+            "producto_ejemplo": "/aceite-de-girasol-carrefour-classic-alto-omega-pet-900-cc-699030-699030/p",
+            "promociones": "/promociones",
+            "descuentos_bancarios": "/descuentos-bancarios",
+        },
+        # The Carrefour crawler writes next to its script, the others into HTML/
+        "outerhtml_dir": ("HTML_crawler",),
+        # Selectors the category/product-type scrapers depend on, by page type
+        "watched_selectors": {
+            "categoria": [
+                ".valtech-carrefourar-search-result-3-x-filter__container--tipo-de-producto",
+                ".valtech-carrefourar-search-result-3-x-filterContent",
+                ".valtech-carrefourar-search-result-3-x-filterItem",
+                ".valtech-carrefourar-search-result-3-x-seeMoreButton",
+                ".vtex-checkbox__label",
+            ],
+        },
+    },
+    "dia": {
+        "code": "dia",
+        "name": "Dia",
+        "base_url": "https://diaonline.supermercadosdia.com.ar",
+        "domain": "diaonline.supermercadosdia.com.ar",
+        "logo_alt": "Dia",
+        # Static assets and APIs are served from the parent domain
+        "lean_allowlist": ("supermercadosdia.com.ar",),
+        "specific_urls": {
+            "home": "/",
+            "categoria_almacen": "/almacen",
+            "producto_ejemplo": "/arroz-largo-fino-ala-1-kg-25417/p",
+        },
+    },
+    "jumbo": {
+        "code": "jumbo",
+        "name": "Jumbo",
+        "base_url": "https://www.jumbo.com.ar",
+        "domain": "www.jumbo.com.ar",
+        "logo_alt": "Jumbo",
+        "specific_urls": {
+            "home": "/",
+            "categoria_almacen": "/almacen",
+            "producto_ejemplo": "/oblea-leche-4-fingers-41-5-grs-kitkat-2/p",
+            "descuentos_dia": "/descuentos-del-dia?type=por-dia&day=0",
+            "descuentos_banco": "/descuentos-del-dia?type=por-banco",
+            "descuentos_cencopay": "/descuentos-del-dia?type=cencopay",
+        },
+    },
+    "vea": {
+        "code": "vea",
+        "name": "Vea",
+        "base_url": "https://www.vea.com.ar",
+        "domain": "www.vea.com.ar",
+        "logo_alt": "Vea",
+        "specific_urls": {
+            "home": "/",
+            "categoria_almacen": "/almacen",
+            "producto_ejemplo": "/oblea-leche-4-fingers-41-5-grs-kitkat-2/p",
+            "descuentos_dia": "/descuentos-del-dia?type=por-dia&day=0",
+            "descuentos_banco": "/descuentos-del-dia?type=por-banco",
+            "descuentos_cencopay": "/descuentos-del-dia?type=cencopay",
+        },
+    },
+    "disco": {
+        "code": "disco",
+        "name": "Disco",
+        "base_url": "https://www.disco.com.ar",
+        "domain": "www.disco.com.ar",
+        "logo_alt": "Disco",
+        "specific_urls": {
+            "home": "/",
+            "categoria_almacen": "/almacen",
+            "producto_ejemplo": "/yerba-mate-playadito-suave-1-kg/p",
+            "descuentos_dia": "/descuentos-del-dia?type=por-dia&day=0",
+            "descuentos_banco": "/descuentos-del-dia?type=por-banco",
+            "descuentos_cencopay": "/descuentos-del-dia?type=cencopay",
+        },
+    },
+}
+
+# Defaults shared by every chain (all five sites are Argentine storefronts)
+CHAIN_DEFAULTS = {
+    "country": "Argentina",
+    "language": "es-AR",
+    "currency": "ARS",
+    "charset": "utf-8",
+    # Where the chain's outerHTML crawler saves its snapshots, relative to scrapers/<code>
+    "outerhtml_dir": ("HTML_crawler", "HTML"),
+    "specific_urls": {"home": "/"},
+    # CSS selectors checked after every new snapshot, by page type (see common/dom_diff.py)
+    "watched_selectors": {},
+    # Frontier crawl (common/frontier.py): URL path regexes per page type, checked in order.
+    # VTEX product pages end in /p; categories are short slug paths.
+    "crawl_patterns": {
+        "producto": r"^/[^/]+/p/?$",
+        "categoria": r"^/[\w-]+(/[\w-]+){0,3}/?$",
+    },
+    # Paths that look like categories but are not (account, checkout, institutional pages)
+    "crawl_exclude": (
+        r"^/(_secure|account|login|checkout|api|institucional|sucursales|legales|ayuda|"
+        r"terminos|preguntas-frecuentes|contacto|busca|s|promociones|descuentos[\w-]*)(/|$)"
+    ),
+    # Query parameters that change the listing (kept when normalizing URLs); the rest are dropped
+    "crawl_query_params": ("map", "page"),
+    # Extra hosts (and their subdomains) the lean browser profile lets through, on top of
+    # the chain's own domain and the VTEX platform hosts (see common/lean_browser.py)
+    "lean_allowlist": (),
+}
+
+
+def get_chain(code):
+    """
+    Return the full configuration for a chain.
+
+    Args:
+        code (str): Chain code (e.g. 'carrefour').
+
+    Returns:
+        dict: Chain config merged with CHAIN_DEFAULTS.
+    """
+    if code not in CHAINS:
+        raise ValueError(f"Unknown chain '{code}'. Available: {', '.join(CHAINS)}")
+    return {**CHAIN_DEFAULTS, **CHAINS[code]}
+
+
+def chain_dir(code):
+    """Directory of the chain's scripts (scrapers/<code>)."""
+    return os.path.join(SCRAPERS_DIR, code)
+
+
+def saved_html_dirs(code):
+    """Directories where the chain's HTML crawler writes its outerHTML snapshots."""
+    return [
+        os.path.join(chain_dir(code), 'HTML_crawler', 'HTML'),
+        os.path.join(chain_dir(code), 'HTML_crawler')
+    ]
+
+
+def outerhtml_output_dir(code):
+    """Directory the outerHTML crawler writes to for a chain (vault/ lives inside it)."""
+    return os.path.join(chain_dir(code), *get_chain(code)["outerhtml_dir"])
+
+
+def crawl_rules(code):
+    """
+    Compiled URL rules for the frontier crawler.
+
+    Returns:
+        dict: {"patterns": [(page_type, regex)], "exclude": regex, "query_params": set}
+    """
+    chain = get_chain(code)
+    return {
+        "patterns": [(page_type, re.compile(rx, re.IGNORECASE)) for page_type, rx in chain["crawl_patterns"].items()],
+        "exclude": re.compile(chain["crawl_exclude"], re.IGNORECASE),
+        "query_params": set(chain["crawl_query_params"]),
+    }
+
+
+def lean_allowlist(code):
+    """
+    Hosts the lean browser profile allows for a chain; subdomains match too.
+
+    Returns:
+        tuple: Host suffixes, e.g. ('carrefour.com.ar', ...).
+    """
+    chain = get_chain(code)
+    own = chain["domain"][4:] if chain["domain"].startswith("www.") else chain["domain"]
+    return (own, *chain["lean_allowlist"])
+
+
+def specific_urls(code):
+    """
+    Key pages the outerHTML crawler snapshots for a chain.
+
+    Returns:
+        dict: {page_name: absolute URL}
+    """
+    chain = get_chain(code)
+    return {name: chain["base_url"] + path for name, path in chain["specific_urls"].items()}
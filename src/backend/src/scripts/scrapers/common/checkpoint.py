@@ -0,0 +1,205 @@
+"""
+Checkpoint journal shared by the crawlers and scrapers.
+
+A long run records each finished unit of work (a URL, a chain, a category)
+with its partial result, and each failure with its error count, in a small
+SQLite journal. Writes are buffered and flushed in one transaction every
+`interval` items or `interval_seconds`, whichever comes first, so a crash
+loses at most one interval and the journal is never left half-written.
+
+The journal only exists to resume a run that crashed. On restart the same
+journal is opened, completed keys are skipped (their stored results are
+reused) and failed ones are retried until they reach max_failures. Whenever
+a run reaches its end, even with some keys failed, the caller calls finish(),
+which deletes the journal so the next run starts from scratch. A journal
+older than max_age (counted from the start of the run that wrote it) is
+discarded instead of resumed, so a crash does not make a run days later
+reuse stale results.
+
+    with Checkpoint("outerhtml_crawler") as checkpoint:
+        for url in checkpoint.pending(urls):
+            ...
+            checkpoint.complete(url, {"path": path})
+        checkpoint.finish()
+"""
+import os
+import time
+import json
+import sqlite3
+import logging
+import threading
+
+DEFAULT_CHECKPOINT_DIR = os.environ.get("SCRAPER_CHECKPOINT_DIR", "checkpoints")
+DEFAULT_INTERVAL = int(os.environ.get("SCRAPER_CHECKPOINT_INTERVAL", "10"))
+DEFAULT_INTERVAL_SECONDS = 30
+DEFAULT_MAX_FAILURES = 3
+DEFAULT_MAX_AGE = float(os.environ.get("SCRAPER_CHECKPOINT_MAX_AGE", 12 * 3600))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    result TEXT,
+    errors INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class Checkpoint:
+    """
+    Args:
+        name (str): Journal name; the file is <directory>/<name>.sqlite.
+        directory (str): Where journals live (SCRAPER_CHECKPOINT_DIR, default ./checkpoints).
+        interval (int): Flush after this many buffered updates (1 = every item).
+        interval_seconds (float): Flush at least this often while updates arrive.
+        max_failures (int): Keys that failed this many times are no longer pending (None = always retry).
+        fresh (bool): Discard an existing journal instead of resuming it.
+        max_age (float): Seconds after which an unfinished journal is discarded instead of
+            resumed (SCRAPER_CHECKPOINT_MAX_AGE, default 12 h; None = never).
+    """
+
+    def __init__(self, name, directory=DEFAULT_CHECKPOINT_DIR, interval=DEFAULT_INTERVAL,
+                 interval_seconds=DEFAULT_INTERVAL_SECONDS, max_failures=DEFAULT_MAX_FAILURES, fresh=False,
+                 max_age=DEFAULT_MAX_AGE):
+        self.name = name
+        self.path = os.path.join(directory, f"{name}.sqlite")
+        self.interval = max(1, interval)
+        self.interval_seconds = interval_seconds
+        self.max_failures = max_failures
+        self.lock = threading.Lock()
+        self.buffer = {}
+        self.last_flush = time.time()
+
+        os.makedirs(directory, exist_ok=True)
+        if fresh:
+            self._remove_files()
+        self._connect()
+        started = self.db.execute("SELECT value FROM meta WHERE key = 'started_at'").fetchone()
+        if started is not None and max_age is not None and time.time() - float(started[0]) > max_age:
+            logging.info(f"Discarding checkpoint {self.path}: started {(time.time() - float(started[0])) / 3600:.1f} h ago")
+            self.db.close()
+            self._remove_files()
+            self._connect()
+            started = None
+        if started is None:
+            with self.db:
+                self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('started_at', ?)", (repr(time.time()),))
+
+        self.done = {}
+        self.errors = {}
+        for key, status, result, errors in self.db.execute("SELECT key, status, result, errors FROM entries"):
+            if status == "done":
+                self.done[key] = json.loads(result) if result is not None else None
+            else:
+                self.errors[key] = errors
+        self.resumed = len(self.done)
+        if self.resumed or self.errors:
+            logging.info(f"Resuming checkpoint {self.path}: {self.resumed} done, {len(self.errors)} failed")
+
+    def _connect(self):
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def _remove_files(self):
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(self.path + suffix)
+            except FileNotFoundError:
+                pass
+
+    def is_done(self, key):
+        with self.lock:
+            return key in self.done
+
+    def pending(self, keys):
+        """Keys not completed yet and below max_failures, in the given order"""
+        with self.lock:
+            return [key for key in keys if key not in self.done
+                    and (self.max_failures is None or self.errors.get(key, 0) < self.max_failures)]
+
+    def result(self, key, default=None):
+        with self.lock:
+            return self.done.get(key, default)
+
+    def results(self):
+        """{key: result} of every completed key"""
+        with self.lock:
+            return dict(self.done)
+
+    def complete(self, key, result=None):
+        """Mark a key done with its (JSON-serializable) partial result"""
+        payload = json.dumps(result, ensure_ascii=False, default=str) if result is not None else None
+        with self.lock:
+            self.done[key] = result
+            self.errors.pop(key, None)
+            self.buffer[key] = ("done", payload, 0, None)
+            self._maybe_flush()
+
+    def fail(self, key, error):
+        """Record a failed attempt; the key stays pending until max_failures"""
+        with self.lock:
+            count = self.errors.get(key, 0) + 1
+            self.errors[key] = count
+            self.buffer[key] = ("failed", None, count, str(error))
+            self._maybe_flush()
+
+    def _maybe_flush(self):
+        if len(self.buffer) >= self.interval or time.time() - self.last_flush >= self.interval_seconds:
+            self._flush()
+
+    def _flush(self):
+        if self.buffer:
+            now = time.time()
+            # One transaction per flush: the journal holds either all of it or none of it
+            with self.db:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO entries (key, status, result, errors, last_error, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(key, *entry, now) for key, entry in self.buffer.items()]
+                )
+            self.buffer.clear()
+        self.last_flush = time.time()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def stats(self):
+        """
+        Returns:
+            dict: {"done", "failed", "errors", "resumed"}
+        """
+        with self.lock:
+            return {
+                "done": len(self.done),
+                "failed": len(self.errors),
+                "errors": sum(self.errors.values()),
+                "resumed": self.resumed,
+            }
+
+    def close(self):
+        with self.lock:
+            if self.db is None:
+                return
+            self._flush()
+            self.db.close()
+            self.db = None
+
+    def finish(self):
+        """The run reached its end (failed keys included): drop the journal so the next run starts over"""
+        self.close()
+        self._remove_files()
+        logging.info(f"Checkpoint {self.path} finished and removed")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,494 @@
+"""
+Diff estructural entre snapshots consecutivos de una página.
+
+Cada snapshot se convierte en un árbol de firmas (tag + clases, sin texto),
+donde cada nodo lleva el hash de su subárbol (árbol de Merkle). El diff baja
+solo por los subárboles cuyo hash cambió: cambios de precios o textos no
+alteran la estructura, y las partes idénticas de una página de varios MB se
+descartan comparando un hash.
+
+El reporte incluye:
+
+- clases agregadas / eliminadas (presentes en un solo snapshot);
+- clases renombradas (en un mismo nodo emparejado, una clase que desaparece
+  del documento y otra que aparece, e.g. un hash de build de VTEX);
+- el estado de los selectores de los que dependen los scrapers
+  (chains.watched_selectors y los campos obligatorios de supermarket-info):
+  un selector que matcheaba antes y ya no matchea es una rotura.
+
+Cada snapshot se parsea una sola vez: el árbol de firmas y el conteo de
+selectores salen del mismo documento lxml, y para los blobs del almacén se
+cachean junto al blob (<hash>.sig), así la versión anterior no se vuelve a
+parsear. Desde el crawler el diff corre en un hilo aparte
+(compare_in_background), fuera del camino de cada página.
+
+Uso por línea de comandos (compara las dos últimas versiones del almacén):
+
+    python common/dom_diff.py carrefour categoria_almacen
+    python common/dom_diff.py --files viejo.html nuevo.html
+"""
+import os
+import sys
+import time
+import marshal
+import hashlib
+import logging
+import argparse
+import threading
+from array import array
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.chains import CHAINS, get_chain
+from common.page_settle import page_type_for
+from common.page_snapshot import supermarket_info_fields
+
+# Bytes del hash de cada subárbol (alcanza para distinguir subárboles hermanos)
+DIGEST_SIZE = 8
+
+
+class DomNode:
+    __slots__ = ("tag", "classes", "signature", "digest", "children", "class_counts")
+
+    def __init__(self, tag, classes):
+        self.tag = tag
+        self.classes = classes
+        self.signature = tag + ('.' + '.'.join(classes) if classes else '')
+        self.digest = None
+        self.children = []
+        self.class_counts = None  # Solo en la raíz: {clase: ocurrencias} del documento
+
+
+def build_signature_tree(html):
+    """
+    Árbol de firmas de un documento, con el hash de cada subárbol.
+
+    Args:
+        html (str): outerHTML.
+
+    Returns:
+        DomNode: Raíz (<html>), con las clases de todo el documento en class_counts.
+    """
+    import lxml.html
+
+    return _signature_tree(lxml.html.document_fromstring(html))
+
+
+def analyze_snapshot(html, selectors=()):
+    """
+    Árbol de firmas y conteo de selectores de un snapshot, parseándolo una sola vez.
+
+    Returns:
+        tuple: (DomNode, {selector: cantidad de elementos que matchean})
+    """
+    import lxml.html
+
+    doc = lxml.html.document_fromstring(html)
+    return _signature_tree(doc), {selector: len(doc.cssselect(selector)) for selector in selectors}
+
+
+def _signature_tree(root_element):
+    root = DomNode(root_element.tag, tuple(sorted((root_element.get('class') or '').split())))
+    class_counts = Counter()
+
+    # Recorrido iterativo: las páginas VTEX anidan lo suficiente para molestar a la recursión
+    stack = [(root_element, root, False)]
+    while stack:
+        element, node, visited = stack.pop()
+        if visited:
+            hasher = hashlib.blake2b(node.signature.encode('utf-8'), digest_size=DIGEST_SIZE)
+            for child in node.children:
+                hasher.update(child.digest)
+            node.digest = hasher.digest()
+            continue
+
+        class_counts.update(node.classes)
+        stack.append((element, node, True))
+        for child_element in reversed(element):
+            if not isinstance(child_element.tag, str):
+                continue  # Comentarios e instrucciones de procesamiento
+            child = DomNode(child_element.tag, tuple(sorted((child_element.get('class') or '').split())))
+            node.children.append(child)
+            stack.append((child_element, child, False))
+        node.children.reverse()
+    root.class_counts = class_counts
+    return root
+
+
+def dump_signature_tree(root, counts, path):
+    """
+    Guarda un árbol de firmas y su conteo de selectores en forma compacta: los
+    nodos en preorden, por columnas (tags, clases, hashes y tamaño de cada
+    subárbol), con marshal y comprimido con zstd.
+    """
+    import zstandard
+
+    tags, classes, digests, parents = [], [], [], []
+    stack = [(root, -1)]
+    while stack:
+        node, parent = stack.pop()
+        parents.append(parent)
+        index = len(tags)
+        tags.append(node.tag)
+        classes.append(' '.join(node.classes))
+        digests.append(node.digest)
+        stack.extend((child, index) for child in reversed(node.children))
+    sizes = array('I', [1]) * len(tags)
+    for index in range(len(tags) - 1, 0, -1):
+        sizes[parents[index]] += sizes[index]
+
+    data = marshal.dumps({
+        "tags": '\n'.join(tags),
+        "classes": '\n'.join(classes),
+        "digests": b''.join(digests),
+        "sizes": sizes.tobytes(),
+        "classCounts": dict(root.class_counts or {}),
+        "selectors": counts,
+    })
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(zstandard.ZstdCompressor(level=3).compress(data))
+    os.replace(tmp_path, path)
+
+
+class _StoredNode(DomNode):
+    """Nodo de un árbol cacheado: sus hijos se construyen recién cuando el diff baja por él"""
+    __slots__ = ("_tree", "_index", "_children")
+
+    def __init__(self, tree, index):
+        tags, classes, digests, _ = tree
+        self.tag = tags[index]
+        self.classes = tuple(classes[index].split())
+        self.signature = self.tag + ('.' + '.'.join(self.classes) if self.classes else '')
+        self.digest = digests[index * DIGEST_SIZE:(index + 1) * DIGEST_SIZE]
+        self.class_counts = None
+        self._tree = tree
+        self._index = index
+        self._children = None
+
+    @property
+    def children(self):
+        if self._children is None:
+            sizes = self._tree[3]
+            self._children = []
+            index, end = self._index + 1, self._index + sizes[self._index]
+            while index < end:
+                self._children.append(_StoredNode(self._tree, index))
+                index += sizes[index]
+        return self._children
+
+
+def load_signature_tree(path):
+    """
+    Returns:
+        tuple: (DomNode, {selector: cantidad}) guardados con dump_signature_tree().
+            Los nodos se materializan a demanda.
+    """
+    import zstandard
+
+    with open(path, 'rb') as f:
+        data = marshal.loads(zstandard.ZstdDecompressor().decompress(f.read()))
+    sizes = array('I')
+    sizes.frombytes(data["sizes"])
+    root = _StoredNode((data["tags"].split('\n'), data["classes"].split('\n'), data["digests"], sizes), 0)
+    root.class_counts = Counter(data["classCounts"])
+    return root, data["selectors"]
+
+
+def stored_signature(store, digest, selectors=()):
+    """
+    Árbol de firmas y conteo de selectores de un blob del almacén, cacheados en
+    <hash>.sig: cada versión se parsea una vez aunque se compare dos veces.
+
+    Returns:
+        tuple: (DomNode, {selector: cantidad})
+    """
+    path = store.sidecar_path(digest, "sig")
+    try:
+        root, counts = load_signature_tree(path)
+        if all(selector in counts for selector in selectors):
+            return root, counts
+    except (OSError, EOFError, ValueError, TypeError, KeyError):
+        pass  # Sin caché (o de otra versión): se parsea
+    root, counts = analyze_snapshot(store.get(digest), selectors)
+    try:
+        dump_signature_tree(root, counts, path)
+    except OSError as e:
+        logging.warning(f"No se pudo cachear el árbol de firmas de {digest[:12]}: {e}")
+    return root, counts
+
+
+def _document_classes(root):
+    """{clase: ocurrencias} de un árbol (las cacheadas en la raíz si las hay)"""
+    if root.class_counts is not None:
+        return root.class_counts
+    counter = Counter()
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        counter.update(current.classes)
+        stack.extend(current.children)
+    return counter
+
+
+def _pair_children(old_children, new_children):
+    """
+    Empareja hijos: primero subárboles idénticos (se descartan), después
+    misma firma y por último mismo tag, respetando el orden.
+
+    Returns:
+        tuple: (pares a comparar, hijos solo en old, hijos solo en new)
+    """
+    new_by_digest = {}
+    for index, child in enumerate(new_children):
+        new_by_digest.setdefault(child.digest, []).append(index)
+
+    used_new = set()
+    remaining_old = []
+    for child in old_children:
+        candidates = new_by_digest.get(child.digest)
+        if candidates:
+            used_new.add(candidates.pop(0))
+        else:
+            remaining_old.append(child)
+    remaining_new = [child for index, child in enumerate(new_children) if index not in used_new]
+
+    pairs = []
+    for key in (lambda n: n.signature, lambda n: n.tag):
+        if not remaining_old or not remaining_new:
+            break
+        matcher = SequenceMatcher(None, [key(n) for n in remaining_old], [key(n) for n in remaining_new],
+                                  autojunk=False)
+        matched_old, matched_new = set(), set()
+        for block in matcher.get_matching_blocks():
+            for offset in range(block.size):
+                pairs.append((remaining_old[block.a + offset], remaining_new[block.b + offset]))
+                matched_old.add(block.a + offset)
+                matched_new.add(block.b + offset)
+        remaining_old = [n for i, n in enumerate(remaining_old) if i not in matched_old]
+        remaining_new = [n for i, n in enumerate(remaining_new) if i not in matched_new]
+
+    return pairs, remaining_old, remaining_new
+
+
+def diff_trees(old_root, new_root):
+    """
+    Compara dos árboles de firmas bajando solo por subárboles distintos.
+
+    Returns:
+        dict: {"identical", "changedNodes", "visitedNodes", "added", "removed", "renamed"}
+            added/removed: {clase: ocurrencias}; renamed: [(vieja, nueva)].
+    """
+    if old_root.digest == new_root.digest:
+        return {"identical": True, "changedNodes": 0, "visitedNodes": 1, "added": {}, "removed": {}, "renamed": []}
+
+    rename_candidates = Counter()
+    changed = visited = 0
+
+    stack = [(old_root, new_root)]
+    while stack:
+        old, new = stack.pop()
+        visited += 1
+        if old.digest == new.digest:
+            continue
+        changed += 1
+
+        if old.classes != new.classes:
+            gone = set(old.classes) - set(new.classes)
+            came = set(new.classes) - set(old.classes)
+            for old_class in gone:
+                for new_class in came:
+                    rename_candidates[(old_class, new_class)] += 1
+
+        pairs, _, _ = _pair_children(old.children, new.children)
+        stack.extend(pairs)
+
+    # Agregadas / eliminadas contra las clases de todo el documento: una clase
+    # que sale de un subárbol cambiado puede seguir presente en uno idéntico
+    # (o en otro subárbol cambiado), y entonces no dejó de existir.
+    old_classes, new_classes = _document_classes(old_root), _document_classes(new_root)
+    removed = {c: n for c, n in old_classes.items() if c not in new_classes}
+    added = {c: n for c, n in new_classes.items() if c not in old_classes}
+
+    renamed = []
+    for (old_class, new_class), _ in rename_candidates.most_common():
+        if old_class in removed and new_class in added and SequenceMatcher(None, old_class, new_class).ratio() >= 0.6:
+            renamed.append((old_class, new_class))
+            removed.pop(old_class)
+            added.pop(new_class)
+
+    return {
+        "identical": False,
+        "changedNodes": changed,
+        "visitedNodes": visited,
+        "added": added,
+        "removed": removed,
+        "renamed": renamed,
+    }
+
+
+def watched_selectors(code, page_name):
+    """
+    Selectores de los que dependen los scrapers para una página.
+
+    Returns:
+        list: Selectores CSS.
+    """
+    chain = get_chain(code)
+    page_type = page_type_for(page_name, chain["watched_selectors"])
+    selectors = list(chain["watched_selectors"].get(page_type, []))
+    if page_name == "home":
+        fields = supermarket_info_fields(chain["logo_alt"])
+        selectors += [fields["metaDescription"][0], fields["favicon"][0]]
+    return selectors
+
+
+def check_selectors(html, selectors):
+    """
+    Returns:
+        dict: {selector: cantidad de elementos que matchean}
+    """
+    import lxml.html
+
+    doc = lxml.html.document_fromstring(html)
+    return {selector: len(doc.cssselect(selector)) for selector in selectors}
+
+
+def compare_snapshots(old_html, new_html, selectors=()):
+    """
+    Diff estructural + chequeo de selectores entre dos snapshots.
+
+    Returns:
+        dict: Resultado de diff_trees() más "selectors" {selector: {"before", "after"}},
+            "broken" (matcheaban y ya no), "missing" (no matchean en ninguno) y "elapsedMs".
+    """
+    started = time.perf_counter()
+    return _report(analyze_snapshot(old_html, selectors), analyze_snapshot(new_html, selectors), selectors, started)
+
+
+def _report(old, new, selectors, started):
+    """Reporte de compare_snapshots() a partir de dos (árbol, conteo de selectores)"""
+    (old_root, before), (new_root, after) = old, new
+    report = diff_trees(old_root, new_root)
+    report["selectors"] = {s: {"before": before[s], "after": after[s]} for s in selectors}
+    report["broken"] = [s for s in selectors if before[s] and not after[s]]
+    report["missing"] = [s for s in selectors if not before[s] and not after[s]]
+    report["elapsedMs"] = (time.perf_counter() - started) * 1000
+    return report
+
+
+def compare_latest_versions(store, page_name):
+    """
+    Compara las dos últimas versiones de una página en un SnapshotStore.
+
+    Returns:
+        dict: Reporte de compare_snapshots(), o None si no hay dos versiones distintas.
+    """
+    history = store.history(page_name)
+    if len(history) < 2 or history[-1]["hash"] == history[-2]["hash"]:
+        return None
+    return compare_stored_versions(store, page_name, history[-2]["hash"], history[-1]["hash"])
+
+
+def compare_stored_versions(store, page_name, old_digest, new_digest, extra_selectors=()):
+    """
+    Compara dos blobs de una página del almacén usando los árboles de firmas
+    cacheados (solo se parsean las versiones sin caché).
+
+    Returns:
+        dict: Reporte de compare_snapshots().
+    """
+    started = time.perf_counter()
+    selectors = (watched_selectors(store.chain, page_name) if store.chain else []) + list(extra_selectors)
+    return _report(stored_signature(store, old_digest, selectors), stored_signature(store, new_digest, selectors),
+                   selectors, started)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def compare_in_background(store, page_name, old_digest, new_digest):
+    """
+    Encola compare_stored_versions() + log_report() en un hilo aparte (uno por
+    proceso), así el crawler no espera el diff. Los errores se registran.
+
+    Returns:
+        Future: Reporte, o None si falló.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dom-diff")
+
+    def job():
+        label = f"{store.chain}/{page_name}"
+        try:
+            report = compare_stored_versions(store, page_name, old_digest, new_digest)
+        except Exception as e:
+            logging.warning(f"No se pudo comparar {label} con la versión anterior: {e}")
+            return None
+        log_report(label, report)
+        return report
+
+    return _executor.submit(job)
+
+
+def log_report(label, report):
+    """Imprime y registra un reporte; las roturas de selectores van como warning"""
+    if report is None:
+        return
+    if report["identical"] and not report["broken"]:
+        # Solo cambió el texto (precios, banners): nada que avisar
+        logging.info(f"{label}: estructura sin cambios ({report['elapsedMs']:.0f} ms)")
+        return
+    summary = (f"{label}: {report['changedNodes']} nodos cambiados, +{len(report['added'])} / "
+               f"-{len(report['removed'])} clases, {len(report['renamed'])} renombradas "
+               f"({report['elapsedMs']:.0f} ms)")
+    print(summary)
+    logging.info(f"{summary}: {report}")
+    for old_class, new_class in report["renamed"]:
+        print(f"  renombrada: {old_class} -> {new_class}")
+    for selector in report["broken"]:
+        print(f"  ALERTA selector roto: {selector}")
+        logging.warning(f"{label}: selector roto {selector} ({report['selectors'][selector]})")
+
+
+if __name__ == "__main__":
+    from common.snapshot_store import get_snapshot_store
+
+    parser = argparse.ArgumentParser(description="Diff estructural entre las dos últimas versiones de una página")
+    parser.add_argument("chain", nargs="?", choices=list(CHAINS))
+    parser.add_argument("page_name", nargs="?")
+    parser.add_argument("--files", nargs=2, metavar=("VIEJO", "NUEVO"), help="Comparar dos archivos HTML")
+    parser.add_argument("--selector", action="append", default=[], help="Selector extra a chequear (repetible)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s - %(message)s')
+    if args.files:
+        with open(args.files[0], 'r', encoding='utf-8') as f:
+            old_html = f.read()
+        with open(args.files[1], 'r', encoding='utf-8') as f:
+            new_html = f.read()
+        report = compare_snapshots(old_html, new_html, args.selector)
+        label = f"{args.files[0]} -> {args.files[1]}"
+    elif args.chain and args.page_name:
+        store = get_snapshot_store(args.chain)
+        history = store.history(args.page_name)
+        if len(history) < 2:
+            sys.exit(f"{args.chain}/{args.page_name} tiene menos de dos versiones en el almacén")
+        report = compare_stored_versions(store, args.page_name, history[-2]["hash"], history[-1]["hash"],
+                                         args.selector)
+        label = f"{args.chain}/{args.page_name}"
+    else:
+        parser.error("indicar chain y page_name, o --files")
+
+    log_report(label, report)
+    for added in sorted(report["added"]):
+        print(f"  + {added}")
+    for removed in sorted(report["removed"]):
+        print(f"  - {removed}")
@@ -0,0 +1,90 @@
+"""
+Change detection for supermarket-info documents.
+
+content_fingerprint() hashes the normalized extracted fields (timestamps and
+bookkeeping fields excluded), so two runs over an unchanged homepage produce the
+same value. The backend compares it with the stored one and only touches
+lastHomepageScraped when it matches.
+
+check_homepage_unchanged() is the cheaper pre-check: a conditional GET with the
+ETag / Last-Modified stored from the previous run. A 304 means the homepage did
+not change and the browser does not need to be launched at all.
+"""
+import json
+import hashlib
+import logging
+
+import requests
+
+# Fields that change on every run or are bookkeeping, never part of the content
+VOLATILE_FIELDS = {
+    "_id", "__v", "createdAt", "updatedAt", "lastScraped", "lastHomepageScraped",
+    "contentFingerprint", "homepageEtag", "homepageLastModified",
+}
+
+
+def _normalize(value):
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items() if k not in VOLATILE_FIELDS and v is not None}
+    if isinstance(value, (list, tuple)):
+        items = [_normalize(v) for v in value]
+        # Order of scalar lists (e.g. GTM ids) is not meaningful
+        if all(isinstance(v, (str, int, float, bool)) for v in items):
+            return sorted(items, key=str)
+        return items
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def content_fingerprint(data):
+    """
+    SHA-256 of the normalized document content.
+
+    Args:
+        data (dict): Extracted supermarket-info document.
+
+    Returns:
+        str: Hex digest.
+    """
+    canonical = json.dumps(_normalize(data), sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def check_homepage_unchanged(url, etag=None, last_modified=None, session=None, timeout=10):
+    """
+    Conditional GET against the homepage.
+
+    Args:
+        url (str): Homepage URL.
+        etag (str): ETag stored from the previous run.
+        last_modified (str): Last-Modified stored from the previous run.
+
+    Returns:
+        tuple: (unchanged, {"homepageEtag": ..., "homepageLastModified": ...})
+            unchanged is True only on a 304 response.
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    http = session or requests
+    try:
+        # stream=True: only the status line and headers are needed
+        response = http.get(url, headers=headers, timeout=timeout, stream=True)
+        response.close()
+    except requests.exceptions.RequestException as e:
+        logging.warning(f"Conditional GET failed for {url}: {e}")
+        return False, {}
+
+    validators = {}
+    if response.headers.get("ETag"):
+        validators["homepageEtag"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        validators["homepageLastModified"] = response.headers["Last-Modified"]
+
+    unchanged = bool(headers) and response.status_code == 304
+    logging.info(f"Conditional GET {url}: {response.status_code} ({'unchanged' if unchanged else 'changed or unknown'})")
+    return unchanged, validators
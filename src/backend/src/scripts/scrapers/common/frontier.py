@@ -0,0 +1,327 @@
+"""
+Crawler por frontera: descubre las páginas de categoría y producto de una
+cadena en lugar de depender de los specific_urls mantenidos a mano.
+
+La frontera de cada cadena es persistente (SQLite en <output_dir>/frontier.sqlite):
+cada URL normalizada tiene su tipo de página, profundidad, fecha de
+descubrimiento y de último crawl. Se siembra con la home (y los
+specific_urls) y se expande con los enlaces de cada página visitada que
+matchean chains.crawl_patterns.
+
+- Normalización: todo en minúscula salvo la query (las rutas VTEX no
+  distinguen mayúsculas), sin fragmento, sin barra final y sin parámetros de
+  query salvo los que cambian el listado (chains.crawl_query_params), así
+  '/almacen?utm_source=x#top' y '/Almacen/' son la misma página.
+- Seen-set compacto: en memoria solo se guarda un hash de 64 bits por URL
+  (un int, no el string), así descartar los cientos de enlaces repetidos de
+  cada página no toca la base.
+- Prioridad: primero el tipo de página (home < categoría < producto), después
+  los fallos consecutivos, la antigüedad del último crawl (nunca visitadas
+  primero) y la profundidad. Una página solo vuelve a la cola cuando venció
+  su intervalo de revisita; tras MAX_FAILURES fallos seguidos se descarta.
+- Poda: al final de cada corrida, las páginas descartadas y las que llevan
+  STALE_DAYS sin un crawl exitoso (la cadena ya no las enlaza o el
+  presupuesto no las alcanza) salen de la frontera y su historial del
+  almacén, así el almacén no crece con cada página que se vio alguna vez.
+  Si vuelven a aparecer en un enlace, se redescubren.
+- Presupuesto: cada corrida visita a lo sumo budget páginas.
+
+Uso por línea de comandos:
+
+    python all_outerhtml_crawler.py --frontier --budget 200 --chains carrefour
+"""
+import os
+import time
+import heapq
+import sqlite3
+import hashlib
+import logging
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from colorama import Fore, Style
+
+from common.chains import get_chain, crawl_rules, specific_urls
+from common.browser_pool import build_browser_options, create_driver
+from common.outerhtml import extract_outerhtml, find_links, prepare_output_dirs
+from common.page_settle import SETTLE_PROFILES
+from common.snapshot_store import DEFAULT_KEEP, get_snapshot_store
+
+# Orden de prioridad por tipo de página (menor primero)
+PAGE_TYPE_RANK = {"home": 0, "categoria": 1, "producto": 2}
+
+# Intervalo mínimo entre dos visitas a la misma página, en horas
+REVISIT_HOURS = {"home": 6, "categoria": 24, "producto": 72}
+
+DEFAULT_BUDGET = 100
+DEFAULT_MAX_DEPTH = 4
+
+# Fallos consecutivos tras los que una página deja de encolarse
+MAX_FAILURES = 3
+
+# Días sin un crawl exitoso tras los que una página se poda
+STALE_DAYS = 30
+
+# Largo máximo del slug en los nombres de página
+MAX_SLUG = 80
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    hash INTEGER NOT NULL,
+    page_type TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    discovered_at REAL NOT NULL,
+    last_crawled REAL,
+    failures INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS pages_due ON pages (page_type, last_crawled);
+"""
+
+
+def url_hash(url):
+    """Hash de 64 bits (con signo, para SQLite INTEGER) de una URL normalizada"""
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+
+def normalize_url(url, keep_params=()):
+    """
+    Forma canónica de una URL para deduplicar.
+
+    Args:
+        url (str): URL absoluta.
+        keep_params (iterable): Parámetros de query que se conservan (ordenados).
+
+    Returns:
+        str: URL normalizada.
+    """
+    parts = urlsplit(url)
+    path = parts.path.lower().rstrip('/') or '/'
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if k in keep_params))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ''))
+
+
+def classify_url(path, rules):
+    """
+    Tipo de página de un path según chains.crawl_rules, o None si no se crawlea.
+    """
+    if path == '/':
+        return "home"
+    if rules["exclude"].search(path):
+        return None
+    for page_type, pattern in rules["patterns"]:
+        if pattern.search(path):
+            return page_type
+    return None
+
+
+def page_name_for(url, page_type):
+    """
+    Nombre de página para el almacén de snapshots, e.g. 'categoria_almacen-bebidas'.
+    El prefijo es el tipo, así page_settle elige el perfil de asentamiento correcto.
+    """
+    path = urlsplit(url).path.strip('/')
+    if not path:
+        return "home"
+    if page_type == "producto":
+        path = path[:-2].rstrip('/') if path.endswith('/p') else path
+    slug = path.lower().replace('/', '-')
+    if len(slug) > MAX_SLUG:
+        # El final del slug suele ser el SKU: se conserva, con un hash del path
+        # completo para que dos productos nunca compartan nombre
+        digest = hashlib.blake2b(slug.encode('utf-8'), digest_size=4).hexdigest()
+        tail = slug[-(MAX_SLUG // 2):].lstrip('-')
+        slug = f"{slug[:MAX_SLUG - len(tail) - len(digest) - 2].rstrip('-')}-{digest}-{tail}"
+    query = urlsplit(url).query
+    if query:
+        slug += '-' + hashlib.blake2b(query.encode('utf-8'), digest_size=4).hexdigest()
+    return f"{page_type}_{slug}"
+
+
+class Frontier:
+    """Frontera persistente de una cadena con cola de prioridad y seen-set"""
+
+    def __init__(self, code, db_path, max_depth=DEFAULT_MAX_DEPTH, revisit_hours=REVISIT_HOURS):
+        self.code = code
+        self.chain = get_chain(code)
+        self.rules = crawl_rules(code)
+        self.max_depth = max_depth
+        self.revisit_seconds = {t: h * 3600 for t, h in revisit_hours.items()}
+        self.lock = threading.Lock()
+
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self.seen = {row[0] for row in self.db.execute("SELECT hash FROM pages")}
+        self.heap = []
+        self._load_due()
+
+    def _priority(self, page_type, last_crawled, depth, failures=0):
+        return (PAGE_TYPE_RANK.get(page_type, len(PAGE_TYPE_RANK)), failures, last_crawled or 0.0, depth)
+
+    def _load_due(self):
+        """Encola las páginas cuyo intervalo de revisita venció (o nunca visitadas), salvo las que fallan siempre"""
+        now = time.time()
+        for url, page_type, depth, last_crawled, failures in self.db.execute(
+                "SELECT url, page_type, depth, last_crawled, failures FROM pages WHERE failures < ?", (MAX_FAILURES,)):
+            interval = self.revisit_seconds.get(page_type, max(self.revisit_seconds.values()))
+            if last_crawled is None or now - last_crawled >= interval:
+                self.heap.append((self._priority(page_type, last_crawled, depth, failures), url, page_type, depth))
+        heapq.heapify(self.heap)
+
+    def add(self, url, depth):
+        """
+        Agrega una URL si es de un tipo crawleable y no se vio antes.
+
+        Returns:
+            bool: True si entró a la frontera.
+        """
+        url = normalize_url(url, self.rules["query_params"])
+        parts = urlsplit(url)
+        if parts.netloc != self.chain["domain"] or depth > self.max_depth:
+            return False
+        page_type = classify_url(parts.path, self.rules)
+        if page_type is None:
+            return False
+
+        digest = url_hash(url)
+        with self.lock:
+            if digest in self.seen:
+                return False
+            self.seen.add(digest)
+            self.db.execute("INSERT OR IGNORE INTO pages (url, hash, page_type, depth, discovered_at) "
+                            "VALUES (?, ?, ?, ?, ?)", (url, digest, page_type, depth, time.time()))
+            heapq.heappush(self.heap, (self._priority(page_type, None, depth), url, page_type, depth))
+        return True
+
+    def seed(self):
+        """Siembra la home y las páginas clave de la cadena (no-op si ya están)"""
+        added = sum(self.add(url, 0) for url in specific_urls(self.code).values())
+        self.commit()
+        return added
+
+    def pop(self):
+        """
+        Returns:
+            tuple: (url, page_type, depth) de mayor prioridad, o None si la cola está vacía.
+        """
+        with self.lock:
+            return heapq.heappop(self.heap)[1:] if self.heap else None
+
+    def mark_crawled(self, url, ok):
+        with self.lock:
+            if ok:
+                self.db.execute("UPDATE pages SET last_crawled = ?, failures = 0 WHERE url = ?", (time.time(), url))
+            else:
+                self.db.execute("UPDATE pages SET failures = failures + 1 WHERE url = ?", (url,))
+
+    def commit(self):
+        with self.lock:
+            self.db.commit()
+
+    def prune(self, store, stale_days=STALE_DAYS):
+        """
+        Olvida las páginas descartadas por fallos o sin un crawl exitoso en
+        stale_days y borra su historial del almacén. Las páginas clave
+        (specific_urls) nunca se podan.
+
+        Returns:
+            int: Páginas podadas.
+        """
+        cutoff = time.time() - stale_days * 86400
+        key_urls = {normalize_url(url, self.rules["query_params"]) for url in specific_urls(self.code).values()}
+        with self.lock:
+            rows = [row for row in self.db.execute(
+                "SELECT url, hash, page_type FROM pages WHERE failures >= ? OR COALESCE(last_crawled, discovered_at) < ?",
+                (MAX_FAILURES, cutoff)) if row[0] not in key_urls]
+            self.db.executemany("DELETE FROM pages WHERE url = ?", [(url,) for url, _, _ in rows])
+            self.db.commit()
+            self.seen.difference_update(digest for _, digest, _ in rows)
+        for url, _, page_type in rows:
+            store.drop_page(page_name_for(url, page_type))
+        return len(rows)
+
+    def stats(self):
+        """
+        Returns:
+            dict: {page_type: {"known", "crawled", "dropped"}} más "queued".
+        """
+        with self.lock:
+            rows = self.db.execute("SELECT page_type, COUNT(*), COUNT(last_crawled), SUM(failures >= ?) "
+                                   "FROM pages GROUP BY page_type", (MAX_FAILURES,))
+            result = {page_type: {"known": known, "crawled": crawled, "dropped": dropped}
+                      for page_type, known, crawled, dropped in rows}
+            result["queued"] = len(self.heap)
+        return result
+
+    def close(self):
+        with self.lock:
+            self.db.commit()
+            self.db.close()
+
+
+def crawl_frontier(code, budget=DEFAULT_BUDGET, output_dir=None, browser="edge", settle_profiles=SETTLE_PROFILES,
+                   timer=None, keep=DEFAULT_KEEP, max_depth=DEFAULT_MAX_DEPTH):
+    """
+    Crawling por frontera de una cadena: visita hasta budget páginas en orden de
+    prioridad, guarda su outerHTML en el almacén y encola los enlaces nuevos.
+
+    Args:
+        code (str): Código de la cadena.
+        budget (int): Máximo de páginas a visitar en esta corrida.
+        output_dir (str): Directorio de salida (por defecto el de la cadena).
+        browser (str): "edge" o "firefox".
+        settle_profiles (dict): Timeouts por tipo de página.
+        timer (PhaseTimer): Registro opcional de tiempos de asentamiento.
+        keep (int): Versiones retenidas por página en el almacén.
+        max_depth (int): Profundidad máxima de descubrimiento desde la home.
+
+    Returns:
+        dict: {"chain", "visited", "ok", "discovered", "pruned", "elapsed", "frontier"}
+    """
+    output_dir, vault_dir = prepare_output_dirs(code, output_dir)
+    store = get_snapshot_store(code, output_dir, keep)
+    frontier = Frontier(code, os.path.join(output_dir, "frontier.sqlite"), max_depth)
+    frontier.seed()
+    base_url = get_chain(code)["base_url"]
+
+    visited = ok = discovered = 0
+    started = time.time()
+    driver = None
+    try:
+        while visited < budget:
+            job = frontier.pop()
+            if job is None:
+                break
+            url, page_type, depth = job
+            if driver is None:
+                driver = create_driver(browser, build_browser_options(browser))
+
+            visited += 1
+            path = extract_outerhtml(driver, url, output_dir, vault_dir, page_name_for(url, page_type),
+                                     settle_profiles, timer, store, chain=code)
+            if path:
+                ok += 1
+                # Un solo execute_script trae todos los href; el filtro fino lo hace la frontera
+                new_links = sum(frontier.add(link, depth + 1) for link in find_links(driver, base_url, ['/']))
+                discovered += new_links
+                logging.info(f"{code}: {url} ({page_type}, profundidad {depth}) -> {new_links} enlaces nuevos")
+            frontier.mark_crawled(url, bool(path))
+            frontier.commit()
+    finally:
+        if driver is not None:
+            driver.quit()
+        pruned = frontier.prune(store)
+        stats = frontier.stats()
+        frontier.close()
+
+    elapsed = time.time() - started
+    print(f"{Fore.CYAN}{get_chain(code)['name']}: {ok}/{visited} páginas, {discovered} nuevas en la frontera, "
+          f"{stats['queued']} pendientes, {pruned} podadas ({elapsed:.1f}s){Style.RESET_ALL}")
+    for page_type, counts in stats.items():
+        if page_type != "queued":
+            print(f"  {page_type}: {counts['crawled']}/{counts['known']} visitadas, "
+                  f"{counts['dropped']} descartadas por fallos")
+    report = {"chain": code, "visited": visited, "ok": ok, "discovered": discovered, "pruned": pruned,
+              "elapsed": elapsed, "frontier": stats}
+    logging.info(f"Crawling por frontera terminado: {report}")
+    return report
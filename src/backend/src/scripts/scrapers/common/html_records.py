@@ -0,0 +1,276 @@
+"""
+Extracción en streaming de registros desde snapshots de outerHTML.
+
+Las páginas de categoría guardadas por extract_outerhtml pesan varios MB;
+cargarlas enteras y armar el DOM completo (lxml/BeautifulSoup) multiplica ese
+tamaño en memoria. Este módulo alimenta un HTMLParser de la stdlib de a
+bloques (chunk_size) y va emitiendo registros a medida que se cierran los
+elementos, así la memoria queda acotada por la profundidad del documento y
+el tamaño del bloque, no por el tamaño del archivo.
+
+Registros (dicts, uno por línea en la salida JSON lines):
+
+- product: tarjeta de producto VTEX (product-summary container) con name,
+  brand, sellingPrice, listPrice y href;
+- filter: opción de un filtro de búsqueda (facet = modificador de
+  filter__container, e.g. 'tipo-de-producto'; value = texto del label);
+- link: cada <a href> de la página con su texto.
+
+Las clases VTEX tienen la forma <app>-<versión>-x-<nombre>[--<modificador>],
+así que las reglas se aplican sobre <nombre> y no dependen del prefijo de cada
+cadena (vtex-, valtech-carrefourar-, ...).
+
+Uso por línea de comandos (un proceso por archivo):
+
+    python common/html_records.py carrefour/HTML_crawler --out registros --workers 4
+    python common/html_records.py carrefour/HTML_crawler/vault --kinds product filter
+"""
+import os
+import re
+import json
+import glob
+import logging
+import argparse
+from collections import deque
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+RECORD_KINDS = ("product", "filter", "link")
+DEFAULT_CHUNK_SIZE = 65536
+
+# Tope de texto acumulado por campo, para que un elemento gigante no rompa la cota de memoria
+MAX_TEXT = 500
+
+VTEX_CLASS = re.compile(r"^(?P<app>[\w-]+?)-\d+-x-(?P<name>[\w]+?)(?:--(?P<modifier>[\w-]+))?$")
+
+# <nombre> de clase VTEX -> campo de la tarjeta de producto
+CARD_FIELDS = {
+    "productBrand": "name",
+    "productNameContainer": "name",
+    "productBrandName": "brand",
+    "sellingPriceValue": "sellingPrice",
+    "listPriceValue": "listPrice",
+}
+CARD_PRICE_FIELDS = ("sellingPrice", "listPrice")
+FILTER_LABEL_CLASS = "vtex-checkbox__label"
+
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source",
+                 "track", "wbr"}
+
+
+def parse_price(text):
+    """
+    Precio con formato argentino ('$ 1.234,56') a float, o None.
+    """
+    if not text:
+        return None
+    digits = re.sub(r"[^\d,.]", "", text).replace(".", "").replace(",", ".")
+    try:
+        return float(digits)
+    except ValueError:
+        return None
+
+
+class RecordParser(HTMLParser):
+    """
+    HTMLParser que emite registros al cerrar cada tarjeta, label de filtro o enlace.
+    Los registros listos quedan en self.records (deque) hasta que se consumen.
+    """
+
+    def __init__(self, kinds=RECORD_KINDS, base_url=None):
+        super().__init__(convert_charrefs=True)
+        self.kinds = set(kinds)
+        self.base_url = base_url
+        self.records = deque()
+        self.stack = []        # [(tag, roles)] de los elementos abiertos
+        self.captures = {}     # clave -> partes de texto acumuladas
+        self.card = None
+        self.facet = None
+        self.link = None
+
+    def _href(self, href):
+        return urljoin(self.base_url, href) if self.base_url else href
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        roles = []
+        for token in (attrs.get("class") or "").split():
+            if token == FILTER_LABEL_CLASS and self.facet is not None and "filter" in self.kinds:
+                roles.append(("capture", "filter_label"))
+                continue
+            match = VTEX_CLASS.match(token)
+            if not match:
+                continue
+            name = match.group("name")
+            if name == "container" and match.group("app").endswith("product-summary") and self.card is None \
+                    and "product" in self.kinds:
+                self.card = {"type": "product"}
+                roles.append(("card", None))
+            elif name in CARD_FIELDS and self.card is not None and CARD_FIELDS[name] not in self.card \
+                    and CARD_FIELDS[name] not in self.captures:
+                roles.append(("capture", CARD_FIELDS[name]))
+            elif name == "filter__container" and match.group("modifier"):
+                self.facet = match.group("modifier")
+                roles.append(("filter", None))
+
+        href = attrs.get("href")
+        if tag == "a" and href:
+            if self.card is not None and "href" not in self.card:
+                self.card["href"] = self._href(href)
+            if "link" in self.kinds and self.link is None:
+                self.link = {"type": "link", "href": self._href(href)}
+                roles.append(("capture", "link"))
+
+        for role, key in roles:
+            if role == "capture":
+                self.captures[key] = []
+
+        if tag in VOID_ELEMENTS:
+            self._close(roles)
+        else:
+            self.stack.append((tag, roles))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self._close(self.stack.pop()[1])
+
+    def handle_endtag(self, tag):
+        # Etiquetas de cierre sin apertura (HTML roto) se ignoran
+        if not any(open_tag == tag for open_tag, _ in self.stack):
+            return
+        while self.stack:
+            open_tag, roles = self.stack.pop()
+            self._close(roles)
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        for parts in self.captures.values():
+            if sum(len(p) for p in parts) < MAX_TEXT:
+                parts.append(data)
+
+    def _text(self, key):
+        return " ".join("".join(self.captures.pop(key, [])).split())[:MAX_TEXT]
+
+    def _close(self, roles):
+        for role, key in roles:
+            if role == "capture" and key == "link":
+                self.link["text"] = self._text("link")
+                self.records.append(self.link)
+                self.link = None
+            elif role == "capture" and key == "filter_label":
+                value = self._text("filter_label")
+                if value:
+                    self.records.append({"type": "filter", "facet": self.facet, "value": value})
+            elif role == "capture":
+                self.card[key] = self._text(key)
+            elif role == "card":
+                for field in CARD_PRICE_FIELDS:
+                    if field in self.card:
+                        self.card[field] = parse_price(self.card[field])
+                self.records.append(self.card)
+                self.card = None
+            elif role == "filter":
+                self.facet = None
+
+
+def iter_records(source, kinds=RECORD_KINDS, base_url=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Registros de un snapshot, leído de a bloques.
+
+    Args:
+        source (str | file): Ruta del .html o archivo de texto abierto.
+        kinds (iterable): Tipos de registro a emitir (product, filter, link).
+        base_url (str): Si se pasa, los href relativos se resuelven contra ella.
+        chunk_size (int): Caracteres por bloque.
+
+    Yields:
+        dict: Registro con "type".
+    """
+    parser = RecordParser(kinds, base_url)
+    close = False
+    if isinstance(source, str):
+        source = open(source, "r", encoding="utf-8", errors="replace")
+        close = True
+    try:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            while parser.records:
+                yield parser.records.popleft()
+        parser.close()
+        while parser.records:
+            yield parser.records.popleft()
+    finally:
+        if close:
+            source.close()
+
+
+def process_file(path, out_dir, kinds=RECORD_KINDS, base_url=None):
+    """
+    Escribe los registros de un snapshot en <out_dir>/<nombre>.jsonl.
+
+    Returns:
+        tuple: (path, {tipo: cantidad})
+    """
+    counts = dict.fromkeys(kinds, 0)
+    out_path = os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0] + ".jsonl")
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        for record in iter_records(path, kinds, base_url):
+            record["source"] = os.path.basename(path)
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            counts[record["type"]] += 1
+    os.replace(tmp_path, out_path)
+    return path, counts
+
+
+def process_directory(directory, out_dir, workers=None, kinds=RECORD_KINDS, base_url=None, pattern="**/*.html"):
+    """
+    Procesa todos los snapshots de un directorio en paralelo (un proceso por archivo).
+
+    Args:
+        directory (str): Directorio con los .html (incluye subdirectorios, e.g. vault/).
+        out_dir (str): Directorio de salida de los .jsonl.
+        workers (int): Procesos simultáneos (por defecto, uno por CPU).
+
+    Returns:
+        dict: {"files", "failed", "records": {tipo: cantidad}}
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = sorted(glob.glob(os.path.join(directory, pattern), recursive=True))
+    totals = dict.fromkeys(kinds, 0)
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(process_file, path, out_dir, tuple(kinds), base_url): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                path, counts = future.result()
+            except Exception as e:
+                failed += 1
+                logging.error(f"Error procesando {futures[future]}: {e}")
+                continue
+            for kind, count in counts.items():
+                totals[kind] += count
+            print(f"{os.path.basename(path)}: " + ", ".join(f"{count} {kind}" for kind, count in counts.items()))
+    return {"files": len(paths), "failed": failed, "records": totals}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extrae productos, filtros y enlaces de snapshots de outerHTML")
+    parser.add_argument("directory", help="Directorio con los snapshots .html")
+    parser.add_argument("--out", default="registros", help="Directorio de salida (un .jsonl por snapshot)")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos simultáneos (por defecto, uno por CPU)")
+    parser.add_argument("--kinds", nargs="+", choices=RECORD_KINDS, default=list(RECORD_KINDS))
+    parser.add_argument("--base-url", help="Resolver los href relativos contra esta URL")
+    parser.add_argument("--pattern", default="**/*.html", help="Patrón glob dentro del directorio")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    summary = process_directory(args.directory, args.out, args.workers, args.kinds, args.base_url, args.pattern)
+    print(f"{summary['files']} archivos ({summary['failed']} con error): "
+          + ", ".join(f"{count} {kind}" for kind, count in summary["records"].items()))
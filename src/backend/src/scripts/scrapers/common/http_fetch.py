@@ -0,0 +1,114 @@
+"""
+HTTP-first homepage fetcher for the supermarket-info scrapers.
+
+Everything the supermarket-info extractors read (title, meta description,
+og:image, favicon, manifest, theme-color, script srcs, footer links) is in the
+server-rendered HTML of the VTEX storefronts, so a plain GET parsed with
+parse_page_snapshot() gives the same snapshot as a browser session, in a
+fraction of the time. All chains are fetched concurrently with aiohttp.
+
+A snapshot missing any of REQUIRED_FIELDS (e.g. a bot wall or a client-only
+render) is reported as incomplete and the caller falls back to Selenium.
+
+fetch_homepage_snapshots() accepts explicit URLs per chain, so it can be pointed
+at a local stand-in (common/snapshot_server.py) serving saved outerHTML.
+"""
+import time
+import asyncio
+import logging
+
+from common.chains import get_chain
+from common.page_snapshot import parse_page_snapshot, supermarket_info_fields
+
+# Snapshot values without which the HTTP result is not trusted
+REQUIRED_FIELDS = ("title", "metaDescription", "favicon")
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "es-AR,es;q=0.9,en;q=0.5",
+}
+
+
+def missing_required_fields(snapshot, required=REQUIRED_FIELDS):
+    """
+    Required values absent from a snapshot.
+
+    Args:
+        snapshot (dict): Page snapshot.
+        required (tuple): Keys of snapshot["fields"]; "title" and "scripts"
+            refer to the top-level snapshot values.
+
+    Returns:
+        list: Missing keys (empty when the snapshot is complete).
+    """
+    missing = []
+    for key in required:
+        value = snapshot.get(key) if key in ("title", "scripts") else snapshot.get("fields", {}).get(key)
+        if not value:
+            missing.append(key)
+    return missing
+
+
+async def _fetch_one(session, code, url, base_url, fields, required):
+    started = time.time()
+    async with session.get(url) as response:
+        if response.status != 200:
+            raise Exception(f"HTTP {response.status} for {url}")
+        html = await response.text(errors='replace')
+        validators = {}
+        if response.headers.get("ETag"):
+            validators["homepageEtag"] = response.headers["ETag"]
+        if response.headers.get("Last-Modified"):
+            validators["homepageLastModified"] = response.headers["Last-Modified"]
+
+    # lxml parsing is CPU bound: keep it off the event loop
+    snapshot = await asyncio.get_running_loop().run_in_executor(
+        None, parse_page_snapshot, html, fields, base_url
+    )
+    snapshot["source"] = url
+    snapshot["httpValidators"] = validators
+    snapshot["missing"] = missing_required_fields(snapshot, required)
+    logging.info(
+        f"{code}: fetched {url} over HTTP in {time.time() - started:.2f}s "
+        f"({len(html)} chars, missing: {snapshot['missing'] or 'none'})"
+    )
+    return snapshot
+
+
+async def fetch_homepage_snapshots_async(codes, urls=None, concurrency=10, timeout=15, required=REQUIRED_FIELDS):
+    """
+    Fetch and parse the homepage of several chains concurrently.
+
+    Args:
+        codes (list): Chain codes.
+        urls (dict): {code: url} overrides (e.g. a local stand-in); links are
+            still resolved against the chain's real base URL.
+        concurrency (int): Maximum simultaneous connections.
+        timeout (int): Total timeout per request, in seconds.
+        required (tuple): See missing_required_fields().
+
+    Returns:
+        dict: {code: snapshot | Exception}
+    """
+    import aiohttp
+
+    urls = urls or {}
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout, headers=DEFAULT_HEADERS) as session:
+        tasks = []
+        for code in codes:
+            chain = get_chain(code)
+            base_url = chain["base_url"] + "/"
+            fields = supermarket_info_fields(chain["logo_alt"])
+            tasks.append(_fetch_one(session, code, urls.get(code, base_url), base_url, fields, required))
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    return dict(zip(codes, results))
+
+
+def fetch_homepage_snapshots(codes, urls=None, concurrency=10, timeout=15, required=REQUIRED_FIELDS):
+    """Blocking wrapper around fetch_homepage_snapshots_async()"""
+    return asyncio.run(fetch_homepage_snapshots_async(codes, urls, concurrency, timeout, required))
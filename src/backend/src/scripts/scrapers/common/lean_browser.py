@@ -0,0 +1,413 @@
+"""
+Lean browser profile: skip everything the scrapers never read.
+
+Crawlers only keep the DOM, yet a VTEX catalog page also pulls product images,
+web fonts, video and a dozen third-party scripts (Dynamic Yield, GTM, Facebook,
+Hotjar...). The lean profile cuts that at two levels:
+
+- browser prefs: images, web fonts and media are disabled in the profile
+  itself (Firefox prefs; blink settings/content prefs for Edge);
+- a local filtering proxy: every request goes through FilterProxy, which only
+  lets through hosts on the allowlist (the chain's own domain, the VTEX
+  platform hosts and chains.lean_allowlist) and always refuses
+  BLOCKED_DOMAINS. HTTPS is tunnelled (CONNECT), so filtering is by host;
+  the proxy also counts the bytes each host transferred.
+
+Enable it with SCRAPER_LEAN_BROWSER=1 (or --lean in all_outerhtml_crawler.py
+and the browser pool daemon); build_browser_options() then returns lean
+options. SupermarketInfoScraper keeps its own full profile because tracker
+detection needs the third-party scripts to load.
+
+Measure the difference for a chain's pages, before (same proxy, nothing
+blocked) and after:
+
+    python common/lean_browser.py --chains carrefour --pages categoria_almacen home --browser firefox
+"""
+import os
+import sys
+import time
+import socket
+import logging
+import argparse
+import selectors
+import threading
+import http.client
+from urllib.parse import urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.chains import CHAINS, lean_allowlist, specific_urls
+
+LEAN_ENV = "SCRAPER_LEAN_BROWSER"
+
+# VTEX platform hosts every chain needs for its data calls (search, catalog, checkout APIs)
+VTEX_HOSTS = ("vtexassets.com", "vteximg.com.br", "vtexcommercestable.com.br", "vtex.com.br", "vtex.com",
+              "myvtex.com", "vtexcommerce.com.br")
+
+# Refused even when an allowlisted suffix would match
+BLOCKED_DOMAINS = (
+    "dynamicyield.com", "dy-api.com", "googletagmanager.com", "google-analytics.com", "analytics.google.com",
+    "doubleclick.net", "googleadservices.com", "facebook.net", "facebook.com", "connect.facebook.net",
+    "hotjar.com", "hotjar.io", "cookielaw.org", "onetrust.com", "clarity.ms", "tiktok.com", "criteo.com",
+    "criteo.net", "youtube.com", "ytimg.com",
+)
+
+FIREFOX_LEAN_PREFS = {
+    "permissions.default.image": 2,
+    "gfx.downloadable_fonts.enabled": False,
+    "browser.display.use_document_fonts": 0,
+    "media.autoplay.default": 5,
+    "media.preload.default": 0,
+    "media.preload.auto": 0,
+    "media.peerconnection.enabled": False,
+    "network.prefetch-next": False,
+    "network.dns.disablePrefetch": True,
+    "network.http.speculative-parallel-limit": 0,
+}
+
+EDGE_LEAN_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.managed_default_content_settings.media_stream": 2,
+}
+
+BUFFER_SIZE = 65536
+
+
+def host_matches(host, suffixes):
+    """True if host is one of suffixes or a subdomain of one"""
+    host = host.lower().rstrip('.')
+    return any(host == suffix or host.endswith('.' + suffix) for suffix in suffixes)
+
+
+class FilterProxyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_CONNECT(self):
+        host, _, port = self.path.rpartition(':')
+        if not self.server.allows(host):
+            self._refuse(host)
+            return
+        try:
+            upstream = socket.create_connection((host, int(port or 443)), timeout=self.server.timeout_s)
+        except OSError as e:
+            self.send_error(502, f"Upstream unreachable: {e}")
+            return
+
+        self.send_response(200, "Connection Established")
+        self.end_headers()
+        self.close_connection = True
+        self._tunnel(upstream, host)
+
+    def _tunnel(self, upstream, host):
+        sel = selectors.DefaultSelector()
+        sel.register(self.connection, selectors.EVENT_READ, upstream)
+        sel.register(upstream, selectors.EVENT_READ, self.connection)
+        self.server.count(host, 0)
+        try:
+            while True:
+                events = sel.select(timeout=self.server.timeout_s)
+                if not events:
+                    break
+                for key, _ in events:
+                    data = key.fileobj.recv(BUFFER_SIZE)
+                    if not data:
+                        return
+                    key.data.sendall(data)
+                    # Counted as it flows: keep-alive tunnels outlive the page that opened them
+                    self.server.count(host, len(data), requests=0)
+        except OSError:
+            pass
+        finally:
+            sel.close()
+            upstream.close()
+
+    def _forward(self):
+        # Plain-HTTP requests arrive with an absolute URI
+        parts = urlsplit(self.path)
+        host = parts.hostname or ""
+        if not self.server.allows(host):
+            self._refuse(host)
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else None
+        headers = {k: v for k, v in self.headers.items()
+                   if k.lower() not in ("proxy-connection", "connection", "keep-alive")}
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        try:
+            upstream = http.client.HTTPConnection(host, parts.port or 80, timeout=self.server.timeout_s)
+            upstream.request(self.command, path, body, headers)
+            response = upstream.getresponse()
+            data = response.read()
+        except OSError as e:
+            self.send_error(502, f"Upstream error: {e}")
+            return
+
+        self.send_response(response.status, response.reason)
+        for key, value in response.getheaders():
+            if key.lower() not in ("transfer-encoding", "connection", "content-length"):
+                self.send_header(key, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(data)
+        self.close_connection = True
+        upstream.close()
+        self.server.count(host, len(data) + (length or 0))
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = do_OPTIONS = do_PATCH = _forward
+
+    def _refuse(self, host):
+        self.server.count_blocked(host)
+        self.send_response(403, "Blocked by lean profile")
+        self.send_header("Content-Length", "0")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        logging.debug(f"lean proxy: {format % args}")
+
+
+class FilterProxy(ThreadingHTTPServer):
+    """
+    Local forward proxy that only allows allowlisted hosts and counts bytes per host.
+
+    Args:
+        allowlist (iterable): Allowed host suffixes.
+        blocked (iterable): Host suffixes always refused.
+        enforce (bool): False lets everything through (only counts); used as the baseline.
+    """
+    daemon_threads = True
+
+    def __init__(self, allowlist, blocked=BLOCKED_DOMAINS, enforce=True, host="127.0.0.1", port=0, timeout_s=30):
+        super().__init__((host, port), FilterProxyHandler)
+        self.allowlist = tuple(allowlist)
+        self.blocked = tuple(blocked)
+        self.enforce = enforce
+        self.timeout_s = timeout_s
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def allows(self, host):
+        if not self.enforce:
+            return True
+        return not host_matches(host, self.blocked) and host_matches(host, self.allowlist)
+
+    def count(self, host, transferred, requests=1):
+        with self.lock:
+            entry = self.hosts.setdefault(host, {"requests": 0, "bytes": 0})
+            entry["requests"] += requests
+            entry["bytes"] += transferred
+
+    def count_blocked(self, host):
+        with self.lock:
+            self.blocked_hosts[host] = self.blocked_hosts.get(host, 0) + 1
+
+    def reset_stats(self):
+        with self.lock:
+            self.hosts = {}
+            self.blocked_hosts = {}
+
+    def stats(self):
+        """
+        Returns:
+            dict: {"bytes", "connections", "blocked", "hosts": {host: {"requests", "bytes"}},
+                "blockedHosts": {host: count}}
+        """
+        with self.lock:
+            return {
+                "bytes": sum(h["bytes"] for h in self.hosts.values()),
+                "connections": sum(h["requests"] for h in self.hosts.values()),
+                "blocked": sum(self.blocked_hosts.values()),
+                "hosts": {host: dict(entry) for host, entry in self.hosts.items()},
+                "blockedHosts": dict(self.blocked_hosts),
+            }
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="lean-proxy", daemon=True).start()
+        return self
+
+
+def chains_allowlist(codes=None):
+    """Union of the allowlists of the given chains (all by default) plus the VTEX hosts"""
+    hosts = list(VTEX_HOSTS)
+    for code in codes or CHAINS:
+        hosts.extend(lean_allowlist(code))
+    return tuple(dict.fromkeys(hosts))
+
+
+_proxies = {}
+_proxies_lock = threading.Lock()
+
+
+def get_filter_proxy(codes=None):
+    """
+    Shared filtering proxy for a set of chains (one per process, started on first use).
+    """
+    key = tuple(sorted(codes or CHAINS))
+    with _proxies_lock:
+        if key not in _proxies:
+            _proxies[key] = FilterProxy(chains_allowlist(key)).start()
+            logging.info(f"Lean proxy for {', '.join(key)} listening on {_proxies[key].url}")
+        return _proxies[key]
+
+
+def lean_enabled():
+    """True if SCRAPER_LEAN_BROWSER asks for the lean profile"""
+    return os.environ.get(LEAN_ENV, "").lower() in ("1", "true", "yes")
+
+
+def route_through_proxy(options, browser, proxy_url):
+    """Point Firefox or Edge options at an HTTP(S) proxy (loopback stays direct)"""
+    proxy = urlsplit(proxy_url)
+    if browser == "firefox":
+        options.set_preference("network.proxy.type", 1)
+        for scheme in ("http", "ssl"):
+            options.set_preference(f"network.proxy.{scheme}", proxy.hostname)
+            options.set_preference(f"network.proxy.{scheme}_port", proxy.port)
+    elif browser == "edge":
+        options.add_argument(f"--proxy-server={proxy_url}")
+    else:
+        raise ValueError(f"Unsupported browser '{browser}' (use 'firefox' or 'edge')")
+    return options
+
+
+def apply_lean_profile(options, browser, proxy_url=None, codes=None):
+    """
+    Add the lean prefs and route the browser through the filtering proxy.
+
+    Args:
+        options: Selenium Firefox or Edge options (modified in place).
+        browser (str): "firefox" or "edge".
+        proxy_url (str): Proxy to use; by default the shared proxy for codes.
+        codes (list): Chains whose allowlists apply (all by default).
+
+    Returns:
+        The same options.
+    """
+    if browser == "firefox":
+        for name, value in FIREFOX_LEAN_PREFS.items():
+            options.set_preference(name, value)
+    elif browser == "edge":
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_experimental_option("prefs", EDGE_LEAN_PREFS)
+    return route_through_proxy(options, browser, proxy_url or get_filter_proxy(codes).url)
+
+
+# Navigation timing of the current page (transferSize is 0 for cross-origin resources
+# without Timing-Allow-Origin, so proxy byte counts are the reliable number)
+PAGE_METRICS_SCRIPT = """
+var nav = performance.getEntriesByType('navigation')[0] || {};
+var resources = performance.getEntriesByType('resource');
+var bytes = nav.transferSize || 0;
+for (var i = 0; i < resources.length; i++) { bytes += resources[i].transferSize || 0; }
+return {
+    domContentLoadedMs: nav.domContentLoadedEventEnd || 0,
+    loadMs: nav.loadEventEnd || performance.now(),
+    resources: resources.length,
+    timedBytes: bytes
+};
+"""
+
+
+def measure_page_load(driver, url, proxy=None):
+    """
+    Load a page and report its load time and bytes transferred.
+
+    Returns:
+        dict: {"url", "wallMs", "loadMs", "domContentLoadedMs", "resources", "timedBytes",
+            and with a proxy "proxyBytes", "blocked"}
+    """
+    if proxy is not None:
+        proxy.reset_stats()
+    started = time.perf_counter()
+    driver.get(url)
+    result = {"url": url, "wallMs": (time.perf_counter() - started) * 1000}
+    result.update(driver.execute_script(PAGE_METRICS_SCRIPT) or {})
+    if proxy is not None:
+        # Tunnel bytes are counted as they flow, so this is what moved until the load event
+        stats = proxy.stats()
+        result["proxyBytes"] = stats["bytes"]
+        result["blocked"] = stats["blocked"]
+    return result
+
+
+def benchmark(codes, pages, browser="firefox", runs=1):
+    """
+    Load each page with the regular profile and with the lean one and compare.
+
+    Both runs go through a FilterProxy so bytes are counted the same way; the
+    baseline proxy does not block anything.
+
+    Returns:
+        list: [{"chain", "page", "profile", "wallMs", "loadMs", "proxyBytes", ...}]
+    """
+    from common.browser_pool import build_browser_options, _start_local_browser
+
+    rows = []
+    for profile in ("regular", "lean"):
+        proxy = FilterProxy(chains_allowlist(codes), enforce=(profile == "lean")).start()
+        options = build_browser_options(browser, lean=False)
+        if profile == "lean":
+            apply_lean_profile(options, browser, proxy.url)
+        else:
+            route_through_proxy(options, browser, proxy.url)  # Same proxy hop, nothing blocked
+
+        driver = _start_local_browser(browser, options)
+        try:
+            for code in codes:
+                urls = specific_urls(code)
+                for page in pages:
+                    if page not in urls:
+                        continue
+                    for run in range(runs):
+                        row = measure_page_load(driver, urls[page], proxy)
+                        rows.append({"chain": code, "page": page, "profile": profile, "run": run, **row})
+        finally:
+            driver.quit()
+            proxy.shutdown()
+            proxy.server_close()
+    return rows
+
+
+def print_benchmark(rows):
+    """Per-page before/after table with the speedup and byte reduction"""
+    by_page = {}
+    for row in rows:
+        by_page.setdefault((row["chain"], row["page"]), {}).setdefault(row["profile"], []).append(row)
+
+    print(f"{'page':<36} {'regular ms':>11} {'lean ms':>9} {'speedup':>8} {'regular KB':>11} {'lean KB':>9} {'blocked':>8}")
+    for (code, page), profiles in by_page.items():
+        if "regular" not in profiles or "lean" not in profiles:
+            continue
+        avg = lambda items, key: sum(r.get(key, 0) for r in items) / len(items)
+        regular_ms, lean_ms = avg(profiles["regular"], "wallMs"), avg(profiles["lean"], "wallMs")
+        regular_kb, lean_kb = avg(profiles["regular"], "proxyBytes") / 1024, avg(profiles["lean"], "proxyBytes") / 1024
+        speedup = regular_ms / lean_ms if lean_ms else 0.0
+        print(f"{code + '/' + page:<36} {regular_ms:>11.0f} {lean_ms:>9.0f} {speedup:>7.1f}x "
+              f"{regular_kb:>11.0f} {lean_kb:>9.0f} {avg(profiles['lean'], 'blocked'):>8.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare page loads with the regular and the lean browser profile")
+    parser.add_argument("--chains", nargs="+", choices=list(CHAINS), default=["carrefour"])
+    parser.add_argument("--pages", nargs="+", default=["categoria_almacen", "home"],
+                        help="Page names from chains.specific_urls")
+    parser.add_argument("--browser", choices=["firefox", "edge"], default="firefox")
+    parser.add_argument("--runs", type=int, default=2, help="Loads per page and profile")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    results = benchmark(args.chains, args.pages, args.browser, args.runs)
+    print_benchmark(results)
+    for row in results:
+        logging.info(f"Lean benchmark: {row}")
@@ -0,0 +1,355 @@
+"""
+Direct MongoDB bulk writer for the raw per-chain databases.
+
+Going through the Node REST API means one HTTP round trip (and one Mongoose
+save) per document, which does not scale to full catalogs and daily price
+rows. This writer talks to MongoDB directly with pymongo: documents are
+buffered and sent as unordered bulk_write batches of
+UpdateOne(filter by key, upsert=True), cut when a batch reaches batch_docs
+documents or batch_bytes of BSON, and written by a few threads per chain.
+
+Each chain goes to its own database, resolved like server.js does:
+MONGO_<CODE>_URI (e.g. MONGO_CARREFOUR_URI), default
+mongodb://localhost:27017/<code>_raw. Collections are the ones Mongoose
+creates for the raw models (Product -> products, PriceHistory ->
+pricehistories).
+
+Every batch records its size, latency and outcome; stats() sums them up with
+latency percentiles and documents per second.
+
+Both writers follow the vtex_catalog writer protocol (write_many/close):
+
+    python common/vtex_catalog.py ingest --chains carrefour dia --mongo
+    python common/mongo_writer.py --chains carrefour --docs 100000 --batch-docs 1000 --workers 4
+"""
+import os
+import sys
+import time
+import queue
+import random
+import logging
+import argparse
+import threading
+from datetime import datetime, timezone
+
+import bson
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.chains import CHAINS
+
+PRODUCTS_COLLECTION = "products"
+PRICE_HISTORY_COLLECTION = "pricehistories"
+
+DEFAULT_BATCH_DOCS = 1000
+DEFAULT_BATCH_BYTES = 8 * 1024 * 1024
+DEFAULT_WORKERS = 2
+
+# Unique sparse fields of the <chain>Product models: a sparse index skips missing
+# fields but not nulls, so a second null would be a duplicate key
+SPARSE_UNIQUE_FIELDS = ("ean", "sku")
+
+
+def mongo_uri(code):
+    """Connection string of a chain's raw database (same env vars and defaults as server.js)"""
+    return os.environ.get(f"MONGO_{code.upper()}_URI", f"mongodb://localhost:27017/{code}_raw")
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class MongoBulkWriter:
+    """
+    Args:
+        code (str): Chain code; selects the database (see mongo_uri).
+        collection (str): Target collection.
+        key (str): Field the upserts match on (unique in the model, e.g. sku).
+        batch_docs (int): Maximum documents per bulk_write.
+        batch_bytes (int): Maximum BSON bytes per bulk_write.
+        workers (int): Writer threads.
+        uri (str): Connection string override.
+        client (MongoClient): Shared client (the URI's database is still used).
+        after_write (callable): Called with each batch's documents once the batch is written
+            (from the writer thread), e.g. PriceHistoryRecorder.record_many.
+    """
+
+    def __init__(self, code, collection=PRODUCTS_COLLECTION, key="sku", batch_docs=DEFAULT_BATCH_DOCS,
+                 batch_bytes=DEFAULT_BATCH_BYTES, workers=DEFAULT_WORKERS, uri=None, client=None, after_write=None):
+        self.code = code
+        self.key = key
+        self.after_write = after_write
+        self.batch_docs = batch_docs
+        self.batch_bytes = batch_bytes
+        self.uri = uri or mongo_uri(code)
+        self.own_client = client is None
+        self.client = client or MongoClient(self.uri, maxPoolSize=workers + 1, serverSelectionTimeoutMS=5000)
+        self.collection = self.client.get_default_database(f"{code}_raw")[collection]
+
+        self.lock = threading.Lock()
+        self.buffer = []
+        self.buffer_bytes = 0
+        self.batches = []
+        self.skipped = 0
+        self.errors = 0
+        self.started = None
+
+        # Bounded: a slow database slows the producer down instead of filling memory
+        self.queue = queue.Queue(maxsize=workers * 2)
+        self.threads = [
+            threading.Thread(target=self._worker, name=f"mongo-writer-{code}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def ensure_index(self):
+        """Unique sparse index on the key, as the Mongoose model declares it"""
+        self.collection.create_index(self.key, unique=True, sparse=True)
+
+    def write(self, document):
+        self.write_many([document])
+
+    def write_many(self, documents):
+        ready = []
+        with self.lock:
+            if self.started is None:
+                self.started = time.time()
+            for document in documents:
+                if document.get(self.key) is None:
+                    self.skipped += 1
+                    continue
+                size = len(bson.encode(document))
+                if self.buffer and (len(self.buffer) >= self.batch_docs or self.buffer_bytes + size > self.batch_bytes):
+                    ready.append((self.buffer, self.buffer_bytes))
+                    self.buffer, self.buffer_bytes = [], 0
+                self.buffer.append(document)
+                self.buffer_bytes += size
+        # Outside the lock: put() blocks while the workers are behind
+        for batch in ready:
+            self.queue.put(batch)
+
+    def flush(self):
+        """Send the partial batch and wait until every queued batch is written"""
+        with self.lock:
+            batch, self.buffer, self.buffer_bytes = (self.buffer, self.buffer_bytes), [], 0
+        if batch[0]:
+            self.queue.put(batch)
+        self.queue.join()
+
+    def _operations(self, documents, now):
+        operations = []
+        for document in documents:
+            fields = {name: value for name, value in document.items() if name not in ("_id", "createdAt")}
+            unset = {name: "" for name in SPARSE_UNIQUE_FIELDS if name in fields and fields[name] is None}
+            for name in unset:
+                del fields[name]
+            fields["updatedAt"] = now
+            update = {"$set": fields, "$setOnInsert": {"createdAt": now}}
+            if unset:
+                update["$unset"] = unset
+            operations.append(UpdateOne({self.key: document[self.key]}, update, upsert=True))
+        return operations
+
+    def _worker(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                documents, size = item
+                self._write_batch(documents, size)
+            finally:
+                self.queue.task_done()
+
+    def _write_batch(self, documents, size):
+        started = time.time()
+        record = {"docs": len(documents), "bytes": size, "inserted": 0, "upserted": 0, "modified": 0, "errors": 0}
+        try:
+            operations = self._operations(documents, datetime.now(timezone.utc))
+            if operations:
+                result = self.collection.bulk_write(operations, ordered=False)
+                record["inserted"] = result.inserted_count
+                record["upserted"] = result.upserted_count
+                record["modified"] = result.modified_count
+        except BulkWriteError as e:
+            # Unordered: the rest of the batch was still written
+            details = e.details or {}
+            record["inserted"] = details.get("nInserted", 0)
+            record["upserted"] = details.get("nUpserted", 0)
+            record["modified"] = details.get("nModified", 0)
+            record["errors"] = len(details.get("writeErrors", []))
+            logging.warning(f"{self.code}: {record['errors']} write errors in a batch of {len(documents)}: "
+                            f"{details.get('writeErrors', [{}])[0].get('errmsg')}")
+        except Exception as e:
+            record["errors"] = len(documents)
+            logging.error(f"{self.code}: batch of {len(documents)} failed: {e}")
+        record["latencyMs"] = (time.time() - started) * 1000
+        if self.after_write and record["errors"] < len(documents):
+            try:
+                self.after_write(documents)
+            except Exception as e:
+                logging.error(f"{self.code}: after_write failed for a batch of {len(documents)}: {e}")
+        with self.lock:
+            self.batches.append(record)
+            self.errors += record["errors"]
+        logging.debug(f"{self.code}: batch {record}")
+
+    def stats(self):
+        """
+        Returns:
+            dict: Totals, batch latency percentiles (ms) and documents per second.
+        """
+        with self.lock:
+            batches = list(self.batches)
+            skipped, started = self.skipped, self.started
+        latencies = [batch["latencyMs"] for batch in batches]
+        docs = sum(batch["docs"] for batch in batches)
+        elapsed = time.time() - started if started else 0.0
+        return {
+            "batches": len(batches),
+            "docs": docs,
+            "bytes": sum(batch["bytes"] for batch in batches),
+            "inserted": sum(batch["inserted"] for batch in batches),
+            "upserted": sum(batch["upserted"] for batch in batches),
+            "modified": sum(batch["modified"] for batch in batches),
+            "errors": sum(batch["errors"] for batch in batches),
+            "skipped": skipped,
+            "latencyMs": {"p50": _percentile(latencies, 0.5), "p95": _percentile(latencies, 0.95),
+                          "max": max(latencies, default=0.0)},
+            "elapsed": elapsed,
+            "docsPerSecond": docs / elapsed if elapsed else 0.0,
+        }
+
+    def close(self):
+        """Flush, stop the writer threads and return stats()"""
+        self.flush()
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        stats = self.stats()
+        if self.own_client:
+            self.client.close()
+        logging.info(f"{self.code}: {stats}")
+        return stats
+
+
+class ChainBulkWriter:
+    """
+    Routes documents to one MongoBulkWriter per chain by their "supermarket" name
+    (the field map_product fills), each with its own database and threads.
+
+    Args:
+        codes (list): Chains to accept.
+        price_history (bool): Also record price changes (common/price_history.py); the
+            last-price cache of each chain is seeded before the first batch.
+        price_timeseries (bool): Also append every price to the time-series collection
+            (common/price_timeseries.py).
+        **kwargs: MongoBulkWriter options.
+    """
+
+    def __init__(self, codes, price_history=False, price_timeseries=False, **kwargs):
+        self.recorders = {}
+        self.timeseries = {}
+        if price_history:
+            from common.price_history import PriceHistoryRecorder
+            for code in codes:
+                self.recorders[code] = PriceHistoryRecorder(code)
+                self.recorders[code].seed()
+        if price_timeseries:
+            from common.price_timeseries import TimeSeriesPriceWriter
+            for code in codes:
+                self.timeseries[code] = TimeSeriesPriceWriter(code, workers=1)
+        self.writers = {code: MongoBulkWriter(code, after_write=self._after_write(code), **kwargs) for code in codes}
+        self.by_name = {CHAINS[code]["name"]: code for code in codes}
+
+    def _after_write(self, code):
+        """Callback that feeds a written product batch to the chain's price writers (None without any)"""
+        targets = []
+        if code in self.recorders:
+            targets.append(self.recorders[code].record_many)
+        if code in self.timeseries:
+            targets.append(self.timeseries[code].write_many)
+        if not targets:
+            return None
+
+        def after_write(documents):
+            for target in targets:
+                target(documents)
+        return after_write
+
+    def ensure_index(self):
+        for writer in [*self.writers.values(), *self.recorders.values(), *self.timeseries.values()]:
+            writer.ensure_index()
+
+    def write_many(self, documents):
+        grouped = {}
+        for document in documents:
+            grouped.setdefault(self.by_name.get(document.get("supermarket")), []).append(document)
+        for code, group in grouped.items():
+            if code is None:
+                logging.warning(f"Dropped {len(group)} documents of unknown supermarkets")
+                continue
+            self.writers[code].write_many(group)
+
+    def stats(self):
+        return {code: writer.stats() for code, writer in self.writers.items()}
+
+    def close(self):
+        stats = {code: writer.close() for code, writer in self.writers.items()}
+        for code, recorder in self.recorders.items():
+            stats[code]["priceHistory"] = recorder.close()
+        for code, writer in self.timeseries.items():
+            stats[code]["priceTimeseries"] = writer.close()
+        return stats
+
+
+def synthetic_products(code, count, seed=0):
+    """Product documents shaped like map_product's output, for benchmarks"""
+    rng = random.Random(seed)
+    name = CHAINS[code]["name"]
+    for i in range(count):
+        list_price = round(rng.uniform(500, 20000), 2)
+        price = list_price if rng.random() < 0.7 else round(list_price * rng.choice((0.7, 0.8, 0.9)), 2)
+        yield {
+            "name": f"Producto {i}", "price": price, "listPrice": list_price,
+            "discount": round((list_price - price) / list_price * 100, 2), "supermarket": name,
+            "category": "Almacén", "subcategory": f"Subcategoría {i % 40}", "productType": f"Tipo {i % 300}",
+            "brand": f"Marca {i % 500}", "unit": "un", "isAvailable": rng.random() > 0.05,
+            "url": f"{CHAINS[code]['base_url']}/producto-{i}/p", "sku": str(100000 + i),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark bulk upserts into the raw per-chain databases")
+    parser.add_argument("--chains", nargs="+", choices=list(CHAINS), default=["carrefour"])
+    parser.add_argument("--docs", type=int, default=100000, help="Synthetic products per chain")
+    parser.add_argument("--batch-docs", type=int, default=DEFAULT_BATCH_DOCS)
+    parser.add_argument("--batch-bytes", type=int, default=DEFAULT_BATCH_BYTES)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Writer threads per chain")
+    parser.add_argument("--collection", default=PRODUCTS_COLLECTION)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    writer = ChainBulkWriter(args.chains, collection=args.collection, batch_docs=args.batch_docs,
+                             batch_bytes=args.batch_bytes, workers=args.workers)
+    writer.ensure_index()
+    producers = [
+        threading.Thread(target=lambda code=code: writer.writers[code].write_many(synthetic_products(code, args.docs)))
+        for code in args.chains
+    ]
+    for producer in producers:
+        producer.start()
+    for producer in producers:
+        producer.join()
+    for code, s in writer.close().items():
+        print(f"{code}: {s['docs']} docs in {s['batches']} batches, {s['upserted']} upserted, "
+              f"{s['modified']} modified, {s['errors']} errors | batch p50 {s['latencyMs']['p50']:.0f} ms, "
+              f"p95 {s['latencyMs']['p95']:.0f} ms | {s['docsPerSecond']:.0f} docs/s")
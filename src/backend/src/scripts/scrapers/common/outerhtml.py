@@ -0,0 +1,230 @@
+"""
+Extracción de outerHTML compartida por los crawlers de las cadenas.
+
+El historial de cada página va al almacén direccionado por contenido de la
+cadena (common/snapshot_store.py, <output_dir>/store); cada versión nueva se
+compara con la anterior (common/dom_diff.py) para detectar selectores rotos.
+Para las páginas clave (chains.specific_urls) queda además en el directorio
+de salida (chains.outerhtml_output_dir) una copia plana de la versión más
+reciente, <page_name>_<YYYYMMDD_HHMMSS>.html, que es lo que leen el modo
+offline de supermarket-info y el stand-in HTTP. La copia anterior se ubica
+por el índice del almacén, sin listar el directorio; las páginas que
+descubre la frontera quedan solo en el almacén.
+
+Sin almacén (store=None) se mantiene el comportamiento anterior: la versión
+previa pasa al vault, donde se conservan las 2 más recientes.
+"""
+import os
+import shutil
+import logging
+from datetime import datetime
+
+from common.chains import get_chain, outerhtml_output_dir, specific_urls
+from common.browser_pool import build_browser_options, create_driver
+from common.page_settle import SETTLE_PROFILES, install_settle_probe, page_type_for, wait_for_settle
+from common.snapshot_store import get_snapshot_store
+from common.dom_diff import compare_in_background
+
+
+def clean_vault(vault_dir, page_name, keep=2):
+    """
+    Mantiene solo las versiones más recientes de un page_name en el vault.
+
+    Args:
+        vault_dir (str): Directorio vault.
+        page_name (str): Nombre de la página (e.g., 'home').
+        keep (int): Cantidad de versiones a conservar.
+    """
+    if not os.path.exists(vault_dir):
+        return
+
+    prefix = f"{page_name}_"
+    files = [f for f in os.listdir(vault_dir) if f.startswith(prefix) and f.endswith('.html')]
+    if len(files) <= keep:
+        return
+
+    # Ordenar por timestamp (YYYYMMDD_HHMMSS en el nombre), más reciente primero
+    files.sort(key=lambda x: x[len(prefix):-5], reverse=True)  # -5 para quitar .html
+    for old_file in files[keep:]:
+        os.remove(os.path.join(vault_dir, old_file))
+        print(f"Eliminado archivo antiguo del vault: {old_file}")
+
+
+def _latest_files(output_dir, page_name):
+    """Archivos <page_name>_<timestamp>.html del directorio de salida (modo sin almacén)"""
+    if not os.path.exists(output_dir):
+        return []
+    prefix = f"{page_name}_"
+    # El resto del nombre debe ser solo el timestamp, para no tocar 'home_x_*' al guardar 'home'
+    return [f for f in os.listdir(output_dir)
+            if f.startswith(prefix) and f.endswith(".html") and len(f) == len(prefix) + 20]
+
+
+def save_to_store(store, outer_html, output_dir, page_name):
+    """
+    Guarda un outerHTML en el almacén; de las páginas clave deja además una
+    copia plana de la última versión.
+
+    Returns:
+        str: Ruta de la copia plana, o del blob comprimido si la página no es clave.
+    """
+    previous = store.latest(page_name)
+    entry = store.put(page_name, outer_html)
+
+    if store.chain is None or page_name in specific_urls(store.chain):
+        filepath = os.path.join(output_dir, f"{page_name}_{entry['ts']}.html")
+        if previous is not None and previous["ts"] != entry["ts"]:
+            try:
+                os.remove(os.path.join(output_dir, f"{page_name}_{previous['ts']}.html"))
+            except FileNotFoundError:
+                pass
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(outer_html)
+    else:
+        filepath = store.blob_path(entry["hash"])
+
+    status = "nuevo" if entry["new"] else "sin cambios"
+    print(f"OuterHTML extraído: {filepath} ({status}, {entry['hash'][:12]})")
+
+    # Estructura nueva: diff contra la versión anterior y chequeo de los selectores
+    # vigilados, en segundo plano para no demorar la página siguiente
+    if entry["new"] and previous is not None:
+        compare_in_background(store, page_name, previous["hash"], entry["hash"])
+    return filepath
+
+
+def save_outerhtml(outer_html, output_dir, vault_dir, page_name):
+    """
+    Guarda un outerHTML moviendo la versión anterior al vault (modo sin almacén).
+
+    Returns:
+        str: Ruta del archivo guardado.
+    """
+    # Mover archivos existentes al vault
+    os.makedirs(vault_dir, exist_ok=True)
+    for file in _latest_files(output_dir, page_name):
+        shutil.move(os.path.join(output_dir, file), os.path.join(vault_dir, file))
+        print(f"Movido al vault: {file}")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filepath = os.path.join(output_dir, f"{page_name}_{timestamp}.html")
+
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write(outer_html)
+
+    print(f"OuterHTML extraído: {filepath}")
+
+    # Limpiar vault manteniendo solo 2 versiones
+    clean_vault(vault_dir, page_name)
+    return filepath
+
+
+def extract_outerhtml(driver, url, output_dir, vault_dir, page_name, settle_profiles=SETTLE_PROFILES,
+                      timer=None, store=None, **span_attrs):
+    """
+    Extrae el outerHTML completo de una página web usando Selenium.
+
+    Args:
+        driver: Instancia de WebDriver.
+        url (str): URL de la página a scrapear.
+        output_dir (str): Directorio donde guardar el archivo HTML.
+        vault_dir (str): Directorio del vault para archivos antiguos.
+        page_name (str): Nombre de la página para el archivo.
+        settle_profiles (dict): Timeouts por tipo de página (ver common/page_settle.py).
+        timer (PhaseTimer): Si se pasa, registra el tiempo de asentamiento de la página.
+        store (SnapshotStore): Almacén de la cadena; sin él se usa el vault.
+        **span_attrs: Atributos extra del registro (e.g. chain).
+
+    Returns:
+        str: Ruta del archivo guardado, o None si falló.
+    """
+    try:
+        # La sonda de red se registra antes de navegar para contar las requests de la carga
+        install_settle_probe(driver)
+        driver.get(url)
+
+        # Esperar a que la página se asiente (readyState + XHR/fetch + DOM quieto)
+        settle = wait_for_settle(driver, page_type_for(page_name, settle_profiles), settle_profiles)
+        settle_ms = settle.get("elapsedMs", 0)
+        print(f"{page_name}: página {'asentada' if settle.get('settled') else 'sin asentar'} en {settle_ms:.0f} ms")
+        logging.info(f"Asentamiento de {url}: {settle}")
+        if timer is not None:
+            timer.record("page_settle", settle_ms / 1000, "ok" if settle.get("settled") else "timeout",
+                         page=page_name, pageType=settle["pageType"], **span_attrs)
+
+        outer_html = driver.execute_script("return document.documentElement.outerHTML;")
+        if store is not None:
+            return save_to_store(store, outer_html, output_dir, page_name)
+        return save_outerhtml(outer_html, output_dir, vault_dir, page_name)
+
+    except Exception as e:
+        print(f"Error extrayendo {url}: {e}")
+        return None
+
+
+# Todos los href absolutos de la página en un solo round-trip al navegador
+LINKS_SCRIPT = "return Array.from(document.querySelectorAll('a[href]'), function (a) { return a.href; });"
+
+
+def find_links(driver, base_url, patterns):
+    """
+    Encuentra enlaces relevantes en la página actual.
+
+    Args:
+        driver: Instancia de WebDriver.
+        base_url (str): URL base para filtrar enlaces internos.
+        patterns (list): Lista de patrones para href (e.g., '/categoria/').
+
+    Returns:
+        list: URLs únicas que coinciden con algún patrón, en orden de aparición.
+    """
+    links = {}
+    try:
+        for href in driver.execute_script(LINKS_SCRIPT) or []:
+            if href and href.startswith(base_url) and any(pattern in href for pattern in patterns):
+                links[href] = None
+    except Exception as e:
+        print(f"Error encontrando enlaces: {e}")
+    return list(links)
+
+
+def prepare_output_dirs(code, output_dir=None):
+    """
+    Crea (si hace falta) el directorio de salida.
+
+    Returns:
+        tuple: (output_dir, vault_dir); el vault solo se crea si se usa.
+    """
+    output_dir = output_dir or outerhtml_output_dir(code)
+    os.makedirs(output_dir, exist_ok=True)
+    return output_dir, os.path.join(output_dir, "vault")
+
+
+def crawl_chain(code, output_dir=None, browser="edge", settle_profiles=SETTLE_PROFILES, timer=None):
+    """
+    Crawling básico de una cadena: extrae el outerHTML de sus páginas clave
+    (chains.specific_urls) con un solo navegador, una página tras otra.
+
+    Args:
+        code (str): Código de la cadena (e.g., 'carrefour').
+        output_dir (str): Directorio de salida (por defecto el de la cadena).
+        browser (str): "edge" o "firefox".
+        settle_profiles (dict): Timeouts por tipo de página.
+        timer (PhaseTimer): Registro opcional de tiempos de asentamiento.
+
+    Returns:
+        dict: {page_name: ruta o None}
+    """
+    output_dir, vault_dir = prepare_output_dirs(code, output_dir)
+    store = get_snapshot_store(code, output_dir)
+    print(f"Crawling de {get_chain(code)['name']} -> {output_dir}")
+
+    # Sesión tibia del pool si BROWSER_POOL_URL está definido; si no, navegador local
+    driver = create_driver(browser, build_browser_options(browser))
+    try:
+        return {
+            name: extract_outerhtml(driver, url, output_dir, vault_dir, name, settle_profiles, timer, store, chain=code)
+            for name, url in specific_urls(code).items()
+        }
+    finally:
+        driver.quit()
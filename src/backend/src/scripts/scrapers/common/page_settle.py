@@ -0,0 +1,188 @@
+"""
+Detección adaptativa de "página asentada", en lugar de sleeps fijos.
+
+Una página se considera asentada cuando, a la vez:
+
+- document.readyState es 'complete';
+- no hay XHR/fetch pendientes (contador instalado parcheando
+  XMLHttpRequest.send y window.fetch) ni recursos terminados
+  (performance.getEntriesByType('resource')) durante la ventana de silencio;
+- un MutationObserver no vio cambios en el DOM durante una ventana de
+  silencio (quiet_ms).
+
+Para contar también las requests que salen durante la carga, la sonda se
+registra antes de navegar con install_settle_probe(): en Edge/Chromium como
+script de documento nuevo por CDP (Page.addScriptToEvaluateOnNewDocument).
+Donde no hay CDP (Firefox, sesiones remotas del pool) la sonda se instala
+recién al esperar, y las requests que ya estaban en vuelo solo se notan al
+terminar, por su entrada de Resource Timing.
+
+Toda la espera ocurre dentro del navegador en un solo execute_async_script,
+así que una página rápida termina en pocos cientos de ms y una página de
+categoría VTEX lenta se espera hasta su timeout. El tiempo observado se
+devuelve para registrarlo por página.
+
+La sonda queda instalada en la ventana, así que después de un clic basta con
+llamar a wait_for_settle(driver, "interaccion") para esperar las requests y el
+re-render que dispara.
+"""
+import logging
+
+# Timeouts (s) y ventana de silencio (ms) por tipo de página
+SETTLE_PROFILES = {
+    "default": {"timeout": 10, "quiet_ms": 400},
+    "home": {"timeout": 10, "quiet_ms": 400},
+    "categoria": {"timeout": 25, "quiet_ms": 800},
+    "producto": {"timeout": 12, "quiet_ms": 500},
+    "promociones": {"timeout": 15, "quiet_ms": 600},
+    "descuentos": {"timeout": 15, "quiet_ms": 600},
+    # Después de un clic (expandir filtro, "Ver más", cerrar modal)
+    "interaccion": {"timeout": 8, "quiet_ms": 300},
+}
+
+# Drivers que ya tienen la sonda registrada para los documentos nuevos
+_PROBE_ATTR = "_settle_probe_installed"
+
+# Sonda idempotente: contador de XHR/fetch en vuelo y MutationObserver. Observa
+# document (no documentElement), que ya existe cuando corre antes que la página.
+PROBE_SCRIPT = """
+(function () {
+if (window.__settleProbe) {
+    return;
+}
+var probe = window.__settleProbe = {pending: 0, mutations: 0, lastMutation: performance.now()};
+var finish = function () { probe.pending = Math.max(0, probe.pending - 1); };
+
+var send = XMLHttpRequest.prototype.send;
+XMLHttpRequest.prototype.send = function () {
+    probe.pending++;
+    this.addEventListener('loadend', finish, {once: true});
+    return send.apply(this, arguments);
+};
+
+if (window.fetch) {
+    var originalFetch = window.fetch;
+    window.fetch = function () {
+        probe.pending++;
+        return originalFetch.apply(this, arguments).finally(finish);
+    };
+}
+
+new MutationObserver(function (records) {
+    probe.mutations += records.length;
+    probe.lastMutation = performance.now();
+}).observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+})();
+"""
+
+# arguments[0]: {timeoutMs, quietMs, pollMs, sinceStart}; último argumento: callback
+SETTLE_SCRIPT = PROBE_SCRIPT + """
+var opts = arguments[0];
+var done = arguments[arguments.length - 1];
+var probe = window.__settleProbe;
+var start = performance.now();
+
+// Fin del último recurso terminado (cubre requests iniciadas antes de la sonda)
+var lastResource = function () {
+    var entries = performance.getEntriesByType('resource');
+    return entries.length ? entries[entries.length - 1].responseEnd : 0;
+};
+
+(function check() {
+    var now = performance.now();
+    var lastActivity = Math.max(probe.lastMutation, lastResource());
+    var quietSince = opts.sinceStart ? Math.max(lastActivity, start) : lastActivity;
+    var state = {
+        elapsedMs: now - start,
+        pending: probe.pending,
+        mutations: probe.mutations,
+        readyState: document.readyState
+    };
+    if (document.readyState === 'complete' && probe.pending === 0 && now - quietSince >= opts.quietMs) {
+        state.settled = true;
+        return done(state);
+    }
+    if (now - start >= opts.timeoutMs) {
+        state.settled = false;
+        return done(state);
+    }
+    setTimeout(check, opts.pollMs);
+})();
+"""
+
+
+def install_settle_probe(driver):
+    """
+    Registra la sonda para que corra antes que los scripts de cada documento
+    nuevo, así cuenta las requests de la carga. Llamar antes de driver.get().
+
+    Returns:
+        bool: True si el navegador la corre al navegar (Chromium con CDP).
+    """
+    if getattr(driver, _PROBE_ATTR, False):
+        return True
+    if not hasattr(driver, "execute_cdp_cmd"):
+        return False
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": PROBE_SCRIPT})
+    except Exception as e:
+        logging.debug(f"No se pudo registrar la sonda de asentamiento por CDP: {e}")
+        return False
+    setattr(driver, _PROBE_ATTR, True)
+    return True
+
+
+def page_type_for(page_name, profiles=SETTLE_PROFILES):
+    """
+    Tipo de página a partir del nombre usado por los crawlers.
+
+    Args:
+        page_name (str): e.g. 'categoria_almacen', 'producto_ejemplo', 'home'.
+
+    Returns:
+        str: Clave de profiles ('default' si no hay una específica).
+    """
+    for candidate in (page_name, page_name.split('_')[0]):
+        if candidate in profiles:
+            return candidate
+    return "default"
+
+
+def wait_for_settle(driver, page_type="default", profiles=SETTLE_PROFILES, timeout=None, quiet_ms=None, poll_ms=100):
+    """
+    Espera a que la página actual se asiente.
+
+    Args:
+        driver: Instancia de WebDriver ya posicionada en la página.
+        page_type (str): Clave de profiles (e.g. 'categoria', 'interaccion').
+        profiles (dict): Perfiles por tipo de página (ver SETTLE_PROFILES).
+        timeout (float): Sobrescribe el timeout del perfil, en segundos.
+        quiet_ms (int): Sobrescribe la ventana de silencio del perfil.
+        poll_ms (int): Intervalo de sondeo dentro del navegador.
+
+    Returns:
+        dict: {"settled", "elapsedMs", "pending", "mutations", "readyState", "pageType"}
+            settled es False si se agotó el timeout (la página igual se puede capturar).
+    """
+    profile = {**profiles.get("default", SETTLE_PROFILES["default"]), **profiles.get(page_type, {})}
+    timeout = timeout if timeout is not None else profile["timeout"]
+    quiet_ms = quiet_ms if quiet_ms is not None else profile["quiet_ms"]
+
+    options = {
+        "timeoutMs": timeout * 1000,
+        "quietMs": quiet_ms,
+        "pollMs": poll_ms,
+        # Tras una interacción el silencio se cuenta desde ahora, no desde la última mutación
+        "sinceStart": page_type == "interaccion",
+    }
+    try:
+        driver.set_script_timeout(timeout + 5)
+        result = driver.execute_async_script(SETTLE_SCRIPT, options) or {}
+    except Exception as e:
+        logging.warning(f"No se pudo esperar el asentamiento de la página ({page_type}): {e}")
+        result = {"settled": False, "error": str(e)}
+
+    result["pageType"] = page_type
+    if not result.get("settled"):
+        logging.warning(f"Página no asentada tras {timeout}s ({page_type}): {result}")
+    return result
@@ -0,0 +1,242 @@
+"""
+In-memory DOM snapshots for the supermarket-info scrapers.
+
+A snapshot is a plain dict gathered from the rendered homepage:
+
+    {
+        "url": str,
+        "title": str,
+        "html": str,                        # document.documentElement.outerHTML
+        "fields": {key: value},             # first match of each field selector
+        "scripts": [{"src": str|None, "content": str|None}],
+        "footerLinks": [{"href": str|None, "text": str}]
+    }
+
+A key is only present in "fields" when its selector matched an element, so the
+extractors can tell "element missing" apart from "attribute empty", exactly as
+the NoSuchElementException branches did.
+
+Snapshots come from the live browser (capture_page_snapshot, one round trip),
+from per-element WebDriver calls (collect_page_snapshot_live) or from an
+outerHTML file saved by the HTML crawlers (load_page_snapshot, no browser).
+"""
+import os
+
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import NoSuchElementException
+
+FOOTER_LINKS_SELECTOR = 'footer a, .footer a, [class*="footer"] a'
+
+# Gathers every field, script and footer link in a single WebDriver round trip.
+# arguments[0]: {key: [cssSelector, attribute]}, arguments[1]: footer links selector
+SNAPSHOT_SCRIPT = """
+var fields = arguments[0] || {};
+var footerSelector = arguments[1];
+
+function read(el, attr) {
+    var value = el[attr];
+    if (value === undefined || value === null || typeof value === 'object') {
+        value = el.getAttribute(attr);
+    }
+    return value;
+}
+
+var snapshot = {
+    url: window.location.href,
+    title: document.title,
+    html: document.documentElement.outerHTML,
+    fields: {},
+    scripts: [],
+    footerLinks: []
+};
+
+Object.keys(fields).forEach(function (key) {
+    var el = document.querySelector(fields[key][0]);
+    if (el) {
+        snapshot.fields[key] = read(el, fields[key][1]);
+    }
+});
+
+var scripts = document.getElementsByTagName('script');
+for (var i = 0; i < scripts.length; i++) {
+    snapshot.scripts.push({
+        src: scripts[i].src || null,
+        content: scripts[i].innerHTML || null
+    });
+}
+
+if (footerSelector) {
+    var links = document.querySelectorAll(footerSelector);
+    for (var j = 0; j < links.length; j++) {
+        snapshot.footerLinks.push({
+            href: read(links[j], 'href'),
+            text: links[j].innerText || ''
+        });
+    }
+}
+
+return snapshot;
+"""
+
+
+def supermarket_info_fields(brand):
+    """
+    Field selectors used by the supermarket-info extractors.
+
+    Args:
+        brand (str): Brand name as it appears in the logo alt text (e.g. 'Carrefour').
+
+    Returns:
+        dict: {key: (css_selector, attribute)}
+    """
+    return {
+        "metaDescription": ('meta[name="description"]', 'content'),
+        "favicon": ('link[rel="icon"], link[rel="shortcut icon"]', 'href'),
+        "ogImage": ('meta[property="og:image"]', 'content'),
+        "vtexWorkspace": ('meta[name="vtex-workspace"]', 'content'),
+        "manifest": ('link[rel="manifest"]', 'href'),
+        "themeColor": ('meta[name="theme-color"]', 'content'),
+        "logo": (f'img[alt*="{brand}"], img[src*="logo"], header img, .logo img', 'src'),
+        "isoLogo": ('img[alt*="iso"], img[class*="iso"], .isotipo img', 'src'),
+    }
+
+
+def capture_page_snapshot(driver, fields, footer_selector=FOOTER_LINKS_SELECTOR):
+    """
+    Capture the snapshot of the current page with one execute_script call.
+
+    Args:
+        driver: WebDriver already positioned on the page.
+        fields (dict): {key: (css_selector, attribute)}
+        footer_selector (str): Selector for the footer links.
+
+    Returns:
+        dict: Page snapshot.
+    """
+    payload = {key: list(spec) for key, spec in fields.items()}
+    snapshot = driver.execute_script(SNAPSHOT_SCRIPT, payload, footer_selector)
+    return snapshot or {}
+
+
+def collect_page_snapshot_live(driver, fields, footer_selector=FOOTER_LINKS_SELECTOR):
+    """
+    Build the same snapshot with one WebDriver call per element.
+
+    Slow (hundreds of round trips on a VTEX homepage); kept for debugging and
+    for pages where execute_script is blocked.
+    """
+    snapshot = {
+        "url": driver.current_url,
+        "title": driver.title,
+        "html": driver.page_source,
+        "fields": {},
+        "scripts": [],
+        "footerLinks": []
+    }
+
+    for key, (selector, attribute) in fields.items():
+        try:
+            snapshot["fields"][key] = driver.find_element(By.CSS_SELECTOR, selector).get_attribute(attribute)
+        except NoSuchElementException:
+            pass
+
+    for script in driver.find_elements(By.TAG_NAME, 'script'):
+        snapshot["scripts"].append({
+            "src": script.get_attribute('src') or None,
+            "content": script.get_attribute('innerHTML') or None
+        })
+
+    if footer_selector:
+        for link in driver.find_elements(By.CSS_SELECTOR, footer_selector):
+            snapshot["footerLinks"].append({
+                "href": link.get_attribute('href'),
+                "text": link.text
+            })
+
+    return snapshot
+
+
+def parse_page_snapshot(html, fields, base_url, footer_selector=FOOTER_LINKS_SELECTOR):
+    """
+    Build the snapshot from saved outerHTML without a browser.
+
+    Parses with lxml (+ cssselect) and resolves relative src/href against
+    base_url, so the values match what the browser returns for .src/.href.
+
+    Args:
+        html (str): Full document outerHTML.
+        fields (dict): {key: (css_selector, attribute)}
+        base_url (str): URL the snapshot was taken from.
+        footer_selector (str): Selector for the footer links.
+
+    Returns:
+        dict: Page snapshot.
+    """
+    import lxml.html
+
+    doc = lxml.html.document_fromstring(html)
+    doc.make_links_absolute(base_url, resolve_base_href=True)
+
+    snapshot = {
+        "url": base_url,
+        "title": (doc.findtext('.//title') or '').strip(),
+        "html": html,
+        "fields": {},
+        "scripts": [],
+        "footerLinks": []
+    }
+
+    for key, (selector, attribute) in fields.items():
+        matches = doc.cssselect(selector)
+        if matches:
+            snapshot["fields"][key] = matches[0].get(attribute)
+
+    for script in doc.iter('script'):
+        snapshot["scripts"].append({
+            "src": script.get('src') or None,
+            "content": script.text or None
+        })
+
+    if footer_selector:
+        for link in doc.cssselect(footer_selector):
+            snapshot["footerLinks"].append({
+                "href": link.get('href'),
+                "text": ' '.join(link.text_content().split())
+            })
+
+    return snapshot
+
+
+def find_latest_outerhtml(directories, page_name="home"):
+    """
+    Find the newest saved outerHTML file for a page.
+
+    Args:
+        directories (list): Directories where the crawler writes its snapshots.
+        page_name (str): Page name used by the crawler (e.g. 'home').
+
+    Returns:
+        str: Path to the newest snapshot, or None if there is none.
+    """
+    prefix = f"{page_name}_"
+    candidates = []
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        for file in os.listdir(directory):
+            if file.startswith(prefix) and file.endswith('.html'):
+                # Sort by the YYYYMMDD_HHMMSS timestamp in the file name
+                candidates.append((file[len(prefix):-5], os.path.join(directory, file)))
+
+    if not candidates:
+        return None
+    return max(candidates)[1]
+
+
+def load_page_snapshot(path, fields, base_url, footer_selector=FOOTER_LINKS_SELECTOR):
+    """Read a saved outerHTML file and parse it into a snapshot."""
+    with open(path, 'r', encoding='utf-8') as f:
+        html = f.read()
+    snapshot = parse_page_snapshot(html, fields, base_url, footer_selector)
+    snapshot["source"] = path
+    return snapshot
@@ -0,0 +1,197 @@
+"""
+Crawler de outerHTML multi-cadena en paralelo.
+
+Todas las páginas clave de todas las cadenas (chains.specific_urls) se
+reparten entre un pool de navegadores. Dos límites de concurrencia:
+
+- global (max_workers): cantidad de navegadores abiertos a la vez;
+- por dominio (per_domain): páginas simultáneas contra un mismo sitio, para
+  no sobrecargar a ninguna cadena.
+
+Un worker nunca espera por un dominio ocupado si hay trabajo pendiente de
+otro dominio: el scheduler le entrega la siguiente página cuyo dominio tenga
+cupo. Al final se informa el throughput (páginas/min).
+
+Con un checkpoint (common/checkpoint.py) cada página extraída queda
+registrada; si el proceso muere, la siguiente corrida solo extrae las que
+faltan. El journal se borra cada vez que una corrida llega al final, aunque
+alguna página haya fallado: solo se reanuda una corrida abortada.
+"""
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from colorama import Fore, Style
+
+from common.chains import CHAINS, get_chain, specific_urls
+from common.browser_pool import build_browser_options, create_driver
+from common.outerhtml import extract_outerhtml, prepare_output_dirs
+from common.page_settle import SETTLE_PROFILES
+from common.timing import PhaseTimer
+from common.snapshot_store import DEFAULT_KEEP, get_snapshot_store
+from common.checkpoint import Checkpoint
+
+DEFAULT_CRAWLER_TIMINGS_FILE = "outerhtml_crawler_timings.jsonl"
+
+
+class DomainScheduler:
+    """Cola de páginas con un cupo de concurrencia por dominio"""
+
+    def __init__(self, jobs, per_domain):
+        self.pending = deque(jobs)
+        self.per_domain = per_domain
+        self.active = {}
+        self.condition = threading.Condition()
+
+    def next_job(self):
+        """
+        Siguiente página cuyo dominio tenga cupo; bloquea mientras solo queden
+        páginas de dominios ocupados.
+
+        Returns:
+            dict: La página, o None si ya no queda trabajo.
+        """
+        with self.condition:
+            while self.pending:
+                for job in self.pending:
+                    if self.active.get(job["domain"], 0) < self.per_domain:
+                        self.pending.remove(job)
+                        self.active[job["domain"]] = self.active.get(job["domain"], 0) + 1
+                        return job
+                self.condition.wait()
+            return None
+
+    def done(self, job):
+        """Libera el cupo del dominio de una página terminada"""
+        with self.condition:
+            self.active[job["domain"]] -= 1
+            self.condition.notify_all()
+
+
+def build_jobs(codes, keep=DEFAULT_KEEP):
+    """
+    Páginas a extraer, intercaladas por cadena (round-robin) para repartir
+    la carga entre dominios desde el principio.
+
+    Returns:
+        list: [{"code", "domain", "page_name", "url", "output_dir", "vault_dir", "store"}]
+    """
+    per_chain = []
+    for code in codes:
+        output_dir, vault_dir = prepare_output_dirs(code)
+        per_chain.append(deque(
+            {
+                "code": code,
+                "domain": get_chain(code)["domain"],
+                "page_name": name,
+                "url": url,
+                "output_dir": output_dir,
+                "vault_dir": vault_dir,
+                "store": get_snapshot_store(code, output_dir, keep),
+            }
+            for name, url in specific_urls(code).items()
+        ))
+
+    jobs = []
+    while any(per_chain):
+        for queue in per_chain:
+            if queue:
+                jobs.append(queue.popleft())
+    return jobs
+
+
+def crawl_all_chains(codes=None, max_workers=4, per_domain=2, browser="edge", settle_profiles=SETTLE_PROFILES,
+                     timer=None, keep=DEFAULT_KEEP, checkpoint=None):
+    """
+    Extrae el outerHTML de las páginas clave de varias cadenas en paralelo.
+
+    Args:
+        codes (list): Códigos de cadena (por defecto todas).
+        max_workers (int): Navegadores simultáneos (límite global).
+        per_domain (int): Páginas simultáneas por dominio.
+        browser (str): "edge" o "firefox".
+        settle_profiles (dict): Timeouts por tipo de página (ver common/page_settle.py).
+        timer (PhaseTimer): Registro de tiempos de asentamiento por página (JSON lines).
+        keep (int): Versiones retenidas por página en el almacén de snapshots.
+        checkpoint (Checkpoint): Journal de páginas ya extraídas (por defecto
+            'outerhtml_crawler'); las completadas en una corrida interrumpida se saltean.
+
+    Returns:
+        dict: {"pages", "ok", "failed", "skipped", "elapsed", "pagesPerMinute", "byChain": {code: {"ok", "failed"}}}
+    """
+    codes = list(codes or CHAINS)
+    timer = timer or PhaseTimer(DEFAULT_CRAWLER_TIMINGS_FILE, prometheus_path=None)
+    checkpoint = checkpoint or Checkpoint("outerhtml_crawler")
+    all_jobs = build_jobs(codes, keep)
+    pending_urls = set(checkpoint.pending(job["url"] for job in all_jobs))
+    jobs = [job for job in all_jobs if job["url"] in pending_urls]
+    if len(jobs) < len(all_jobs):
+        print(f"{Fore.YELLOW}Reanudando: {len(all_jobs) - len(jobs)} páginas ya extraídas o descartadas "
+              f"({checkpoint.path}){Style.RESET_ALL}")
+    scheduler = DomainScheduler(jobs, per_domain)
+    by_chain = {code: {"ok": 0, "failed": 0} for code in codes}
+    lock = threading.Lock()
+    started = time.time()
+
+    def worker():
+        driver = None
+        try:
+            while True:
+                job = scheduler.next_job()
+                if job is None:
+                    return
+                try:
+                    if driver is None:
+                        # Sesión tibia del pool si BROWSER_POOL_URL está definido
+                        driver = create_driver(browser, build_browser_options(browser))
+                    path = extract_outerhtml(driver, job["url"], job["output_dir"], job["vault_dir"], job["page_name"],
+                                             settle_profiles, timer, job["store"], chain=job["code"])
+                except Exception as e:
+                    print(f"{Fore.RED}Error extrayendo {job['url']}: {e}{Style.RESET_ALL}")
+                    path = None
+                finally:
+                    scheduler.done(job)
+                if path:
+                    checkpoint.complete(job["url"], {"chain": job["code"], "page": job["page_name"], "path": path})
+                else:
+                    checkpoint.fail(job["url"], "extracción fallida")
+                with lock:
+                    by_chain[job["code"]]["ok" if path else "failed"] += 1
+        finally:
+            if driver is not None:
+                driver.quit()
+
+    workers = max(1, min(max_workers, len(jobs)))
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crawler") as executor:
+            for _ in range(workers):
+                executor.submit(worker)
+    finally:
+        checkpoint.close()
+
+    elapsed = time.time() - started
+    ok = sum(c["ok"] for c in by_chain.values())
+    failed = sum(c["failed"] for c in by_chain.values())
+    report = {
+        "pages": len(jobs),
+        "ok": ok,
+        "failed": failed,
+        "skipped": len(all_jobs) - len(jobs),
+        "elapsed": elapsed,
+        "pagesPerMinute": ok / elapsed * 60 if elapsed > 0 else 0.0,
+        "byChain": by_chain,
+    }
+
+    print(f"{Fore.CYAN}Crawling terminado: {ok}/{len(jobs)} páginas en {elapsed:.1f}s "
+          f"({report['pagesPerMinute']:.1f} páginas/min, {workers} navegadores, {per_domain} por dominio){Style.RESET_ALL}")
+    for code, counts in by_chain.items():
+        color = Fore.GREEN if not counts["failed"] else Fore.RED
+        print(f"{color}  {code}: {counts['ok']} ok, {counts['failed']} con error{Style.RESET_ALL}")
+    logging.info(f"Crawling terminado: {report}")
+    # Corrida completa: las páginas con error se reintentan en la próxima corrida
+    # junto con todas las demás, no solas
+    checkpoint.finish()
+    timer.print_summary()
+    return report
@@ -0,0 +1,250 @@
+"""
+Change-only price history for the raw per-chain databases.
+
+The PriceHistory models store one row per product per scrape, but most prices
+do not change from one day to the next. PriceHistoryRecorder keeps the last
+known (price, listPrice, discount, isAvailable) of every sku in memory,
+seeded once per run from the latest row of each sku with one aggregation,
+and appends a PriceHistory document only when one of those values changed.
+For unchanged skus it just moves the latest row's lastSeenAt watermark, in
+bulk, so a row reads as "this price held from scrapedAt to lastSeenAt".
+
+It plugs into the bulk writer: ChainBulkWriter(codes, price_history=True)
+records every product batch right after the batch is upserted, so the
+productId of new products can be resolved from the products collection.
+
+    python common/vtex_catalog.py ingest --chains carrefour --mongo --price-history
+    python common/price_history.py --docs 50000 --days 30 --change-rate 0.05   # offline write-volume estimate
+"""
+import os
+import sys
+import uuid
+import random
+import logging
+import argparse
+import threading
+from datetime import datetime, timezone
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.mongo_writer import PRODUCTS_COLLECTION, PRICE_HISTORY_COLLECTION, mongo_uri
+
+# Values whose change opens a new history row
+PRICE_FIELDS = ("price", "listPrice", "discount", "isAvailable")
+PRODUCT_DATA_FIELDS = ("name", "sku", "brand", "category", "subcategory", "productType")
+
+# Ids per update_many / $in query
+ID_CHUNK = 10000
+
+
+def price_key(document):
+    """Comparable tuple of the tracked values (prices rounded to cents)"""
+    return (
+        round(document["price"], 2) if document.get("price") is not None else None,
+        round(document["listPrice"], 2) if document.get("listPrice") is not None else None,
+        round(document["discount"], 2) if document.get("discount") is not None else None,
+        bool(document.get("isAvailable", True)),
+    )
+
+
+def diff_prices(cache, documents):
+    """
+    Split product documents into changed and unchanged against the last-price cache.
+
+    Args:
+        cache (dict): {sku: (price_key, row id, productId)}.
+        documents (list): Product documents (map_product output).
+
+    Returns:
+        tuple: ([changed documents], [row ids of unchanged skus])
+    """
+    changed, unchanged = [], []
+    for document in documents:
+        sku = document.get("sku")
+        if sku is None or document.get("price") is None:
+            continue
+        cached = cache.get(sku)
+        if cached is not None and cached[0] == price_key(document):
+            if cached[1] is not None:
+                unchanged.append(cached[1])
+        else:
+            changed.append(document)
+    return changed, unchanged
+
+
+def history_row(code, document, product_id, scraped_at, batch_id):
+    """PriceHistory document (fields of <chain>PriceHistory.js) for a product document"""
+    price, list_price = document["price"], document.get("listPrice")
+    available = bool(document.get("isAvailable", True))
+    return {
+        "productId": product_id,
+        "supermarketId": code,
+        "productData": {field: document.get(field) for field in PRODUCT_DATA_FIELDS},
+        "price": price,
+        "listPrice": list_price,
+        "discount": document.get("discount"),
+        "discountAmount": round(list_price - price, 2) if list_price is not None else None,
+        "currency": "ARS",
+        "pricePerUnit": document.get("pricePerKilo") or document.get("pricePerLitre"),
+        "unit": document.get("unit"),
+        "scrapedAt": scraped_at,
+        "lastSeenAt": scraped_at,
+        "scrapeSource": document.get("url"),
+        "scrapeBatchId": batch_id,
+        "isAvailable": available,
+        "stockStatus": "in_stock" if available else "out_of_stock",
+        "isOnOffer": bool(document.get("discount")),
+        "confidence": 1,
+        "createdAt": scraped_at,
+        "updatedAt": scraped_at,
+    }
+
+
+class PriceHistoryRecorder:
+    """
+    Args:
+        code (str): Chain code (database and supermarketId).
+        client (MongoClient): Shared client; default: a new one for mongo_uri(code).
+        batch_id (str): scrapeBatchId of the rows appended in this run.
+    """
+
+    def __init__(self, code, client=None, batch_id=None):
+        from pymongo import MongoClient
+
+        self.code = code
+        self.own_client = client is None
+        self.client = client or MongoClient(mongo_uri(code), serverSelectionTimeoutMS=5000)
+        db = self.client.get_default_database(f"{code}_raw")
+        self.history = db[PRICE_HISTORY_COLLECTION]
+        self.products = db[PRODUCTS_COLLECTION]
+        self.batch_id = batch_id or f"{code}-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+        self.lock = threading.Lock()
+        self.cache = {}
+        self.counts = {"seen": 0, "appended": 0, "unchanged": 0, "missingProduct": 0}
+
+    def ensure_index(self):
+        """Index the seeding aggregation walks (latest row per sku)"""
+        self.history.create_index([("productData.sku", 1), ("scrapedAt", -1)])
+
+    def seed(self):
+        """Load the latest row of every sku into the cache (one aggregation)"""
+        pipeline = [
+            {"$sort": {"productData.sku": 1, "scrapedAt": -1}},
+            {"$group": {
+                "_id": "$productData.sku",
+                "rowId": {"$first": "$_id"},
+                "productId": {"$first": "$productId"},
+                **{field: {"$first": f"${field}"} for field in PRICE_FIELDS},
+            }},
+        ]
+        cache = {}
+        for row in self.history.aggregate(pipeline, allowDiskUse=True):
+            if row["_id"] is not None:
+                cache[row["_id"]] = (price_key(row), row["rowId"], row["productId"])
+        with self.lock:
+            self.cache = cache
+        logging.info(f"{self.code}: price cache seeded with {len(cache)} skus")
+        return len(cache)
+
+    def _product_ids(self, skus):
+        """{sku: products._id} for skus without a cached productId"""
+        ids = {}
+        for start in range(0, len(skus), ID_CHUNK):
+            for product in self.products.find({"sku": {"$in": skus[start:start + ID_CHUNK]}}, {"sku": 1}):
+                ids[product["sku"]] = product["_id"]
+        return ids
+
+    def record_many(self, documents):
+        """Append rows for changed skus and move the watermark of unchanged ones"""
+        now = datetime.now(timezone.utc)
+        with self.lock:
+            changed, unchanged = diff_prices(self.cache, documents)
+            cached_ids = {doc["sku"]: self.cache[doc["sku"]][2] for doc in changed if doc["sku"] in self.cache}
+
+        missing = [doc["sku"] for doc in changed if cached_ids.get(doc["sku"]) is None]
+        product_ids = {**cached_ids, **(self._product_ids(missing) if missing else {})}
+
+        rows = []
+        skipped = 0
+        for document in changed:
+            product_id = product_ids.get(document["sku"])
+            if product_id is None:
+                skipped += 1
+                continue
+            rows.append(history_row(self.code, document, product_id, now, self.batch_id))
+        if rows:
+            result = self.history.insert_many(rows, ordered=False)
+            with self.lock:
+                for row, row_id in zip(rows, result.inserted_ids):
+                    self.cache[row["productData"]["sku"]] = (price_key(row), row_id, row["productId"])
+
+        for start in range(0, len(unchanged), ID_CHUNK):
+            self.history.update_many({"_id": {"$in": unchanged[start:start + ID_CHUNK]}},
+                                     {"$set": {"lastSeenAt": now, "updatedAt": now}})
+
+        with self.lock:
+            self.counts["seen"] += len(documents)
+            self.counts["appended"] += len(rows)
+            self.counts["unchanged"] += len(unchanged)
+            self.counts["missingProduct"] += skipped
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts, cached=len(self.cache))
+
+    def close(self):
+        stats = self.stats()
+        logging.info(f"{self.code}: price history {stats}")
+        if self.own_client:
+            self.client.close()
+        return stats
+
+
+def simulate(docs, days, change_rate, availability_rate=0.01, seed=0):
+    """
+    Rows written by one-row-per-scrape vs change-only over `days` daily scrapes,
+    with `change_rate` of the skus changing price each day (no database needed).
+
+    Returns:
+        dict: {"perScrapeRows", "changeOnlyRows", "watermarkUpdates", "reduction"}
+    """
+    rng = random.Random(seed)
+    products = [{"sku": str(i), "price": round(rng.uniform(500, 20000), 2), "discount": 0, "isAvailable": True}
+                for i in range(docs)]
+    for product in products:
+        product["listPrice"] = product["price"]
+    cache = {}
+    appended = watermarks = 0
+    for day in range(days):
+        for product in products:
+            if day and rng.random() < change_rate:
+                product["price"] = round(product["listPrice"] * rng.choice((0.8, 0.9, 1.0, 1.05)), 2)
+                product["discount"] = round((product["listPrice"] - product["price"]) / product["listPrice"] * 100, 2)
+            if day and rng.random() < availability_rate:
+                product["isAvailable"] = not product["isAvailable"]
+        changed, unchanged = diff_prices(cache, products)
+        for document in changed:
+            appended += 1
+            cache[document["sku"]] = (price_key(document), appended, None)
+        watermarks += len(unchanged)
+    per_scrape = docs * days
+    return {
+        "perScrapeRows": per_scrape,
+        "changeOnlyRows": appended,
+        "watermarkUpdates": watermarks,
+        "reduction": 1 - appended / per_scrape if per_scrape else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estimate history rows saved by change-only recording")
+    parser.add_argument("--docs", type=int, default=50000, help="Products per daily scrape")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--change-rate", type=float, default=0.05, help="Share of products changing price per day")
+    args = parser.parse_args()
+
+    result = simulate(args.docs, args.days, args.change_rate)
+    print(f"One row per scrape: {result['perScrapeRows']} rows")
+    print(f"Change-only:        {result['changeOnlyRows']} rows + {result['watermarkUpdates']} watermark updates "
+          f"({result['reduction']:.1%} fewer rows)")
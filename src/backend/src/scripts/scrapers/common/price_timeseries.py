@@ -0,0 +1,117 @@
+"""
+Batch writer for the price-history time-series collections.
+
+src/scripts/initialize_database.py creates price_history_ts in every raw chain
+database as a MongoDB time-series collection (timeField scrapedAt, metaField
+meta = {supermarketId, productId, sku}, granularity hours). MongoDB stores it
+in compressed buckets per meta value, so one row per product per scrape costs
+a fraction of a regular PriceHistory document and its six indexes, and range
+queries for one product only touch that product's buckets.
+
+TimeSeriesPriceWriter reuses MongoBulkWriter's batching, threads and stats, but
+appends (InsertOne) instead of upserting, resolving each sku's productId from
+the products collection once per run. It creates the collection itself when
+initialize_database.py has not been run, and refuses to write into a regular
+collection of the same name (MongoDB would otherwise auto-create one on the
+first insert).
+
+    python common/vtex_catalog.py ingest --chains carrefour --mongo --price-timeseries
+"""
+import threading
+
+from pymongo import InsertOne
+from pymongo.errors import CollectionInvalid
+
+from common.mongo_writer import MongoBulkWriter, PRODUCTS_COLLECTION
+
+TIMESERIES_COLLECTION = "price_history_ts"
+TIME_FIELD = "scrapedAt"
+META_FIELD = "meta"
+GRANULARITY = "hours"
+
+# Ids per $in query
+ID_CHUNK = 10000
+
+
+def timeseries_options():
+    """create_collection() options of the price-history time-series collections"""
+    return {"timeseries": {"timeField": TIME_FIELD, "metaField": META_FIELD, "granularity": GRANULARITY}}
+
+
+def timeseries_row(code, document, product_id, scraped_at, batch_id=None):
+    """Time-series measurement for a product document (map_product output)"""
+    price, list_price = document["price"], document.get("listPrice")
+    return {
+        TIME_FIELD: scraped_at,
+        META_FIELD: {"supermarketId": code, "productId": product_id, "sku": document["sku"]},
+        "price": price,
+        "listPrice": list_price,
+        "discount": document.get("discount"),
+        "isAvailable": bool(document.get("isAvailable", True)),
+        "pricePerUnit": document.get("pricePerKilo") or document.get("pricePerLitre"),
+        "unit": document.get("unit"),
+        "scrapeBatchId": batch_id,
+    }
+
+
+class TimeSeriesPriceWriter(MongoBulkWriter):
+    """
+    Args:
+        code (str): Chain code.
+        batch_id (str): scrapeBatchId stored with every measurement.
+        scraped_at (datetime): Timestamp of the whole run (default: time of each batch).
+        **kwargs: MongoBulkWriter options (batch_docs, batch_bytes, workers, uri, client).
+    """
+
+    def __init__(self, code, batch_id=None, scraped_at=None, **kwargs):
+        self.batch_id = batch_id
+        self.scraped_at = scraped_at
+        self.product_ids = {}
+        self.ids_lock = threading.Lock()
+        super().__init__(code, collection=TIMESERIES_COLLECTION, key="sku", **kwargs)
+        self.products = self.collection.database[PRODUCTS_COLLECTION]
+        self.ensure_collection()
+
+    def ensure_collection(self):
+        """
+        Create the time-series collection if it does not exist.
+
+        Raises:
+            Exception: A collection with that name exists but is not a time-series collection.
+        """
+        db = self.collection.database
+        info = next(db.list_collections(filter={"name": TIMESERIES_COLLECTION}), None)
+        if info is None:
+            try:
+                db.create_collection(TIMESERIES_COLLECTION, **timeseries_options())
+                return
+            except CollectionInvalid:
+                # Created concurrently by another writer
+                info = next(db.list_collections(filter={"name": TIMESERIES_COLLECTION}), None)
+        if info is not None and info.get("type") != "timeseries":
+            raise Exception(f"{db.name}.{TIMESERIES_COLLECTION} exists but is not a time-series collection "
+                            f"(type {info.get('type')}); drop it and run src/scripts/initialize_database.py")
+
+    def ensure_index(self):
+        """Secondary index on the meta fields the range queries filter by"""
+        self.collection.create_index([(f"{META_FIELD}.productId", 1), (TIME_FIELD, -1)])
+        self.collection.create_index([(f"{META_FIELD}.sku", 1), (TIME_FIELD, -1)])
+
+    def _resolve(self, skus):
+        with self.ids_lock:
+            missing = [sku for sku in skus if sku not in self.product_ids]
+        found = {}
+        for start in range(0, len(missing), ID_CHUNK):
+            for product in self.products.find({"sku": {"$in": missing[start:start + ID_CHUNK]}}, {"sku": 1}):
+                found[product["sku"]] = product["_id"]
+        with self.ids_lock:
+            self.product_ids.update(found)
+            return {sku: self.product_ids.get(sku) for sku in skus}
+
+    def _operations(self, documents, now):
+        product_ids = self._resolve([document["sku"] for document in documents])
+        scraped_at = self.scraped_at or now
+        return [
+            InsertOne(timeseries_row(self.code, document, product_ids[document["sku"]], scraped_at, self.batch_id))
+            for document in documents if document.get("price") is not None
+        ]
@@ -0,0 +1,356 @@
+"""
+Catálogo SQLite de snapshots de outerHTML con retención escalonada.
+
+Cada versión que entra a un almacén (common/snapshot_store.py) se registra en
+un catálogo único para todas las cadenas (snapshot_catalog.sqlite junto a los
+scrapers, o SNAPSHOT_CATALOG_PATH):
+
+    snapshots(id, chain, page, ts, taken_at, hash, store_root, size)
+    latest(chain, page -> snapshot_id)
+
+- "Último snapshot de X" es una búsqueda por clave primaria en latest.
+- "Snapshot de X a tal fecha" es un único seek en el índice
+  (chain, page, taken_at), sin listar directorios ni ordenar nombres.
+- La retención se decide al registrar cada versión, solo sobre las filas de
+  esa página: se conservan las últimas N, la más nueva de cada día durante
+  una semana y la más nueva de cada semana durante un trimestre. Las demás
+  se borran y el almacén libera sus blobs.
+
+El catálogo también sirve para re-procesar el historial sin recorrer
+directorios:
+
+    python common/snapshot_catalog.py list --chain carrefour --page home
+    python common/snapshot_catalog.py as-of carrefour home 2026-10-01
+    python common/snapshot_catalog.py reparse --chain carrefour --since 2026-09-01 --out registros
+    python common/snapshot_catalog.py sync         # registrar versiones de almacenes previos al catálogo
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.chains import CHAINS, SCRAPERS_DIR
+
+DEFAULT_CATALOG_PATH = os.environ.get("SNAPSHOT_CATALOG_PATH", os.path.join(SCRAPERS_DIR, "snapshot_catalog.sqlite"))
+
+# Retención escalonada: últimas N (la N la da el almacén), una por día y una por semana
+RETENTION_DAYS = 7
+RETENTION_WEEKS = 13
+
+TS_FORMAT = "%Y%m%d_%H%M%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    chain TEXT NOT NULL,
+    page TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    taken_at REAL NOT NULL,
+    hash TEXT NOT NULL,
+    store_root TEXT NOT NULL,
+    size INTEGER
+);
+CREATE INDEX IF NOT EXISTS snapshots_page_time ON snapshots (chain, page, taken_at);
+CREATE INDEX IF NOT EXISTS snapshots_time ON snapshots (taken_at);
+CREATE TABLE IF NOT EXISTS latest (
+    chain TEXT NOT NULL,
+    page TEXT NOT NULL,
+    snapshot_id INTEGER NOT NULL,
+    PRIMARY KEY (chain, page)
+) WITHOUT ROWID;
+"""
+
+COLUMNS = ("id", "chain", "page", "ts", "taken_at", "hash", "store_root", "size")
+
+
+def ts_to_epoch(ts):
+    """'YYYYMMDD_HHMMSS' (hora local) a epoch"""
+    return datetime.strptime(ts, TS_FORMAT).timestamp()
+
+
+def to_epoch(when, end_of_day=True):
+    """
+    datetime, epoch o texto ('YYYY-MM-DD', 'YYYY-MM-DD HH:MM:SS', 'YYYYMMDD_HHMMSS') a epoch.
+    Una fecha sola significa el final de ese día (o el principio, con end_of_day=False).
+    """
+    if isinstance(when, (int, float)):
+        return float(when)
+    if isinstance(when, datetime):
+        return when.timestamp()
+    for fmt in ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", TS_FORMAT):
+        try:
+            parsed = datetime.strptime(when, fmt)
+        except ValueError:
+            continue
+        if fmt == "%Y-%m-%d" and end_of_day:
+            parsed += timedelta(days=1) - timedelta(seconds=1)
+        return parsed.timestamp()
+    raise ValueError(f"Fecha no reconocida: {when}")
+
+
+def retained_ids(rows, last, now, days=RETENTION_DAYS, weeks=RETENTION_WEEKS):
+    """
+    Ids a conservar según la retención escalonada.
+
+    Args:
+        rows (list): [(id, taken_at)] de una página, de la más nueva a la más vieja.
+        last (int): Versiones más recientes que se conservan siempre.
+        now (float): Epoch de referencia.
+
+    Returns:
+        set: Ids retenidos.
+    """
+    keep = {row_id for row_id, _ in rows[:max(1, last)]}
+    days_seen, weeks_seen = set(), set()
+    day_limit = now - days * 86400
+    week_limit = now - weeks * 7 * 86400
+    for row_id, taken_at in rows:
+        moment = datetime.fromtimestamp(taken_at)
+        if taken_at >= day_limit and moment.date() not in days_seen:
+            days_seen.add(moment.date())
+            keep.add(row_id)
+        week = moment.isocalendar()[:2]
+        if taken_at >= week_limit and week not in weeks_seen:
+            weeks_seen.add(week)
+            keep.add(row_id)
+    return keep
+
+
+class SnapshotCatalog:
+    def __init__(self, path=DEFAULT_CATALOG_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Varios procesos (crawler, re-parseo) pueden escribir a la vez
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def _row(self, row):
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def add(self, chain, page, ts, digest, store_root, size=None, last=2, now=None):
+        """
+        Registra una versión y aplica la retención de esa página.
+
+        Returns:
+            list: Filas borradas por la retención ({"ts", "hash", ...}); el almacén libera sus blobs.
+        """
+        taken_at = ts_to_epoch(ts)
+        now = now or time.time()
+        with self.lock, self.db:
+            cursor = self.db.execute(
+                "INSERT INTO snapshots (chain, page, ts, taken_at, hash, store_root, size) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (chain, page, ts, taken_at, digest, store_root, size)
+            )
+            self.db.execute(
+                "INSERT INTO latest (chain, page, snapshot_id) VALUES (?, ?, ?) "
+                "ON CONFLICT (chain, page) DO UPDATE SET snapshot_id = excluded.snapshot_id "
+                "WHERE (SELECT taken_at FROM snapshots WHERE id = latest.snapshot_id) <= ?",
+                (chain, page, cursor.lastrowid, taken_at)
+            )
+            return self._apply_retention(chain, page, last, now)
+
+    def _apply_retention(self, chain, page, last, now):
+        rows = self.db.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM snapshots WHERE chain = ? AND page = ? ORDER BY taken_at DESC, id DESC",
+            (chain, page)
+        ).fetchall()
+        keep = retained_ids([(row[0], row[4]) for row in rows], last, now)
+        dropped = [self._row(row) for row in rows if row[0] not in keep]
+        if dropped:
+            self.db.executemany("DELETE FROM snapshots WHERE id = ?", [(row["id"],) for row in dropped])
+        return dropped
+
+    def latest(self, chain, page):
+        """Versión más reciente de una página (búsqueda por clave primaria), o None"""
+        with self.lock:
+            row = self.db.execute(
+                f"SELECT {', '.join('s.' + c for c in COLUMNS)} FROM latest l JOIN snapshots s ON s.id = l.snapshot_id "
+                "WHERE l.chain = ? AND l.page = ?", (chain, page)
+            ).fetchone()
+        return self._row(row)
+
+    def as_of(self, chain, page, when):
+        """
+        Versión vigente en un momento dado: la más nueva tomada hasta when.
+
+        Args:
+            when: datetime, epoch o texto (ver to_epoch).
+        """
+        with self.lock:
+            row = self.db.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM snapshots WHERE chain = ? AND page = ? AND taken_at <= ? "
+                "ORDER BY taken_at DESC LIMIT 1", (chain, page, to_epoch(when))
+            ).fetchone()
+        return self._row(row)
+
+    def history(self, chain=None, page=None, since=None, until=None):
+        """
+        Versiones registradas, de la más vieja a la más nueva.
+
+        Returns:
+            list: Filas {"id", "chain", "page", "ts", "taken_at", "hash", "store_root", "size"}
+        """
+        clauses, params = [], []
+        for column, value in (("chain", chain), ("page", page)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("taken_at >= ?")
+            params.append(to_epoch(since, end_of_day=False))
+        if until is not None:
+            clauses.append("taken_at <= ?")
+            params.append(to_epoch(until))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM snapshots {where} ORDER BY taken_at, id", params
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def drop_page(self, chain, page):
+        """Borra todas las versiones registradas de una página"""
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM latest WHERE chain = ? AND page = ?", (chain, page))
+            self.db.execute("DELETE FROM snapshots WHERE chain = ? AND page = ?", (chain, page))
+
+    def pages(self, chain=None):
+        """[(chain, page)] con al menos una versión"""
+        with self.lock:
+            if chain is None:
+                return self.db.execute("SELECT chain, page FROM latest ORDER BY chain, page").fetchall()
+            return self.db.execute("SELECT chain, page FROM latest WHERE chain = ? ORDER BY page", (chain,)).fetchall()
+
+    def sync_store(self, store):
+        """
+        Registra las versiones del índice de un almacén que no estén en el catálogo
+        (almacenes creados antes del catálogo). No aplica retención.
+
+        Returns:
+            int: Versiones agregadas.
+        """
+        added = 0
+        pages = {page: store.history(page) for page in store.pages()}
+        with self.lock, self.db:
+            for page, versions in pages.items():
+                known = {(ts, digest) for ts, digest in self.db.execute(
+                    "SELECT ts, hash FROM snapshots WHERE chain = ? AND page = ?", (store.chain, page))}
+                for entry in versions:
+                    if (entry["ts"], entry["hash"]) in known:
+                        continue
+                    size = (store.ref(entry["hash"]) or {}).get("size")
+                    cursor = self.db.execute(
+                        "INSERT INTO snapshots (chain, page, ts, taken_at, hash, store_root, size) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (store.chain, page, entry["ts"], ts_to_epoch(entry["ts"]), entry["hash"], os.path.abspath(store.root), size)
+                    )
+                    self.db.execute(
+                        "INSERT INTO latest (chain, page, snapshot_id) VALUES (?, ?, ?) "
+                        "ON CONFLICT (chain, page) DO UPDATE SET snapshot_id = excluded.snapshot_id "
+                        "WHERE (SELECT taken_at FROM snapshots WHERE id = latest.snapshot_id) <= ?",
+                        (store.chain, page, cursor.lastrowid, ts_to_epoch(entry["ts"]))
+                    )
+                    added += 1
+        return added
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_snapshot_catalog(path=DEFAULT_CATALOG_PATH):
+    """Catálogo compartido por todos los almacenes del proceso"""
+    with _catalogs_lock:
+        if path not in _catalogs:
+            _catalogs[path] = SnapshotCatalog(path)
+        return _catalogs[path]
+
+
+def reparse(catalog, out_dir, chain=None, page=None, since=None, until=None, kinds=None):
+    """
+    Re-procesa versiones históricas con common/html_records.py, leyendo cada
+    blob del almacén en streaming (sin descomprimirlo entero en memoria).
+
+    Returns:
+        dict: {"snapshots", "records": {tipo: cantidad}}
+    """
+    import json
+    from common.snapshot_store import SnapshotStore
+    from common.html_records import RECORD_KINDS, iter_records
+
+    kinds = tuple(kinds or RECORD_KINDS)
+    os.makedirs(out_dir, exist_ok=True)
+    stores = {}
+    totals = dict.fromkeys(kinds, 0)
+    rows = catalog.history(chain, page, since, until)
+    for row in rows:
+        store = stores.get(row["store_root"])
+        if store is None:
+            store = stores[row["store_root"]] = SnapshotStore(row["store_root"], chain=row["chain"])
+        out_path = os.path.join(out_dir, f"{row['chain']}_{row['page']}_{row['ts']}.jsonl")
+        with store.open(row["hash"]) as html, open(out_path, "w", encoding="utf-8") as out:
+            for record in iter_records(html, kinds):
+                record.update(chain=row["chain"], page=row["page"], ts=row["ts"])
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                totals[record["type"]] += 1
+        print(f"{row['chain']}/{row['page']} {row['ts']} -> {out_path}")
+    return {"snapshots": len(rows), "records": totals}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Catálogo de snapshots de outerHTML")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG_PATH)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    listing = subparsers.add_parser("list", help="Versiones registradas")
+    reparse_cmd = subparsers.add_parser("reparse", help="Extraer registros de versiones históricas")
+    for sub in (listing, reparse_cmd):
+        sub.add_argument("--chain", choices=list(CHAINS))
+        sub.add_argument("--page")
+        sub.add_argument("--since", help="YYYY-MM-DD")
+        sub.add_argument("--until", help="YYYY-MM-DD")
+    reparse_cmd.add_argument("--out", default="registros")
+
+    as_of = subparsers.add_parser("as-of", help="Versión vigente de una página en una fecha")
+    as_of.add_argument("chain", choices=list(CHAINS))
+    as_of.add_argument("page")
+    as_of.add_argument("when", help="YYYY-MM-DD o 'YYYY-MM-DD HH:MM:SS'")
+
+    sync = subparsers.add_parser("sync", help="Registrar versiones de almacenes existentes")
+    sync.add_argument("--chains", nargs="+", choices=list(CHAINS), default=list(CHAINS))
+    args = parser.parse_args()
+
+    catalog = SnapshotCatalog(args.catalog)
+    if args.command == "list":
+        for row in catalog.history(args.chain, args.page, args.since, args.until):
+            print(f"{row['chain']:<10} {row['page']:<40} {row['ts']} {row['hash'][:12]} {row['size'] or 0:>10}")
+    elif args.command == "as-of":
+        row = catalog.as_of(args.chain, args.page, args.when)
+        if row is None:
+            sys.exit(f"No hay snapshots de {args.chain}/{args.page} hasta {args.when}")
+        print(f"{row['ts']} {row['hash']} ({row['store_root']})")
+    elif args.command == "reparse":
+        summary = reparse(catalog, args.out, args.chain, args.page, args.since, args.until)
+        print(f"{summary['snapshots']} snapshots: "
+              + ", ".join(f"{count} {kind}" for kind, count in summary["records"].items()))
+    elif args.command == "sync":
+        from common.snapshot_store import SnapshotStore
+        from common.chains import outerhtml_output_dir
+        for code in args.chains:
+            root = os.path.join(outerhtml_output_dir(code), "store")
+            if any(os.path.exists(os.path.join(root, name)) for name in ("index.sqlite", "manifest.json")):
+                print(f"{code}: {catalog.sync_store(SnapshotStore(root, chain=code, catalog=None))} versiones registradas")
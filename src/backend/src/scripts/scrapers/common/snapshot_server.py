@@ -0,0 +1,113 @@
+"""
+Local HTTP stand-in for the supermarket homepages.
+
+Serves the newest outerHTML saved by each chain's HTML crawler at
+http://<host>:<port>/<code>/, with an ETag so conditional GETs answer 304.
+Point the HTTP-first fetcher at it to exercise the whole supermarket-info
+pipeline without touching the real sites:
+
+    python common/snapshot_server.py --port 8765
+    python 1-all-supermarketinfo.py --extraction-mode http --stand-in http://localhost:8765
+"""
+import os
+import sys
+import hashlib
+import logging
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.chains import CHAINS, saved_html_dirs
+from common.page_snapshot import find_latest_outerhtml
+
+
+class SnapshotRequestHandler(BaseHTTPRequestHandler):
+    # Set by make_snapshot_server(): {code: path}
+    pages = {}
+
+    def do_GET(self):
+        code = self.path.strip('/').split('/')[0].split('?')[0]
+        path = self.pages.get(code)
+        if not path:
+            self.send_error(404, f"No saved homepage for '{code}'")
+            return
+
+        with open(path, 'rb') as f:
+            body = f.read()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.info(f"snapshot server: {format % args}")
+
+
+def make_snapshot_server(host="127.0.0.1", port=0, pages=None):
+    """
+    Build (without starting) a stand-in server.
+
+    Args:
+        port (int): 0 picks a free port (see server.server_address).
+        pages (dict): {code: outerHTML path}; default: newest home_*.html of every chain.
+
+    Returns:
+        ThreadingHTTPServer
+    """
+    if pages is None:
+        pages = {}
+        for code in CHAINS:
+            path = find_latest_outerhtml(saved_html_dirs(code), "home")
+            if path:
+                pages[code] = path
+
+    handler = type('BoundSnapshotRequestHandler', (SnapshotRequestHandler,), {'pages': pages})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start_snapshot_server(host="127.0.0.1", port=0, pages=None):
+    """
+    Start a stand-in server in a daemon thread.
+
+    Returns:
+        tuple: (server, base_url); call server.shutdown() when done.
+    """
+    server = make_snapshot_server(host, port, pages)
+    threading.Thread(target=server.serve_forever, name="snapshot-server", daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def stand_in_urls(base_url, codes=None):
+    """{code: url} mapping for fetch_homepage_snapshots() against a stand-in"""
+    return {code: f"{base_url.rstrip('/')}/{code}/" for code in (codes or CHAINS)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve saved homepages as a local stand-in for the supermarket sites")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = make_snapshot_server(args.host, args.port)
+    print(f"Serving {', '.join(server.RequestHandlerClass.pages) or 'no chains'} at http://{args.host}:{args.port}/<code>/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,395 @@
+"""
+Almacén de snapshots de outerHTML direccionado por contenido.
+
+Reemplaza el ir y venir de archivos con el vault: cada snapshot se guarda una
+sola vez, comprimido con zstd, bajo el SHA-256 de su contenido
+
+    <root>/objects/ab/abcdef....zst
+
+y un índice SQLite (<root>/index.sqlite) registra, por página, las últimas
+versiones (timestamp -> hash) y el contador de referencias de cada blob. Una
+página que no cambió entre dos crawls no ocupa espacio extra: la nueva entrada
+apunta al mismo blob. Cada put toca solo las filas de su página y la de su
+blob, así que su costo no crece con la cantidad de páginas del almacén. Un
+manifest.json de versiones anteriores se importa al abrir el almacén y se
+renombra a manifest.json.migrated.
+
+Cada versión se registra además en el catálogo SQLite
+(common/snapshot_catalog.py), que decide la retención escalonada: las últimas
+keep versiones, una por día durante una semana y una por semana durante un
+trimestre. Las versiones que el catálogo descarta salen del índice y se
+decrementa el contador de referencias de su blob, borrándolo cuando llega a
+cero. No se listan ni ordenan directorios. Sin catálogo (catalog=None) se
+conservan solo las últimas keep.
+
+Opcionalmente se entrena un diccionario zstd con las páginas de la cadena
+(train_dictionary); las páginas VTEX comparten mucho markup, así que el
+diccionario mejora bastante la compresión. Cada entrada recuerda con qué
+diccionario se comprimió su blob.
+
+Uso por línea de comandos:
+
+    python common/snapshot_store.py stats --chains carrefour dia
+    python common/snapshot_store.py train --chains carrefour
+    python common/snapshot_store.py cat carrefour home > home.html
+"""
+import os
+import sys
+import json
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from collections import Counter
+from datetime import datetime
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.chains import CHAINS, outerhtml_output_dir
+from common.snapshot_catalog import get_snapshot_catalog
+
+DEFAULT_KEEP = int(os.environ.get("SNAPSHOT_KEEP_VERSIONS", "2"))
+DEFAULT_LEVEL = 10
+DICTIONARY_SIZE = 112640
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    id INTEGER PRIMARY KEY,
+    page TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS versions_page ON versions (page, id);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    dictionary TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+) WITHOUT ROWID;
+"""
+
+
+class SnapshotStore:
+    def __init__(self, root, chain=None, keep=DEFAULT_KEEP, level=DEFAULT_LEVEL, catalog=None):
+        import zstandard
+
+        self.zstd = zstandard
+        self.root = root
+        self.chain = chain
+        self.keep = keep
+        self.level = level
+        self.catalog = catalog
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(root, "index.sqlite"), timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self._migrate_manifest()
+        self.dictionaries = {}
+
+    def _migrate_manifest(self):
+        """Importa el manifest.json de versiones anteriores del almacén"""
+        manifest_path = os.path.join(self.root, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        with self.lock, self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO blobs (hash, count, size, stored_size, dictionary) VALUES (?, ?, ?, ?, ?)",
+                [(digest, ref["count"], ref["size"], ref["storedSize"], ref.get("dictionary"))
+                 for digest, ref in manifest.get("refs", {}).items()]
+            )
+            self.db.executemany(
+                "INSERT INTO versions (page, ts, hash) VALUES (?, ?, ?)",
+                [(page, entry["ts"], entry["hash"]) for page, versions in manifest.get("pages", {}).items()
+                 for entry in versions]
+            )
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dictionary', ?)",
+                            (manifest.get("dictionary"),))
+        os.replace(manifest_path, f"{manifest_path}.migrated")
+        logging.info(f"manifest.json de {self.root} importado al índice ({len(manifest.get('pages', {}))} páginas)")
+
+    def _meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def ref(self, digest):
+        """Datos de un blob {"count", "size", "storedSize", "dictionary"}, o None"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT count, size, stored_size, dictionary FROM blobs WHERE hash = ?", (digest,)
+            ).fetchone()
+        return dict(zip(("count", "size", "storedSize", "dictionary"), row)) if row else None
+
+    def blob_path(self, digest):
+        """Ruta del blob comprimido de un hash"""
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.zst")
+
+    def sidecar_path(self, digest, kind):
+        """Ruta de un archivo derivado de un blob (e.g. 'sig', el árbol de firmas de dom_diff)"""
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.{kind}")
+
+    def _dictionary(self, dict_id):
+        if dict_id is None:
+            return None
+        if dict_id not in self.dictionaries:
+            with open(os.path.join(self.root, "dictionaries", f"{dict_id}.dict"), 'rb') as f:
+                self.dictionaries[dict_id] = self.zstd.ZstdCompressionDict(f.read())
+        return self.dictionaries[dict_id]
+
+    def put(self, page_name, html, timestamp=None):
+        """
+        Agrega una versión de una página.
+
+        Args:
+            page_name (str): Nombre de la página (e.g., 'home').
+            html (str): outerHTML.
+            timestamp (str): YYYYMMDD_HHMMSS (por defecto, ahora).
+
+        Returns:
+            dict: Entrada del índice {"ts", "hash", "size", "storedSize", "dictionary", "new"}
+        """
+        data = html.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        with self.lock, self.db:
+            row = self.db.execute("SELECT size, stored_size, dictionary FROM blobs WHERE hash = ?", (digest,)).fetchone()
+            is_new = row is None
+            if is_new:
+                dict_id = self._meta("dictionary")
+                compressor = self.zstd.ZstdCompressor(level=self.level, dict_data=self._dictionary(dict_id))
+                blob = compressor.compress(data)
+                path = self.blob_path(digest)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(blob)
+                os.replace(tmp_path, path)
+                row = (len(data), len(blob), dict_id)
+                self.db.execute("INSERT INTO blobs (hash, count, size, stored_size, dictionary) VALUES (?, 1, ?, ?, ?)",
+                                (digest, *row))
+            else:
+                self.db.execute("UPDATE blobs SET count = count + 1 WHERE hash = ?", (digest,))
+            ref = dict(zip(("size", "storedSize", "dictionary"), row))
+            entry = {"ts": timestamp, "hash": digest}
+            self.db.execute("INSERT INTO versions (page, ts, hash) VALUES (?, ?, ?)", (page_name, timestamp, digest))
+
+            if self.catalog is not None:
+                # Retención escalonada decidida por el catálogo, solo sobre esta página
+                dropped = Counter((row["ts"], row["hash"]) for row in self.catalog.add(
+                    self.chain, page_name, timestamp, digest, os.path.abspath(self.root), ref["size"], self.keep))
+                if dropped:
+                    for version_id, ts, version_hash in self.db.execute(
+                            "SELECT id, ts, hash FROM versions WHERE page = ? ORDER BY id", (page_name,)).fetchall():
+                        if dropped[(ts, version_hash)]:
+                            dropped[(ts, version_hash)] -= 1
+                            self._drop_version(version_id, version_hash)
+            elif self.keep:
+                # Sin catálogo: a lo sumo una versión sale por cada una que entra
+                versions = self.db.execute(
+                    "SELECT id, hash FROM versions WHERE page = ? ORDER BY id DESC LIMIT -1 OFFSET ?",
+                    (page_name, self.keep)
+                ).fetchall()
+                for version_id, version_hash in versions:
+                    self._drop_version(version_id, version_hash)
+
+        logging.info(
+            f"Snapshot {self.chain}/{page_name} {timestamp}: {digest[:12]} "
+            f"({'nuevo' if is_new else 'sin cambios, blob reutilizado'}, {ref['size']} -> {ref['storedSize']} bytes)"
+        )
+        return {**entry, "size": ref["size"], "storedSize": ref["storedSize"], "dictionary": ref["dictionary"],
+                "new": is_new}
+
+    def _drop_version(self, version_id, digest):
+        """Borra una versión y libera su blob (con el lock y la transacción tomados)"""
+        self.db.execute("DELETE FROM versions WHERE id = ?", (version_id,))
+        self.db.execute("UPDATE blobs SET count = count - 1 WHERE hash = ?", (digest,))
+        if self.db.execute("DELETE FROM blobs WHERE hash = ? AND count <= 0", (digest,)).rowcount:
+            for path in (self.blob_path(digest), self.sidecar_path(digest, "sig")):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def drop_page(self, page_name):
+        """
+        Borra todas las versiones de una página (también del catálogo) y libera sus blobs.
+
+        Returns:
+            int: Versiones borradas.
+        """
+        with self.lock, self.db:
+            versions = self.db.execute("SELECT id, hash FROM versions WHERE page = ?", (page_name,)).fetchall()
+            for version_id, digest in versions:
+                self._drop_version(version_id, digest)
+        if self.catalog is not None:
+            self.catalog.drop_page(self.chain, page_name)
+        return len(versions)
+
+    def get(self, digest):
+        """outerHTML de un blob por su hash"""
+        ref = self.ref(digest)
+        if ref is None:
+            raise KeyError(f"Snapshot {digest} no está en {self.root}")
+        with open(self.blob_path(digest), 'rb') as f:
+            blob = f.read()
+        decompressor = self.zstd.ZstdDecompressor(dict_data=self._dictionary(ref.get("dictionary")))
+        return decompressor.decompress(blob, max_output_size=ref["size"]).decode('utf-8')
+
+    def open(self, digest):
+        """
+        Archivo de texto con el outerHTML de un blob, descomprimido en streaming
+        (para procesar snapshots grandes sin cargarlos enteros).
+        """
+        import io
+
+        ref = self.ref(digest)
+        if ref is None:
+            raise KeyError(f"Snapshot {digest} no está en {self.root}")
+        decompressor = self.zstd.ZstdDecompressor(dict_data=self._dictionary(ref.get("dictionary")))
+        reader = decompressor.stream_reader(open(self.blob_path(digest), 'rb'), closefd=True)
+        return io.TextIOWrapper(reader, encoding='utf-8')
+
+    def pages(self):
+        """Páginas con al menos una versión retenida"""
+        with self.lock:
+            return [page for page, in self.db.execute("SELECT DISTINCT page FROM versions ORDER BY page")]
+
+    def history(self, page_name):
+        """Versiones retenidas de una página, de la más vieja a la más nueva"""
+        with self.lock:
+            rows = self.db.execute("SELECT ts, hash FROM versions WHERE page = ? ORDER BY id", (page_name,)).fetchall()
+        return [{"ts": ts, "hash": digest} for ts, digest in rows]
+
+    def latest(self, page_name):
+        """Entrada más reciente de una página, o None"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT ts, hash FROM versions WHERE page = ? ORDER BY id DESC LIMIT 1", (page_name,)
+            ).fetchone()
+        return {"ts": row[0], "hash": row[1]} if row else None
+
+    def load_latest(self, page_name):
+        """outerHTML más reciente de una página, o None"""
+        entry = self.latest(page_name)
+        return self.get(entry["hash"]) if entry else None
+
+    def train_dictionary(self, size=DICTIONARY_SIZE, chunk_size=16384):
+        """
+        Entrena un diccionario zstd con los snapshots retenidos y lo usa para
+        los blobs nuevos (los existentes siguen legibles con el suyo).
+
+        Returns:
+            str: Id del diccionario, o None si no hay muestras suficientes.
+        """
+        samples = []
+        with self.lock:
+            digests = [digest for digest, in self.db.execute("SELECT hash FROM blobs")]
+        for digest in digests:
+            data = self.get(digest).encode('utf-8')
+            # Trozos en vez de páginas enteras: zstd necesita muchas muestras
+            samples.extend(data[i:i + chunk_size] for i in range(0, len(data), chunk_size))
+
+        if len(samples) < 10:
+            logging.warning(f"Muy pocas muestras para entrenar un diccionario en {self.root}")
+            return None
+
+        dictionary = self.zstd.train_dictionary(size, samples)
+        dict_id = str(dictionary.dict_id())
+        dict_dir = os.path.join(self.root, "dictionaries")
+        os.makedirs(dict_dir, exist_ok=True)
+        with open(os.path.join(dict_dir, f"{dict_id}.dict"), 'wb') as f:
+            f.write(dictionary.as_bytes())
+
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dictionary', ?)", (dict_id,))
+        logging.info(f"Diccionario zstd {dict_id} entrenado con {len(samples)} muestras para {self.root}")
+        return dict_id
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def stats(self):
+        """
+        Returns:
+            dict: {"pages", "versions", "blobs", "rawBytes", "storedBytes", "ratio"}
+        """
+        with self.lock:
+            pages, versions, raw = self.db.execute(
+                # Bytes que ocuparían todas las versiones retenidas como HTML plano
+                "SELECT COUNT(DISTINCT v.page), COUNT(*), COALESCE(SUM(b.size), 0) "
+                "FROM versions v JOIN blobs b ON b.hash = v.hash"
+            ).fetchone()
+            blobs, stored = self.db.execute("SELECT COUNT(*), COALESCE(SUM(stored_size), 0) FROM blobs").fetchone()
+        return {
+            "pages": pages,
+            "versions": versions,
+            "blobs": blobs,
+            "rawBytes": raw,
+            "storedBytes": stored,
+            "ratio": raw / stored if stored else 0.0,
+        }
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_snapshot_store(code, output_dir=None, keep=DEFAULT_KEEP):
+    """
+    Almacén de una cadena (uno por proceso y directorio, compartido entre hilos),
+    registrado en el catálogo compartido.
+
+    Args:
+        code (str): Código de la cadena.
+        output_dir (str): Directorio de salida del crawler (por defecto el de la cadena);
+            el almacén vive en <output_dir>/store.
+        keep (int): Últimas versiones retenidas siempre por página.
+    """
+    root = os.path.join(output_dir or outerhtml_output_dir(code), "store")
+    with _stores_lock:
+        if root not in _stores:
+            catalog = get_snapshot_catalog()
+            store = SnapshotStore(root, chain=code, keep=keep, catalog=catalog)
+            # Versiones guardadas antes de que existiera el catálogo
+            catalog.sync_store(store)
+            _stores[root] = store
+        return _stores[root]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Almacén de snapshots de outerHTML por cadena")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("stats", "Uso de disco por cadena"), ("train", "Entrenar el diccionario zstd de cada cadena")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("--chains", nargs="+", choices=list(CHAINS), default=list(CHAINS))
+    cat = subparsers.add_parser("cat", help="Imprimir el snapshot más reciente de una página")
+    cat.add_argument("chain", choices=list(CHAINS))
+    cat.add_argument("page_name")
+    args = parser.parse_args()
+
+    if args.command == "cat":
+        html = get_snapshot_store(args.chain).load_latest(args.page_name)
+        if html is None:
+            sys.exit(f"No hay snapshots de {args.chain}/{args.page_name}")
+        sys.stdout.write(html)
+    else:
+        for code in args.chains:
+            store = get_snapshot_store(code)
+            if args.command == "train":
+                store.train_dictionary()
+            s = store.stats()
+            print(f"{code}: {s['pages']} páginas, {s['versions']} versiones, {s['blobs']} blobs, "
+                  f"{s['rawBytes']} -> {s['storedBytes']} bytes ({s['ratio']:.1f}x)")
@@ -0,0 +1,686 @@
+"""
+Config-driven supermarket-info engine.
+
+One SupermarketInfoScraper class serves every chain; what differs between
+sites (base URL, domain, logo alt text, code) comes from common.chains.
+scrape_chains() runs several chains in one process over a bounded pool of
+Firefox instances (or, in "http" mode, over concurrent plain GETs with
+Selenium only as fallback, see common.http_fetch) and run_all_chains() upserts the collected results in one
+request (common.api_client) against a single shared backend server
+(common.backend_server).
+"""
+import time
+import logging
+import re
+import datetime
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from selenium.webdriver.firefox.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from colorama import Fore, Style
+import requests
+
+from common.chains import CHAINS, get_chain, saved_html_dirs
+from common.backend_server import get_backend_server
+from common.api_client import SupermarketInfoClient
+from common.trackers import scan_trackers
+from common.fingerprint import content_fingerprint, check_homepage_unchanged
+from common.http_fetch import fetch_homepage_snapshots
+from common.timing import PhaseTimer
+from common.browser_pool import create_driver
+from common.checkpoint import Checkpoint
+from common.page_snapshot import (
+    capture_page_snapshot, collect_page_snapshot_live, supermarket_info_fields,
+    find_latest_outerhtml, load_page_snapshot
+)
+
+
+def build_firefox_options():
+    """Firefox options - headless mode for production"""
+    options = Options()
+    options.add_argument("--headless")  # Run in headless mode
+    options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
+    return options
+
+
+class SupermarketInfoScraper:
+    def __init__(self, chain, extraction_mode="snapshot", snapshot_file=None,
+                 conditional_get=False, skip_unchanged=False, homepage_url=None, timer=None, api=None):
+        self.chain = get_chain(chain) if isinstance(chain, str) else chain
+        self.code = self.chain["code"]
+        self.name = self.chain["name"]
+        self.base_url = self.chain["base_url"]
+        # Shared API client, or one of its own created on first use (scrape_chains never needs it)
+        self._api = api
+        self._owns_api = api is None
+
+        self.options = build_firefox_options()
+
+        # "snapshot": one execute_script round trip; "live": one WebDriver call per element;
+        # "offline": parse the newest outerHTML saved by the HTML crawler, no browser;
+        # "http": plain GET + static parse, browser only if a required field is missing
+        self.extraction_mode = extraction_mode
+        self.homepage_url = homepage_url or self.base_url + "/"
+        self.snapshot_file = snapshot_file
+        self.snapshot_dirs = saved_html_dirs(self.code)
+        self.snapshot_fields = supermarket_info_fields(self.chain["logo_alt"])
+        self.snapshot = None
+
+        # Change detection: conditional GET pre-check and client-side skip of unchanged content
+        self.conditional_get = conditional_get
+        self.skip_unchanged = skip_unchanged
+        self.http_validators = {}
+
+        self.driver = None
+        self.server = get_backend_server()
+
+        # Per-phase timing spans (JSON lines, optional Prometheus textfile, summary table)
+        self.timer = timer or PhaseTimer()
+
+    def span(self, phase, **attrs):
+        """Timing span tagged with this chain"""
+        return self.timer.span(phase, chain=self.code, **attrs)
+
+    def start_driver(self):
+        """Initialize the Firefox WebDriver"""
+        try:
+            with self.span("driver_start"):
+                # Leased warm session when BROWSER_POOL_URL is set, else a local cold start
+                self.driver = create_driver("firefox", self.options)
+            logging.info("Firefox WebDriver started successfully")
+        except Exception as e:
+            logging.error(f"Failed to start WebDriver: {e}")
+            raise
+
+    @property
+    def api(self):
+        if self._api is None:
+            self._api = SupermarketInfoClient()
+        return self._api
+
+    def close_api(self):
+        """Close the API client if this scraper created it"""
+        if self._owns_api and self._api is not None:
+            self._api.close()
+            self._api = None
+
+    def close_driver(self):
+        """Close the WebDriver"""
+        if self.driver:
+            self.driver.quit()
+            logging.info("WebDriver closed")
+
+    def start_server(self):
+        """Start (or reuse) the shared Node.js backend server"""
+        with self.span("server_start"):
+            return self.server.start()
+
+    def stop_server(self):
+        """Release the shared backend server; it stops when its last user is done"""
+        with self.span("server_stop"):
+            self.server.stop()
+
+    def load_homepage(self):
+        """Navigate to the homepage and capture the DOM snapshot used by the extractors"""
+        with self.span("page_load", mode=self.extraction_mode):
+            return self._load_homepage()
+
+    def _load_homepage(self):
+        if self.extraction_mode == "offline":
+            return self.load_saved_homepage()
+
+        if self.extraction_mode == "http":
+            if self.fetch_homepage():
+                return self.snapshot
+            # Selenium fallback
+            if self.driver is None:
+                self.start_driver()
+
+        self.driver.get(self.base_url)
+        WebDriverWait(self.driver, 10).until(
+            EC.presence_of_element_located((By.TAG_NAME, "body"))
+        )
+
+        if self.extraction_mode == "live":
+            self.snapshot = collect_page_snapshot_live(self.driver, self.snapshot_fields)
+        else:
+            self.snapshot = capture_page_snapshot(self.driver, self.snapshot_fields)
+
+        logging.info(
+            f"Captured {self.extraction_mode} DOM snapshot: "
+            f"{len(self.snapshot.get('scripts', []))} scripts, "
+            f"{len(self.snapshot.get('footerLinks', []))} footer links"
+        )
+        return self.snapshot
+
+    def fetch_homepage(self):
+        """Fetch and parse the homepage over plain HTTP; False if the browser is needed"""
+        with self.span("http_fetch"):
+            result = fetch_homepage_snapshots([self.code], {self.code: self.homepage_url})[self.code]
+        return self.accept_http_snapshot(result)
+
+    def accept_http_snapshot(self, result):
+        """
+        Use an HTTP-fetched snapshot if it has every required field.
+
+        Args:
+            result: Snapshot or Exception from fetch_homepage_snapshots().
+
+        Returns:
+            bool: True if self.snapshot was set, False if Selenium must take over.
+        """
+        if isinstance(result, Exception):
+            reason = str(result)
+        elif result.get("missing"):
+            reason = f"missing {', '.join(result['missing'])}"
+        else:
+            self.http_validators = {**self.http_validators, **result.pop("httpValidators", {})}
+            self.snapshot = result
+            print(f"{Fore.GREEN}{self.name}: homepage parsed over HTTP{Style.RESET_ALL}")
+            return True
+
+        print(f"{Fore.YELLOW}{self.name}: HTTP fetch not usable ({reason}), falling back to Selenium{Style.RESET_ALL}")
+        logging.warning(f"{self.name}: HTTP fetch not usable ({reason}), falling back to Selenium")
+        return False
+
+    def load_saved_homepage(self):
+        """Parse the newest saved homepage outerHTML instead of launching a browser"""
+        path = self.snapshot_file or find_latest_outerhtml(self.snapshot_dirs, "home")
+        if not path:
+            raise Exception(f"No saved homepage snapshot found in {self.snapshot_dirs}")
+
+        self.snapshot = load_page_snapshot(path, self.snapshot_fields, self.base_url + "/")
+
+        print(f"{Fore.CYAN}Using saved homepage snapshot: {path}{Style.RESET_ALL}")
+        logging.info(
+            f"Parsed offline snapshot {path}: "
+            f"{len(self.snapshot.get('scripts', []))} scripts, "
+            f"{len(self.snapshot.get('footerLinks', []))} footer links"
+        )
+        return self.snapshot
+
+    def extract_basic_info(self):
+        """Extract basic supermarket information"""
+        try:
+            fields = self.snapshot["fields"]
+
+            basic_info = {
+                "name": self.name,
+                "website": self.base_url,
+                "country": self.chain["country"],
+                "language": self.chain["language"],
+                "currency": self.chain["currency"],
+                "domain": self.chain["domain"],
+                "charset": self.chain["charset"],  # Default for modern sites
+                "homepageMetadata": {
+                    "title": self.snapshot.get("title"),
+                    "description": fields.get("metaDescription"),
+                    "ogImage": fields.get("ogImage"),
+                    "favicon": fields.get("favicon")
+                }
+            }
+
+            logging.info(f"Extracted basic info: {basic_info}")
+            return basic_info
+
+        except Exception as e:
+            logging.error(f"Error extracting basic info: {e}")
+            return {}
+
+    def extract_platform_info(self):
+        """Extract platform and technical information"""
+        try:
+            platform_info = {}
+            fields = self.snapshot["fields"]
+
+            # Check for VTEX platform indicators (single-pass signature scan)
+            if self.detect_trackers().get("vtex"):
+                platform_info["platform"] = "VTEX"
+
+                # Try to extract VTEX version from scripts
+                for script in self.snapshot["scripts"]:
+                    src = script.get("src") or ''
+                    if 'vtex' in src.lower():
+                        # Look for version patterns in URL
+                        version_match = re.search(r'v(\d+\.\d+\.\d+)', src)
+                        if version_match:
+                            platform_info["platformVersion"] = version_match.group(1)
+                            break
+
+                # Extract workspace from meta
+                platform_info["workspace"] = fields.get("vtexWorkspace", "master")  # Default
+
+            # Check for PWA
+            if "manifest" in fields:
+                platform_info["pwa"] = {
+                    "enabled": True,
+                    "manifest": fields["manifest"]
+                }
+            else:
+                platform_info["pwa"] = {"enabled": False}
+
+            # Extract theme color
+            if "themeColor" in fields:
+                platform_info["pwa"]["themeColor"] = fields["themeColor"]
+
+            logging.info(f"Extracted platform info: {platform_info}")
+            return platform_info
+
+        except Exception as e:
+            logging.error(f"Error extracting platform info: {e}")
+            return {}
+
+    def detect_trackers(self):
+        """Scan the page source once for every tracker/platform signature (cached per snapshot)"""
+        if "trackers" not in self.snapshot:
+            self.snapshot["trackers"] = scan_trackers(self.snapshot.get("html"))
+            logging.info(f"Detected trackers: {self.snapshot['trackers']}")
+        return self.snapshot["trackers"]
+
+    def extract_analytics_info(self):
+        """Extract analytics and tracking information"""
+        try:
+            trackers = self.detect_trackers()
+            analytics_info = {}
+
+            # Google Analytics (GA4)
+            if "googleAnalytics" in trackers:
+                analytics_info["googleAnalytics"] = trackers["googleAnalytics"]
+
+            # Google Tag Manager
+            analytics_info["googleTagManager"] = trackers.get("googleTagManager", [])
+
+            # Facebook Pixel
+            if "facebookPixel" in trackers:
+                analytics_info["facebookPixel"] = trackers["facebookPixel"]
+
+            # Dynamic Yield (site ID when the API script URL exposes it)
+            if "dynamicYield" in trackers:
+                analytics_info["dynamicYield"] = trackers["dynamicYield"]
+            elif trackers.get("dynamicYieldScript"):
+                analytics_info["dynamicYield"] = "present"
+
+            logging.info(f"Extracted analytics info: {analytics_info}")
+            return {"analytics": analytics_info}
+
+        except Exception as e:
+            logging.error(f"Error extracting analytics info: {e}")
+            return {}
+
+    def extract_legal_info(self):
+        """Extract legal and policy information"""
+        try:
+            legal_info = {}
+
+            # Look for footer links
+            for link in self.snapshot["footerLinks"]:
+                href = link.get("href")
+                text = (link.get("text") or "").lower().strip()
+                if href and href.startswith('http'):
+                    if any(word in text for word in ['privacidad', 'privacy', 'política de privacidad']):
+                        legal_info["privacyPolicy"] = href
+                    elif any(word in text for word in ['términos', 'terminos', 'terms', 'condiciones']):
+                        legal_info["termsAndConditions"] = href
+                    elif 'cookies' in text:
+                        legal_info["cookiePolicy"] = href
+                    elif any(word in text for word in ['consumidor', 'defensa']):
+                        legal_info["consumerDefense"] = href
+
+            logging.info(f"Extracted legal info: {legal_info}")
+            return {"legalInfo": legal_info}
+
+        except Exception as e:
+            logging.error(f"Error extracting legal info: {e}")
+            return {}
+
+    def extract_logo_info(self):
+        """Extract logo and isoLogo information"""
+        try:
+            logo_info = {}
+            fields = self.snapshot["fields"]
+
+            # Main logo
+            if "logo" in fields:
+                logo_info["logo"] = fields["logo"]
+
+            # Iso logo (smaller version)
+            if "isoLogo" in fields:
+                logo_info["isoLogo"] = fields["isoLogo"]
+
+            logging.info(f"Extracted logo info: {logo_info}")
+            return logo_info
+
+        except Exception as e:
+            logging.error(f"Error extracting logo info: {e}")
+            return {}
+
+    def save_to_api(self, data):
+        """Save extracted data via the bulk upsert endpoint (one round trip, idempotent by code)"""
+        try:
+            # Set custom code identifier
+            data["code"] = self.code
+
+            # Note: updatedAt will be handled automatically by Mongoose timestamps
+            print(f"{Fore.CYAN}Upserting {self.name} data at: {self.api.upsert_url}{Style.RESET_ALL}")
+            with self.span("api_upsert"):
+                result = self.api.upsert(data)
+
+            status = result["results"][0]["status"] if result.get("results") else "saved"
+            print(f"{Fore.GREEN}Data {status} successfully{Style.RESET_ALL}")
+            logging.info(f"{self.name} data {status} successfully")
+            return result
+
+        except requests.exceptions.Timeout:
+            logging.error("Timeout error saving to API")
+            print(f"{Fore.RED}Timeout error saving to API{Style.RESET_ALL}")
+        except requests.exceptions.ConnectionError as e:
+            logging.error(f"Connection error saving to API: {e}")
+            print(f"{Fore.RED}Connection error saving to API: {e}{Style.RESET_ALL}")
+        except Exception as e:
+            logging.error(f"Error saving to API: {e}")
+            print(f"{Fore.RED}Failed to save data to API: {e}{Style.RESET_ALL}")
+
+    def scrape(self, snapshot=None):
+        """Load the homepage once (unless a snapshot is given) and run every extractor over it"""
+        if snapshot is not None:
+            self.snapshot = snapshot
+        else:
+            self.load_homepage()
+
+        extractors = (
+            self.extract_basic_info,
+            self.extract_platform_info,
+            self.extract_analytics_info,
+            self.extract_legal_info,
+            self.extract_logo_info,
+        )
+
+        # Combine all data
+        data = {}
+        for extractor in extractors:
+            with self.span(extractor.__name__):
+                data.update(extractor())
+        data["contentFingerprint"] = content_fingerprint(data)
+        data.update(self.http_validators)
+        data["lastHomepageScraped"] = datetime.datetime.now().isoformat()
+        return data
+
+    def check_unchanged(self, validators):
+        """
+        Conditional GET with the stored ETag / Last-Modified.
+
+        Args:
+            validators (dict): Stored validators for this chain (may be None).
+
+        Returns:
+            bool: True if the homepage answered 304 and the browser can be skipped.
+        """
+        validators = validators or {}
+        with self.span("conditional_get"):
+            unchanged, self.http_validators = check_homepage_unchanged(
+                self.homepage_url,
+                etag=validators.get("homepageEtag"),
+                last_modified=validators.get("homepageLastModified")
+            )
+        if unchanged:
+            print(f"{Fore.GREEN}{self.name} homepage not modified, skipping browser{Style.RESET_ALL}")
+        return unchanged and bool(validators.get("contentFingerprint"))
+
+    def touch_document(self, validators):
+        """Document that only refreshes lastHomepageScraped for an unchanged homepage"""
+        return {
+            "code": self.code,
+            "contentFingerprint": validators["contentFingerprint"],
+            **self.http_validators,
+            "lastHomepageScraped": datetime.datetime.now().isoformat()
+        }
+
+    def ensure_server(self):
+        """Verify the server is still running before saving, restarting it if needed"""
+        print(f"{Fore.CYAN}Verifying server status before saving...{Style.RESET_ALL}")
+        if not self.server.ensure_running():
+            raise Exception("Failed to restart server")
+
+    def run(self):
+        """Main execution method"""
+        server_started = False
+        try:
+            print(f"{Fore.CYAN}Starting {self.name} Supermarket Info Scraper{Style.RESET_ALL}")
+            logging.info(f"Starting {self.name} Supermarket Info Scraper")
+
+            # Start the backend server
+            server_started = self.start_server()
+            if not server_started:
+                raise Exception("Failed to start backend server")
+
+            validators = {}
+            if self.conditional_get or self.skip_unchanged:
+                with self.span("api_validators"):
+                    validators = self.api.get_validators([self.code]).get(self.code, {})
+
+            if self.conditional_get and self.check_unchanged(validators):
+                supermarket_data = self.touch_document(validators)
+            else:
+                # Start WebDriver (not needed for saved snapshots; started on demand in http mode)
+                if self.extraction_mode not in ("offline", "http"):
+                    self.start_driver()
+
+                supermarket_data = self.scrape()
+
+                print(f"{Fore.GREEN}Data extraction completed successfully{Style.RESET_ALL}")
+                logging.info("Data extraction completed successfully")
+
+            if self.skip_unchanged and supermarket_data["contentFingerprint"] == validators.get("contentFingerprint"):
+                print(f"{Fore.GREEN}{self.name} content unchanged, skipping write{Style.RESET_ALL}")
+                logging.info(f"{self.name} content unchanged, skipping write")
+                return
+
+            self.ensure_server()
+
+            # Save to API
+            self.save_to_api(supermarket_data)
+
+            print(f"{Fore.GREEN}Scraping completed successfully!{Style.RESET_ALL}")
+            logging.info("Scraping completed successfully")
+
+        except Exception as e:
+            print(f"{Fore.RED}Error during scraping: {e}{Style.RESET_ALL}")
+            logging.error(f"Error during scraping: {e}")
+        finally:
+            # Always close WebDriver and the API session
+            self.close_driver()
+            self.close_api()
+
+            # Always stop server if it was started
+            if server_started:
+                self.stop_server()
+
+            self.timer.print_summary()
+
+
+def scrape_chains(codes=None, max_browsers=3, extraction_mode="snapshot", validators=None, conditional_get=False,
+                  homepage_urls=None, timer=None, checkpoint=None):
+    """
+    Scrape several chains concurrently over a bounded pool of browsers.
+
+    Each worker thread leases a Firefox instance from the pool, scrapes one
+    chain and returns the instance, so at most max_browsers browsers are
+    started no matter how many chains are requested. In "http" mode every
+    homepage is first fetched concurrently over plain HTTP and only the chains
+    whose snapshot lacks a required field lease a browser.
+
+    Args:
+        codes (list): Chain codes to scrape (default: every chain in the registry).
+        max_browsers (int): Maximum number of simultaneous Firefox instances.
+        extraction_mode (str): "snapshot", "live", "offline" or "http".
+        validators (dict): {code: stored validators}, used by the conditional GET.
+        conditional_get (bool): Skip the browser for homepages answering 304.
+        homepage_urls (dict): {code: url} to fetch instead of the real homepage
+            (e.g. a local stand-in, see common/snapshot_server.py).
+        timer (PhaseTimer): Shared timing recorder (default: a new one).
+        checkpoint (Checkpoint): Journal of chains already scraped in an interrupted
+            run; their stored data is reused instead of scraping them again.
+
+    Returns:
+        tuple: ({code: data}, {code: error message})
+    """
+    codes = list(codes or CHAINS)
+    validators = validators or {}
+    homepage_urls = homepage_urls or {}
+    timer = timer or PhaseTimer()
+    idle_drivers = queue.LifoQueue()
+    started_drivers = []
+    results, errors = {}, {}
+
+    if checkpoint is not None:
+        for code in codes:
+            if checkpoint.is_done(code):
+                results[code] = checkpoint.result(code)
+                print(f"{Fore.YELLOW}{code}: reusing data from the interrupted run ({checkpoint.path}){Style.RESET_ALL}")
+        codes = [code for code in codes if code not in results]
+
+    def scrape_one(code):
+        scraper = SupermarketInfoScraper(
+            code, extraction_mode=extraction_mode, homepage_url=homepage_urls.get(code), timer=timer
+        )
+        if conditional_get and scraper.check_unchanged(validators.get(code)):
+            return scraper.touch_document(validators[code])
+        if extraction_mode == "offline":
+            return scraper.scrape()
+        if extraction_mode == "http":
+            if scraper.accept_http_snapshot(http_snapshots[code]):
+                return scraper.scrape(snapshot=scraper.snapshot)
+            scraper.extraction_mode = "snapshot"
+
+        try:
+            scraper.driver = idle_drivers.get_nowait()
+        except queue.Empty:
+            scraper.start_driver()
+            started_drivers.append(scraper.driver)
+        try:
+            return scraper.scrape()
+        finally:
+            idle_drivers.put(scraper.driver)
+
+    http_snapshots = {}
+    if extraction_mode == "http":
+        with timer.span("http_fetch", chain="all"):
+            http_snapshots = fetch_homepage_snapshots(codes, homepage_urls)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_browsers, len(codes)))) as executor:
+            futures = {executor.submit(scrape_one, code): code for code in codes}
+            for future in as_completed(futures):
+                code = futures[future]
+                try:
+                    results[code] = future.result()
+                    if checkpoint is not None:
+                        checkpoint.complete(code, results[code])
+                    print(f"{Fore.GREEN}{code}: data extraction completed{Style.RESET_ALL}")
+                    logging.info(f"{code}: data extraction completed")
+                except Exception as e:
+                    errors[code] = str(e)
+                    if checkpoint is not None:
+                        checkpoint.fail(code, e)
+                    print(f"{Fore.RED}{code}: error during scraping: {e}{Style.RESET_ALL}")
+                    logging.error(f"{code}: error during scraping: {e}")
+    finally:
+        for driver in started_drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                logging.warning(f"Error closing WebDriver: {e}")
+        logging.info(f"Closed {len(started_drivers)} WebDriver instance(s)")
+
+    return results, errors
+
+
+def run_all_chains(codes=None, max_browsers=3, extraction_mode="snapshot", conditional_get=False, skip_unchanged=False,
+                   homepage_urls=None, timer=None, checkpoint=None):
+    """
+    Scrape every requested chain, then save all results with one bulk upsert.
+
+    Args:
+        conditional_get (bool): Skip the browser for homepages answering 304.
+        skip_unchanged (bool): Do not send documents whose fingerprint matches the
+            stored one (by default they are sent and the backend only touches
+            lastHomepageScraped).
+        homepage_urls (dict): {code: url} overrides for the fetch (see scrape_chains).
+        timer (PhaseTimer): Timing recorder; its summary is printed at the end.
+        checkpoint (Checkpoint): Journal of scraped chains (default: 'supermarket_info',
+            flushed after every chain). If the run dies before the upsert, the next
+            run only scrapes the missing chains; it is removed whenever the run gets
+            through the upsert, even if some chains or the upsert itself failed.
+
+    Returns:
+        dict: {code: "created" | "updated" | "unchanged" | "skipped" | error message}
+    """
+    started = time.time()
+    codes = list(codes or CHAINS)
+    timer = timer or PhaseTimer()
+    checkpoint = checkpoint or Checkpoint("supermarket_info", interval=1)
+
+    # One shared backend and a single bulk upsert for every chain
+    server = get_backend_server()
+    with timer.span("server_start", chain="all"):
+        if not server.start():
+            raise Exception("Failed to start backend server")
+
+    try:
+        with SupermarketInfoClient() as api:
+            summary = _scrape_and_save(api, codes, max_browsers, extraction_mode, conditional_get, skip_unchanged,
+                                       homepage_urls, timer, checkpoint)
+    finally:
+        checkpoint.close()
+        with timer.span("server_stop", chain="all"):
+            server.stop()
+
+    # The run got to the end: failed chains are scraped again next time along with
+    # the rest, and unsaved results are not kept around to be re-sent later as fresh
+    checkpoint.finish()
+
+    elapsed = time.time() - started
+    print(f"{Fore.CYAN}Supermarket info refresh finished in {elapsed:.1f}s{Style.RESET_ALL}")
+    for code, status in summary.items():
+        color = Fore.GREEN if status in ("created", "updated", "unchanged", "skipped") else Fore.RED
+        print(f"{color}  {code}: {status}{Style.RESET_ALL}")
+    logging.info(f"Supermarket info refresh finished in {elapsed:.1f}s: {summary}")
+    timer.print_summary()
+    return summary
+
+
+def _scrape_and_save(api, codes, max_browsers, extraction_mode, conditional_get, skip_unchanged, homepage_urls, timer,
+                     checkpoint=None):
+    """Scrape the chains and bulk upsert the results; returns the per-chain summary"""
+    validators = {}
+    if conditional_get or skip_unchanged:
+        with timer.span("api_validators", chain="all"):
+            validators = api.get_validators(codes)
+
+    results, summary = scrape_chains(codes, max_browsers, extraction_mode, validators, conditional_get,
+                                     homepage_urls, timer, checkpoint)
+
+    documents = []
+    for code, data in results.items():
+        stored = validators.get(code, {})
+        if skip_unchanged and data.get("contentFingerprint") == stored.get("contentFingerprint"):
+            summary[code] = "skipped"
+            continue
+        documents.append({**data, "code": code})
+
+    if documents:
+        try:
+            with timer.span("api_upsert", chain="all", documents=len(documents)):
+                result = api.upsert_many(documents)
+            for item in result.get("results", []):
+                summary[item["code"]] = item["status"]
+        except Exception as e:
+            print(f"{Fore.RED}Failed to save data to API: {e}{Style.RESET_ALL}")
+            logging.error(f"Error saving to API: {e}")
+            for document in documents:
+                summary[document["code"]] = f"save failed: {e}"
+
+    return summary
@@ -0,0 +1,142 @@
+"""
+Per-phase timing spans for the scrapers.
+
+    timer = PhaseTimer()
+    with timer.span("page_load", chain="carrefour"):
+        ...
+    timer.print_summary()
+
+Every finished span is appended to a JSON lines file as
+
+    {"ts": ..., "run": ..., "phase": ..., "durationMs": ..., "status": "ok"|"error", **attrs}
+
+and can be exported as a Prometheus textfile (node_exporter textfile collector
+format) with per-phase duration sums, counts and maxima. The summary table
+shows where a run spent its time: browser, site, or our backend.
+"""
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+
+from colorama import Fore, Style
+
+DEFAULT_TIMINGS_FILE = os.environ.get("SCRAPER_TIMINGS_FILE", "supermarket_info_timings.jsonl")
+DEFAULT_PROMETHEUS_TEXTFILE = os.environ.get("SCRAPER_PROMETHEUS_TEXTFILE")
+
+
+class PhaseTimer:
+    def __init__(self, jsonl_path=DEFAULT_TIMINGS_FILE, prometheus_path=DEFAULT_PROMETHEUS_TEXTFILE, run_id=None):
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.spans = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, phase, **attrs):
+        """Time the enclosed block; the span is recorded even if it raises"""
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self.record(phase, time.perf_counter() - started, status, **attrs)
+
+    def record(self, phase, seconds, status="ok", **attrs):
+        """Record an already measured span"""
+        span = {
+            "ts": time.time(),
+            "run": self.run_id,
+            "phase": phase,
+            "durationMs": round(seconds * 1000, 1),
+            "status": status,
+            **attrs
+        }
+        with self.lock:
+            self.spans.append(span)
+            if self.jsonl_path:
+                try:
+                    with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(span, ensure_ascii=False) + '\n')
+                except OSError as e:
+                    logging.warning(f"Could not write timing span to {self.jsonl_path}: {e}")
+
+    def summary(self):
+        """
+        Aggregate spans by (phase, chain).
+
+        Returns:
+            list: [{"phase", "chain", "count", "errors", "totalMs", "maxMs"}] in first-seen order.
+        """
+        rows = {}
+        with self.lock:
+            spans = list(self.spans)
+        for span in spans:
+            key = (span["phase"], span.get("chain", ""))
+            row = rows.setdefault(key, {"phase": key[0], "chain": key[1], "count": 0, "errors": 0, "totalMs": 0.0, "maxMs": 0.0})
+            row["count"] += 1
+            row["errors"] += span["status"] != "ok"
+            row["totalMs"] += span["durationMs"]
+            row["maxMs"] = max(row["maxMs"], span["durationMs"])
+        return list(rows.values())
+
+    def print_summary(self):
+        """Print the per-phase table and write the Prometheus textfile if configured"""
+        rows = self.summary()
+        if not rows:
+            return
+
+        print(f"{Fore.CYAN}{'phase':<26}{'chain':<12}{'count':>6}{'errors':>7}{'total ms':>11}{'max ms':>10}{Style.RESET_ALL}")
+        for row in rows:
+            color = Fore.RED if row["errors"] else ""
+            print(
+                f"{color}{row['phase']:<26}{row['chain']:<12}{row['count']:>6}{row['errors']:>7}"
+                f"{row['totalMs']:>11.1f}{row['maxMs']:>10.1f}{Style.RESET_ALL}"
+            )
+        logging.info(f"Timing summary for run {self.run_id}: {rows}")
+
+        if self.prometheus_path:
+            self.write_prometheus(self.prometheus_path)
+
+    def write_prometheus(self, path):
+        """Write the summary in Prometheus text format (atomic rename, as the textfile collector expects)"""
+        lines = [
+            "# HELP scraper_phase_duration_seconds_sum Total time spent per scraper phase in the last run.",
+            "# TYPE scraper_phase_duration_seconds_sum gauge",
+        ]
+        metrics = {"sum": [], "count": [], "max": [], "errors": []}
+        for row in self.summary():
+            labels = f'phase="{row["phase"]}",chain="{row["chain"]}"'
+            metrics["sum"].append(f"scraper_phase_duration_seconds_sum{{{labels}}} {row['totalMs'] / 1000:.6f}")
+            metrics["count"].append(f"scraper_phase_duration_seconds_count{{{labels}}} {row['count']}")
+            metrics["max"].append(f"scraper_phase_duration_seconds_max{{{labels}}} {row['maxMs'] / 1000:.6f}")
+            metrics["errors"].append(f"scraper_phase_errors{{{labels}}} {row['errors']}")
+
+        lines += metrics["sum"]
+        for name, help_text in (
+            ("count", "Number of spans per scraper phase in the last run."),
+            ("max", "Slowest span per scraper phase in the last run."),
+        ):
+            lines += [f"# HELP scraper_phase_duration_seconds_{name} {help_text}",
+                      f"# TYPE scraper_phase_duration_seconds_{name} gauge"] + metrics[name]
+        lines += ["# HELP scraper_phase_errors Failed spans per scraper phase in the last run.",
+                  "# TYPE scraper_phase_errors gauge"] + metrics["errors"]
+        lines += ["# HELP scraper_last_run_timestamp_seconds End of the last scraper run.",
+                  "# TYPE scraper_last_run_timestamp_seconds gauge",
+                  f"scraper_last_run_timestamp_seconds {time.time():.0f}"]
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+            os.replace(tmp_path, path)
+            logging.info(f"Wrote Prometheus metrics to {path}")
+        except OSError as e:
+            logging.warning(f"Could not write Prometheus textfile {path}: {e}")
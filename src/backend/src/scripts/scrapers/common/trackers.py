@@ -0,0 +1,70 @@
+"""
+Tracker and platform fingerprint registry.
+
+All signatures are compiled into one alternation regex, so the page source is
+scanned once no matter how many signatures exist, and without building a
+lowercased copy of a multi-megabyte document (case-insensitive signatures use
+scoped (?i:...) flags). Adding a tracker means adding one entry here.
+
+Each signature is (name, pattern, mode):
+    mode "first": keep the first ID found
+    mode "all":   keep every distinct ID, in order of appearance
+    mode "flag":  only record that the signature is present
+
+If a pattern has a named group "<name>_id" that group is the ID, otherwise the
+whole match is.
+"""
+import re
+
+TRACKER_SIGNATURES = [
+    # Whole-word IDs with a minimum length: the page source also has class names
+    # and icon ids such as SVG-ICON
+    ("googleTagManager", r"\bGTM-[A-Z0-9]{4,}\b", "all"),
+    ("googleAnalytics", r"\bG-[A-Z0-9]{6,}\b", "first"),
+    ("facebookPixel", r"fbq\(['\"]init['\"],\s*['\"](?P<facebookPixel_id>[^'\"]+)['\"]", "first"),
+    ("dynamicYield", r"(?i:dynamicyield\.com/api/)(?P<dynamicYield_id>\d+)", "first"),
+    ("dynamicYieldScript", r"(?i:dynamicyield)", "flag"),
+    ("hotjar", r"hjid\s*[:=]\s*(?P<hotjar_id>\d+)", "first"),
+    ("oneTrust", r"(?i:cdn\.cookielaw\.org|otSDKStub)", "flag"),
+    ("vtex", r"(?i:vtex)", "flag"),
+]
+
+
+class TrackerScanner:
+    def __init__(self, signatures=TRACKER_SIGNATURES):
+        self.signatures = {name: mode for name, _, mode in signatures}
+        self.id_groups = {name: f"{name}_id" for name, pattern, _ in signatures if f"(?P<{name}_id>" in pattern}
+        self.regex = re.compile('|'.join(f"(?P<{name}>{pattern})" for name, pattern, _ in signatures))
+
+    def scan(self, text):
+        """
+        Scan text once and return every detected signature.
+
+        Returns:
+            dict: {name: id | [ids] | True} for each signature found.
+        """
+        found = {}
+        pending = set(self.signatures)
+        for match in self.regex.finditer(text or ""):
+            name = match.lastgroup
+            mode = self.signatures[name]
+            if mode == "all":
+                value = match.group(self.id_groups.get(name, name))
+                values = found.setdefault(name, [])
+                if value not in values:
+                    values.append(value)
+            elif name in pending:
+                found[name] = True if mode == "flag" else match.group(self.id_groups.get(name, name))
+                pending.discard(name)
+        return found
+
+
+_default_scanner = None
+
+
+def scan_trackers(text):
+    """Scan text with the default signature registry"""
+    global _default_scanner
+    if _default_scanner is None:
+        _default_scanner = TrackerScanner()
+    return _default_scanner.scan(text)
@@ -0,0 +1,446 @@
+"""
+VTEX catalog ingestion engine.
+
+All five chains are VTEX storefronts (see extract_platform_info), and VTEX
+exposes the product catalog as JSON:
+
+    GET /api/catalog_system/pub/products/search/<category path>?map=c,c&_from=0&_to=49
+    GET /api/catalog_system/pub/products/search?fq=C:/1/23/&_from=0&_to=49
+
+Reading that is orders of magnitude cheaper than rendering category pages in
+Selenium. The engine pages through each category with aiohttp: the first page
+answers with a `resources: 0-49/1234` header, so every remaining page is
+scheduled at once and fetched under two limits (global concurrency and
+per-chain concurrency). 429/5xx answers and timeouts are retried with
+exponential backoff (Retry-After is honoured).
+
+Every SKU is mapped to the fields of the <chain>Product models (price,
+listPrice, discount, ean, sku, brand, unit, category/subcategory/productType,
+...) and streamed to a writer page by page: any object with write_many(docs)
+and close() works (JsonLinesWriter here, ChainBulkWriter in common/mongo_writer.py).
+
+VTEX caps paging at _from <= 2500; a category bigger than that is truncated
+and reported, and should be ingested through its subcategories.
+
+Run it against the local stand-in (common/catalog_server.py) serving recorded
+fixtures, or against the real sites:
+
+    python common/catalog_server.py --port 8766
+    python common/vtex_catalog.py ingest --chains carrefour --stand-in http://localhost:8766 --out productos.jsonl
+    python common/vtex_catalog.py record carrefour almacen     # save a real category as a fixture
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import contextlib
+import logging
+import argparse
+import threading
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.chains import CHAINS, SCRAPERS_DIR, get_chain
+from common.http_fetch import DEFAULT_HEADERS
+
+SEARCH_PATH = "/api/catalog_system/pub/products/search"
+PAGE_SIZE = 50
+MAX_FROM = 2500
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+FIXTURES_DIR = os.path.join(SCRAPERS_DIR, "fixtures", "vtex_catalog")
+
+API_HEADERS = {**DEFAULT_HEADERS, "Accept": "application/json"}
+
+
+def default_categories(code, api_base_url=None):
+    """
+    Leaf categories of the chain's cached category tree (common/category_tree.py), so no
+    category hits the paging limit; without a tree, the key category pages (chains.specific_urls).
+    """
+    from common.category_tree import get_category_tree
+    try:
+        tree = get_category_tree(code, api_base_url)
+        return [tree.search_path(node["id"]) for node in tree.leaves()]
+    except Exception as e:
+        logging.warning(f"{code}: no category tree ({e}), using the key category pages")
+    chain = get_chain(code)
+    return [path.strip('/') for name, path in chain["specific_urls"].items() if name.startswith("categoria")]
+
+
+def fixture_key(category):
+    """File name (without .json) of a category fixture: 'almacen/aceites' -> 'almacen--aceites', 'C:/1/2/' -> 'C-1-2'"""
+    if category.startswith("C:"):
+        return "C-" + "-".join(part for part in category[2:].split('/') if part)
+    return "--".join(part for part in category.lower().split('/') if part)
+
+
+def search_url(base_url, category, start, end):
+    """Search URL for one page of a category (path like 'almacen/aceites' or an fq like 'C:/1/2/')"""
+    if category.startswith("C:"):
+        return f"{base_url}{SEARCH_PATH}?fq={quote(category)}&_from={start}&_to={end}"
+    parts = [part for part in category.split('/') if part]
+    path = "/".join(quote(part) for part in parts)
+    return f"{base_url}{SEARCH_PATH}/{path}?map={','.join('c' * len(parts))}&_from={start}&_to={end}"
+
+
+def parse_resources(header):
+    """'0-49/1234' -> 1234 (None if absent)"""
+    try:
+        return int(header.rsplit('/', 1)[1])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def _offer(item):
+    """commertialOffer of the first seller with stock (or the first seller)"""
+    sellers = item.get("sellers") or []
+    for seller in sellers:
+        offer = seller.get("commertialOffer") or {}
+        if offer.get("AvailableQuantity", 0) > 0:
+            return offer
+    return (sellers[0].get("commertialOffer") or {}) if sellers else {}
+
+
+def map_product(product, supermarket, scraped_at=None):
+    """
+    Map one VTEX search result to <chain>Product documents (one per SKU).
+
+    Args:
+        product (dict): Element of the search response.
+        supermarket (str): Chain name (the models' "supermarket" field).
+
+    Returns:
+        list: Documents with the model's field names.
+    """
+    scraped_at = scraped_at or datetime.now(timezone.utc).isoformat()
+    tree = [part for part in (product.get("categories") or ["/"])[0].split('/') if part]
+    documents = []
+    for item in product.get("items") or []:
+        offer = _offer(item)
+        price = offer.get("Price")
+        if price is None:
+            continue
+        list_price = offer.get("ListPrice") or price
+        unit = item.get("measurementUnit")
+        multiplier = item.get("unitMultiplier") or 0
+        ean = item.get("ean") or None
+        images = item.get("images") or []
+        document = {
+            "name": item.get("nameComplete") or product.get("productName"),
+            "price": price,
+            "listPrice": list_price,
+            "discount": round((list_price - price) / list_price * 100, 2) if list_price > price else 0,
+            "supermarket": supermarket,
+            "category": tree[0] if tree else None,
+            "subcategory": tree[1] if len(tree) > 1 else None,
+            "productType": tree[2] if len(tree) > 2 else None,
+            "brand": product.get("brand"),
+            "description": product.get("description"),
+            "image": images[0].get("imageUrl") if images else None,
+            "url": product.get("link"),
+            "unit": unit,
+            "isAvailable": bool(offer.get("IsAvailable", offer.get("AvailableQuantity", 0) > 0)),
+            # The models validate EAN-13 and keep it unique; anything else is dropped
+            "ean": ean if ean and len(ean) == 13 and ean.isdigit() else None,
+            "sku": item.get("itemId"),
+            "productId": product.get("productId"),
+            "updatedAt": scraped_at,
+        }
+        if unit in ("kg", "kgs") and multiplier > 0:
+            document["pricePerKilo"] = round(price / multiplier, 2)
+        elif unit in ("lt", "l", "lts") and multiplier > 0:
+            document["pricePerLitre"] = round(price / multiplier, 2)
+        documents.append(document)
+    return documents
+
+
+class JsonLinesWriter:
+    """Writer that appends documents to a JSON lines file (thread-safe)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, 'a', encoding='utf-8')
+        self.count = 0
+
+    def write_many(self, documents):
+        with self.lock:
+            for document in documents:
+                self.file.write(json.dumps(document, ensure_ascii=False) + "\n")
+            self.file.flush()
+            self.count += len(documents)
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class ApiError(Exception):
+    """A VTEX API request that failed: an HTTP error status, or no answer after the retries (status None)"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class _Retry(Exception):
+    def __init__(self, message, delay=None):
+        super().__init__(message)
+        self.delay = delay
+
+
+async def get_json(session, url, limits=(), retries=4):
+    """
+    GET a VTEX API URL with retries on 429/5xx, timeouts and dropped connections.
+
+    Args:
+        session (aiohttp.ClientSession): Shared session.
+        limits (tuple): Semaphores held while the request is in flight.
+        retries (int): Attempts after the first one.
+
+    Returns:
+        tuple: (decoded JSON, response headers)
+    """
+    import aiohttp
+
+    for attempt in range(retries + 1):
+        try:
+            async with contextlib.AsyncExitStack() as stack:
+                for limit in limits:
+                    await stack.enter_async_context(limit)
+                async with session.get(url) as response:
+                    if response.status in RETRY_STATUSES and attempt < retries:
+                        retry_after = response.headers.get("Retry-After")
+                        delay = float(retry_after) if retry_after and retry_after.isdigit() else None
+                        raise _Retry(f"HTTP {response.status}", delay)
+                    # 206 Partial Content is VTEX's normal answer when more pages exist
+                    if response.status not in (200, 206):
+                        raise ApiError(f"HTTP {response.status} for {url}", response.status)
+                    return await response.json(content_type=None), response.headers
+        except (_Retry, asyncio.TimeoutError, aiohttp.ClientConnectionError) as e:
+            if attempt >= retries:
+                raise ApiError(f"{url} failed after {attempt + 1} attempts: {e}")
+            delay = getattr(e, "delay", None) or min(30, 0.5 * 2 ** attempt) * (0.5 + random.random())
+            logging.warning(f"Retrying {url} in {delay:.1f}s ({e})")
+            await asyncio.sleep(delay)
+
+
+class CatalogIngestor:
+    """
+    Args:
+        writer: Object with write_many(docs) (called from a worker thread) and close().
+        concurrency (int): Simultaneous requests overall.
+        per_chain (int): Simultaneous requests against one chain.
+        retries (int): Attempts per page after the first one.
+        timeout (int): Total timeout per request, in seconds.
+        base_urls (dict): {code: base URL} overrides (e.g. the stand-in).
+        raw (bool): Write the search results as returned (one per product) instead of mapped documents.
+    """
+
+    def __init__(self, writer, concurrency=8, per_chain=4, retries=4, timeout=30, base_urls=None, raw=False):
+        self.writer = writer
+        self.concurrency = concurrency
+        self.per_chain = per_chain
+        self.retries = retries
+        self.timeout = timeout
+        self.base_urls = base_urls or {}
+        self.raw = raw
+        self.stats = {}
+
+    async def _get_page(self, session, chain_limit, url):
+        """One search page with retries; returns (products, total)"""
+        products, headers = await get_json(session, url, (chain_limit, self.global_limit), self.retries)
+        return products, parse_resources(headers.get("resources"))
+
+    async def _emit(self, code, products, scraped_at, seen):
+        documents = []
+        for product in products:
+            if self.raw:
+                if product.get("productId") not in seen:
+                    seen.add(product.get("productId"))
+                    documents.append(product)
+                continue
+            for document in map_product(product, get_chain(code)["name"], scraped_at):
+                if document["sku"] in seen:
+                    continue
+                seen.add(document["sku"])
+                documents.append(document)
+        if documents:
+            # The writer may block (file or database): keep it off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self.writer.write_many, documents)
+        self.stats[code]["products"] += len(documents)
+
+    async def _ingest_category(self, session, code, category, chain_limit, seen, scraped_at):
+        base_url = self.base_urls.get(code, get_chain(code)["base_url"])
+        products, total = await self._get_page(session, chain_limit, search_url(base_url, category, 0, PAGE_SIZE - 1))
+        self.stats[code]["pages"] += 1
+        await self._emit(code, products, scraped_at, seen)
+
+        if total is None:
+            # No resources header: walk sequentially until a short page
+            start = PAGE_SIZE
+            while len(products) == PAGE_SIZE and start <= MAX_FROM:
+                products, _ = await self._get_page(session, chain_limit,
+                                                   search_url(base_url, category, start, start + PAGE_SIZE - 1))
+                self.stats[code]["pages"] += 1
+                await self._emit(code, products, scraped_at, seen)
+                start += PAGE_SIZE
+            return
+
+        if total > MAX_FROM + PAGE_SIZE:
+            logging.warning(f"{code}/{category}: {total} products, VTEX only pages the first "
+                            f"{MAX_FROM + PAGE_SIZE}; ingest its subcategories instead")
+            self.stats[code]["truncated"].append(category)
+
+        async def page(start):
+            items, _ = await self._get_page(session, chain_limit, search_url(base_url, category, start, start + PAGE_SIZE - 1))
+            self.stats[code]["pages"] += 1
+            await self._emit(code, items, scraped_at, seen)
+
+        await asyncio.gather(*(page(start) for start in range(PAGE_SIZE, min(total, MAX_FROM + PAGE_SIZE), PAGE_SIZE)))
+
+    async def ingest(self, categories):
+        """
+        Ingest {code: [category, ...]}.
+
+        Returns:
+            dict: {code: {"products", "pages", "errors", "truncated", "elapsed"}}
+        """
+        import aiohttp
+
+        self.global_limit = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        client_timeout = aiohttp.ClientTimeout(total=self.timeout)
+        scraped_at = datetime.now(timezone.utc).isoformat()
+
+        async def chain_task(session, code, chain_categories):
+            started = time.time()
+            self.stats[code] = {"products": 0, "pages": 0, "errors": [], "truncated": []}
+            chain_limit = asyncio.Semaphore(self.per_chain)
+            seen = set()
+            results = await asyncio.gather(
+                *(self._ingest_category(session, code, category, chain_limit, seen, scraped_at)
+                  for category in chain_categories),
+                return_exceptions=True
+            )
+            for category, result in zip(chain_categories, results):
+                if isinstance(result, Exception):
+                    logging.error(f"{code}/{category}: {result}")
+                    self.stats[code]["errors"].append(f"{category}: {result}")
+            self.stats[code]["elapsed"] = time.time() - started
+            logging.info(f"{code}: {self.stats[code]}")
+
+        async with aiohttp.ClientSession(connector=connector, timeout=client_timeout, headers=API_HEADERS) as session:
+            await asyncio.gather(*(chain_task(session, code, cats) for code, cats in categories.items()))
+        return self.stats
+
+
+def ingest_catalogs(codes, writer, categories=None, base_urls=None, concurrency=8, per_chain=4, retries=4):
+    """
+    Blocking entry point: ingest the catalog of several chains into a writer.
+
+    Args:
+        codes (list): Chain codes.
+        writer: See CatalogIngestor.
+        categories (dict): {code: [category path or fq]}; default: default_categories().
+        base_urls (dict): {code: base URL} overrides (see stand_in_base_urls()).
+
+    Returns:
+        dict: Per-chain stats (see CatalogIngestor.ingest()).
+    """
+    categories = categories or {}
+    base_urls = base_urls or {}
+    plan = {code: categories.get(code) or default_categories(code, base_urls.get(code)) for code in codes}
+    ingestor = CatalogIngestor(writer, concurrency, per_chain, retries, base_urls=base_urls)
+    return asyncio.run(ingestor.ingest(plan))
+
+
+def stand_in_base_urls(base_url, codes=None):
+    """{code: base URL} for the catalog stand-in (common/catalog_server.py)"""
+    return {code: f"{base_url.rstrip('/')}/{code}" for code in (codes or CHAINS)}
+
+
+def record_fixture(code, category, fixtures_dir=FIXTURES_DIR):
+    """
+    Download every page of a real category and save it as a stand-in fixture.
+
+    Returns:
+        str: Fixture path.
+    """
+    class _Collector:
+        def __init__(self):
+            self.products = []
+
+        def write_many(self, documents):
+            self.products.extend(documents)
+
+        def close(self):
+            pass
+
+    collector = _Collector()
+    stats = asyncio.run(CatalogIngestor(collector, raw=True).ingest({code: [category]}))
+    if stats[code]["errors"]:
+        raise Exception(f"Could not record {code}/{category}: {stats[code]['errors']}")
+    products = collector.products
+
+    os.makedirs(os.path.join(fixtures_dir, code), exist_ok=True)
+    path = os.path.join(fixtures_dir, code, f"{fixture_key(category)}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(products, f, ensure_ascii=False, indent=1)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest VTEX catalogs through the public search API")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest = subparsers.add_parser("ingest", help="Ingest products into a JSON lines file")
+    ingest.add_argument("--chains", nargs="+", choices=list(CHAINS), default=list(CHAINS))
+    ingest.add_argument("--category", action="append", default=[],
+                        help="Category path ('almacen/aceites') or fq ('C:/1/2/'); repeatable. Default: leaves of the category tree")
+    ingest.add_argument("--stand-in", help="Base URL of the local catalog stand-in (common/catalog_server.py)")
+    ingest.add_argument("--out", default="vtex_products.jsonl")
+    ingest.add_argument("--mongo", action="store_true",
+                        help="Upsert into the raw per-chain databases (common/mongo_writer.py) instead of --out")
+    ingest.add_argument("--price-history", action="store_true",
+                        help="With --mongo, append PriceHistory rows for changed prices (common/price_history.py)")
+    ingest.add_argument("--price-timeseries", action="store_true",
+                        help="With --mongo, append every price to price_history_ts (common/price_timeseries.py)")
+    ingest.add_argument("--concurrency", type=int, default=8)
+    ingest.add_argument("--per-chain", type=int, default=4)
+    ingest.add_argument("--retries", type=int, default=4)
+
+    record = subparsers.add_parser("record", help="Save a real category as a stand-in fixture")
+    record.add_argument("chain", choices=list(CHAINS))
+    record.add_argument("category")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.command == "record":
+        print(f"Saved {record_fixture(args.chain, args.category)}")
+    else:
+        if args.mongo:
+            from common.mongo_writer import ChainBulkWriter
+            writer = ChainBulkWriter(args.chains, price_history=args.price_history,
+                                     price_timeseries=args.price_timeseries)
+        else:
+            writer = JsonLinesWriter(args.out)
+        try:
+            stats = ingest_catalogs(
+                args.chains, writer,
+                categories={code: args.category for code in args.chains} if args.category else None,
+                base_urls=stand_in_base_urls(args.stand_in, args.chains) if args.stand_in else None,
+                concurrency=args.concurrency, per_chain=args.per_chain, retries=args.retries
+            )
+        finally:
+            writer.close()
+        for code, s in stats.items():
+            rate = s["products"] / s["elapsed"] if s.get("elapsed") else 0.0
+            print(f"{code}: {s['products']} products, {s['pages']} pages, {len(s['errors'])} errors "
+                  f"in {s.get('elapsed', 0):.1f}s ({rate:.0f} products/s)")
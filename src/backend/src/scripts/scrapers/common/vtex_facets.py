@@ -0,0 +1,294 @@
+"""
+Search-filter (facet) extraction through the VTEX facets API.
+
+The subcategory generators used to open Firefox on every category page, close
+the popup, expand "Tipo de producto", click "Ver más" and read the checkbox
+labels, stripping the "(12)" counts with a regex: about 15 s per category.
+The same values and counts are one JSON request away:
+
+    GET /api/catalog_system/pub/facets/search/<category path>?map=c,c
+        -> {"SpecificationFilters": {"Tipo de producto": [{"Name", "Quantity"}]}, "Brands": [...], ...}
+    GET /api/io/_v/api/intelligent-search/facets/category-1/<a>/category-2/<b>
+        -> {"facets": [{"name", "key", "values": [{"name", "quantity"}]}]}
+
+Both shapes are normalised to {facet slug: [{"name", "quantity"}]} (slugs as in
+the storefront's filter__container--<slug> classes, e.g. 'tipo-de-producto',
+'marca'). Many categories are fetched concurrently. Only when neither endpoint
+answers in a known shape (FacetShapeError) does the old browser path run, so a
+VTEX API change degrades to slow instead of broken. Timeouts, connection errors
+and 429/5xx after the retries (FacetTransportError) are reported instead: a
+browser would not get through an outage either.
+
+    python common/vtex_facets.py https://www.carrefour.com.ar/limpieza https://www.carrefour.com.ar/Almacen
+    python common/vtex_facets.py https://www.carrefour.com.ar/limpieza --facet marca --stand-in http://localhost:8766/carrefour
+"""
+import os
+import re
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import unicodedata
+from urllib.parse import urlsplit, parse_qs, quote
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.vtex_catalog import API_HEADERS, RETRY_STATUSES, ApiError, get_json
+
+FACETS_PATH = "/api/catalog_system/pub/facets/search"
+IS_FACETS_PATH = "/api/io/_v/api/intelligent-search/facets"
+PRODUCT_TYPE_FACET = "tipo-de-producto"
+
+# Facet slugs of the legacy endpoint's fixed lists
+LEGACY_LISTS = {"Brands": "marca"}
+
+LABEL_COUNT = re.compile(r"^(?P<name>.*?)\s*\((?P<quantity>\d+)\)$")
+
+
+class FacetShapeError(Exception):
+    """The facets endpoints answered something that is not a known VTEX shape"""
+
+
+class FacetTransportError(Exception):
+    """The facets endpoints could not be reached (timeouts, connection errors, 429/5xx after retries)"""
+
+
+def _is_transport_error(error):
+    import aiohttp
+
+    if isinstance(error, ApiError):
+        return error.status is None or error.status in RETRY_STATUSES
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientError))
+
+
+def slugify(text):
+    """'Tipo de producto' -> 'tipo-de-producto' (accents dropped, like the storefront classes)"""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def category_path(category_url):
+    """
+    Base URL, category segments and their levels of a storefront category URL.
+
+    Handles plain paths (/limpieza/lavado) and intelligent-search URLs
+    (?map=category-1,category-3&query=/Electro-y-tecnologia/accesorios-de-celulares),
+    whose map says which tree level each segment is.
+
+    Returns:
+        tuple: (base_url, [segment, ...], ["category-1", ...])
+    """
+    url = urlsplit(category_url)
+    query = parse_qs(url.query)
+    path = query["query"][0] if "query" in query else url.path
+    segments = [part for part in path.split('/') if part]
+    levels = query.get("map", [""])[0].split(',')
+    if len(levels) != len(segments) or not all(level.startswith("category-") for level in levels):
+        levels = [f"category-{level}" for level in range(1, len(segments) + 1)]
+    return f"{url.scheme}://{url.netloc}", segments, levels
+
+
+def facet_urls(base_url, segments, levels):
+    """(legacy URL, intelligent-search URL) of a category's facets"""
+    path = "/".join(quote(part) for part in segments)
+    legacy = f"{base_url}{FACETS_PATH}/{path}?map={','.join('c' * len(segments))}"
+    is_path = "/".join(f"{level}/{quote(part)}" for level, part in zip(levels, segments))
+    return legacy, f"{base_url}{IS_FACETS_PATH}/{is_path}"
+
+
+def parse_facets(payload):
+    """
+    Normalise a facets response.
+
+    Returns:
+        dict: {facet slug: [{"name", "quantity"}]}
+
+    Raises:
+        FacetShapeError: Neither the legacy nor the intelligent-search shape.
+    """
+    facets = {}
+    if isinstance(payload, dict) and isinstance(payload.get("SpecificationFilters"), dict):
+        for name, values in payload["SpecificationFilters"].items():
+            facets[slugify(name)] = [{"name": v["Name"], "quantity": v.get("Quantity")} for v in values]
+        for key, slug in LEGACY_LISTS.items():
+            if isinstance(payload.get(key), list):
+                facets[slug] = [{"name": v["Name"], "quantity": v.get("Quantity")} for v in payload[key]]
+    elif isinstance(payload, dict) and isinstance(payload.get("facets"), list):
+        for facet in payload["facets"]:
+            facets[slugify(facet["name"])] = [
+                {"name": v["name"], "quantity": v.get("quantity")} for v in facet.get("values", [])
+            ]
+    else:
+        raise FacetShapeError(f"Unexpected facets payload: {str(payload)[:200]}")
+    return facets
+
+
+async def fetch_facets(session, category_url, limit, base_url=None, retries=3):
+    """
+    Facets of one category: legacy endpoint first, intelligent search if the legacy
+    one fails or has no specification filters.
+
+    Args:
+        base_url (str): Override of the URL's origin (e.g. the stand-in).
+
+    Returns:
+        dict: {facet slug: [{"name", "quantity"}]}
+
+    Raises:
+        FacetTransportError: No facets and at least one endpoint was unreachable.
+        FacetShapeError: No facets and the endpoints answered in an unknown shape
+            (including non-JSON bodies and 4xx statuses).
+    """
+    origin, segments, levels = category_path(category_url)
+    legacy_url, is_url = facet_urls(base_url or origin, segments, levels)
+    errors = []
+    transport = False
+    lists_only = None
+    for url in (legacy_url, is_url):
+        try:
+            payload, _ = await get_json(session, url, (limit,), retries)
+            facets = parse_facets(payload)
+        except Exception as e:
+            errors.append(f"{url}: {e}")
+            transport = transport or _is_transport_error(e)
+            continue
+        if set(facets) - set(LEGACY_LISTS.values()):
+            return facets
+        if lists_only is None:
+            lists_only = facets
+    if lists_only is not None:
+        return lists_only
+    raise (FacetTransportError if transport else FacetShapeError)("; ".join(errors))
+
+
+async def fetch_all_facets(category_urls, concurrency=8, base_url=None, timeout=20):
+    """
+    Facets of many categories concurrently.
+
+    Returns:
+        dict: {category_url: facets dict or the exception (FacetShapeError, FacetTransportError)}
+    """
+    import aiohttp
+
+    limit = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout, headers=API_HEADERS) as session:
+        results = await asyncio.gather(
+            *(fetch_facets(session, url, limit, base_url) for url in category_urls), return_exceptions=True
+        )
+    return dict(zip(category_urls, results))
+
+
+def browser_facet_values(category_url, facet=PRODUCT_TYPE_FACET):
+    """
+    Previous Selenium path: expand the filter, click "Ver más" and read the labels.
+
+    Returns:
+        list: [{"name", "quantity"}] with the counts parsed from the label text.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from common.browser_pool import create_driver
+    from common.page_settle import wait_for_settle
+
+    container_selector = f"[class*='-x-filter__container--{facet}']"
+    driver = create_driver("firefox")
+    values = []
+    try:
+        driver.get(category_url)
+        WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.CSS_SELECTOR, container_selector)))
+        container = driver.find_element(By.CSS_SELECTOR, container_selector)
+
+        # Popup that covers the filters
+        for close in driver.find_elements(By.CLASS_NAME, "dy-modal-close"):
+            try:
+                close.click()
+                wait_for_settle(driver, "interaccion")
+            except Exception:
+                pass
+
+        # Expand the filter (collapsed by default) and then "Ver más"
+        driver.execute_script("arguments[0].click();", container)
+        wait_for_settle(driver, "interaccion")
+        for button in container.find_elements(By.CSS_SELECTOR, "[class*='-x-seeMoreButton']"):
+            driver.execute_script("arguments[0].click();", button)
+            wait_for_settle(driver, "interaccion")
+
+        for label in container.find_elements(By.CLASS_NAME, "vtex-checkbox__label"):
+            text = label.get_attribute("textContent").strip()
+            match = LABEL_COUNT.match(text)
+            if match:
+                values.append({"name": match.group("name"), "quantity": int(match.group("quantity"))})
+            elif text:
+                values.append({"name": text, "quantity": None})
+    finally:
+        driver.quit()
+    return values
+
+
+def extract_facet_values(category_urls, facet=PRODUCT_TYPE_FACET, concurrency=8, base_url=None,
+                         browser_fallback=True):
+    """
+    Values of one facet for many categories.
+
+    Args:
+        category_urls (list): Storefront category URLs.
+        facet (str): Facet slug ('tipo-de-producto', 'marca', ...).
+        base_url (str): Send the API requests to this origin instead (e.g. the stand-in).
+        browser_fallback (bool): Use the browser for categories whose API answer has an unknown
+            shape (not for unreachable endpoints, which are only reported).
+
+    Returns:
+        dict: {category_url: {"values": [{"name", "quantity"}], "source": "api"|"browser"|None,
+               "elapsedMs", "error"}}
+    """
+    started = time.time()
+    fetched = asyncio.run(fetch_all_facets(list(category_urls), concurrency, base_url))
+    api_ms = (time.time() - started) * 1000
+
+    results = {}
+    for url, facets in fetched.items():
+        if not isinstance(facets, Exception):
+            results[url] = {"values": facets.get(facet, []), "source": "api", "elapsedMs": api_ms, "error": None}
+            continue
+        logging.warning(f"Facets API failed for {url}: {facets}")
+        results[url] = {"values": [], "source": None, "elapsedMs": None, "error": str(facets)}
+        if browser_fallback and isinstance(facets, FacetShapeError):
+            browser_started = time.time()
+            try:
+                results[url].update(values=browser_facet_values(url, facet), source="browser")
+            except Exception as e:
+                logging.error(f"Browser fallback failed for {url}: {e}")
+                results[url]["error"] = f"{facets}; browser: {e}"
+            results[url]["elapsedMs"] = (time.time() - browser_started) * 1000
+    return results
+
+
+def extract_product_types(category_url, base_url=None, browser_fallback=True):
+    """'Tipo de producto' names of one category (what the generators' Selenium code returned)"""
+    result = extract_facet_values([category_url], PRODUCT_TYPE_FACET, base_url=base_url,
+                                  browser_fallback=browser_fallback)[category_url]
+    return [value["name"] for value in result["values"]]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read search filter values (e.g. 'Tipo de producto') from the VTEX facets API")
+    parser.add_argument("urls", nargs="+", help="Category URLs")
+    parser.add_argument("--facet", default=PRODUCT_TYPE_FACET, help="Facet slug (tipo-de-producto, marca, ...)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--stand-in", help="Send the API requests to this origin (e.g. http://localhost:8766/carrefour)")
+    parser.add_argument("--no-browser", action="store_true", help="Do not fall back to the browser")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    results = extract_facet_values(args.urls, args.facet, args.concurrency, args.stand_in, not args.no_browser)
+    for url, result in results.items():
+        print(f"\n{url} ({result['source']}, {result['elapsedMs'] or 0:.0f} ms, {len(result['values'])} values)")
+        if result["error"] and not result["values"]:
+            print(f"  Error: {result['error']}")
+        for value in result["values"]:
+            print(f"  {value['name']} ({value['quantity']})")
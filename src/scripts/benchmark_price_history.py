@@ -0,0 +1,156 @@
+"""
+Benchmark del historial de precios: colección actual (PriceHistory de Mongoose,
+un documento por producto y scrape con sus seis índices) contra la colección de
+series temporales que crea initialize_database.py (price_history_ts).
+
+Genera un dataset sintético (productos x días, ~5% de cambios de precio por día)
+en una base descartable, lo carga en ambos esquemas y compara:
+- tiempo de carga,
+- tamaño en disco (storageSize + totalIndexSize),
+- latencia de consultas por rango: historial de un producto en los últimos 30 días
+  y todos los precios de un día del supermercado.
+
+Uso:
+    python src/scripts/benchmark_price_history.py --products 5000 --days 60
+"""
+from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo.errors import ConnectionFailure
+from datetime import datetime, timedelta, timezone
+import argparse
+import random
+import time
+import sys
+import os
+
+# Módulos compartidos de los scrapers (src/backend/src/scripts/scrapers/common)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                                                'backend', 'src', 'scripts', 'scrapers')))
+from common.mongo_writer import synthetic_products
+from common.price_history import history_row
+from common.price_timeseries import TimeSeriesPriceWriter, TIMESERIES_COLLECTION
+
+BENCHMARK_DB = "price_history_benchmark"
+CURRENT_COLLECTION = "pricehistories"
+SUPERMARKET = "carrefour"
+
+# Índices de priceHistorySchema (carrefourPriceHistory.js)
+CURRENT_INDEXES = [
+    [("productId", ASCENDING), ("scrapedAt", DESCENDING)],
+    [("supermarketId", ASCENDING), ("scrapedAt", DESCENDING)],
+    [("scrapedAt", DESCENDING)],
+    [("productData.category", ASCENDING), ("scrapedAt", DESCENDING)],
+    [("productData.brand", ASCENDING), ("scrapedAt", DESCENDING)],
+    [("isOnOffer", ASCENDING), ("scrapedAt", DESCENDING)],
+]
+
+def daily_scrapes(products, days, change_rate, seed=0):
+    """Genera (fecha, productos) por día, cambiando el precio de change_rate de los productos"""
+    rng = random.Random(seed)
+    start = datetime.now(timezone.utc).replace(hour=6, minute=0, second=0, microsecond=0) - timedelta(days=days)
+    for day in range(days):
+        for product in products:
+            if day and rng.random() < change_rate:
+                product["price"] = round(product["listPrice"] * rng.choice((0.7, 0.8, 0.9, 1.0)), 2)
+                product["discount"] = round((product["listPrice"] - product["price"]) / product["listPrice"] * 100, 2)
+        yield start + timedelta(days=day), products
+
+def storage(db, name):
+    stats = db.command("collStats", name)
+    return stats.get("storageSize", 0) + stats.get("totalIndexSize", 0)
+
+def timed_queries(run_query, product_ids, repetitions):
+    """Latencias (ms) de run_query para productos al azar"""
+    latencies = []
+    for product_id in random.Random(1).choices(product_ids, k=repetitions):
+        start = time.perf_counter()
+        run_query(product_id)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)]
+
+def run_benchmark(uri, product_count, days, change_rate, repetitions, keep):
+    client = MongoClient(uri, serverSelectionTimeoutMS=5000)
+    client.admin.command("ping")
+    client.drop_database(BENCHMARK_DB)
+    db = client[BENCHMARK_DB]
+    print(f"Dataset: {product_count} productos x {days} días ({product_count * days} precios)")
+
+    # Productos (los dos esquemas referencian products._id)
+    products = list(synthetic_products(SUPERMARKET, product_count))
+    db.products.insert_many([dict(product) for product in products])
+    product_ids = {product["sku"]: product["_id"] for product in db.products.find({}, {"sku": 1})}
+
+    # Esquema actual
+    current = db[CURRENT_COLLECTION]
+    for keys in CURRENT_INDEXES:
+        current.create_index(keys)
+    start = time.perf_counter()
+    for scraped_at, day_products in daily_scrapes([dict(p) for p in products], days, change_rate):
+        current.insert_many([history_row(SUPERMARKET, product, product_ids[product["sku"]], scraped_at, "benchmark")
+                             for product in day_products], ordered=False)
+    current_load = time.perf_counter() - start
+
+    # Series temporales, cargadas con el writer de los scrapers (crea la colección)
+    writer = TimeSeriesPriceWriter(SUPERMARKET, batch_id="benchmark", uri=f"{uri.rstrip('/')}/{BENCHMARK_DB}",
+                                   batch_docs=5000, workers=2)
+    writer.ensure_index()
+    start = time.perf_counter()
+    for scraped_at, day_products in daily_scrapes([dict(p) for p in products], days, change_rate):
+        writer.scraped_at = scraped_at
+        writer.write_many(day_products)
+        writer.flush()
+    writer_stats = writer.close()
+    series_load = time.perf_counter() - start
+    series = db[TIMESERIES_COLLECTION]
+
+    # Consultas por rango
+    since = datetime.now(timezone.utc) - timedelta(days=30)
+    ids = list(product_ids.values())
+    current_product = timed_queries(
+        lambda pid: list(current.find({"productId": pid, "scrapedAt": {"$gte": since}}).sort("scrapedAt", -1)),
+        ids, repetitions)
+    series_product = timed_queries(
+        lambda pid: list(series.find({"meta.productId": pid, "scrapedAt": {"$gte": since}}).sort("scrapedAt", -1)),
+        ids, repetitions)
+
+    day_start = since.replace(hour=0)
+    day_range = {"$gte": day_start, "$lt": day_start + timedelta(days=1)}
+    current_day = timed_queries(
+        lambda _: list(current.find({"supermarketId": SUPERMARKET, "scrapedAt": day_range}, {"price": 1})),
+        ids, max(1, repetitions // 20))
+    series_day = timed_queries(
+        lambda _: list(series.find({"meta.supermarketId": SUPERMARKET, "scrapedAt": day_range}, {"price": 1})),
+        ids, max(1, repetitions // 20))
+
+    current_size, series_size = storage(db, CURRENT_COLLECTION), storage(db, TIMESERIES_COLLECTION)
+    print(f"\n{'':32}{'actual':>14}{'series temp.':>14}")
+    print(f"{'Carga (s)':32}{current_load:>14.1f}{series_load:>14.1f}")
+    print(f"{'Disco + índices (MB)':32}{current_size / 1e6:>14.1f}{series_size / 1e6:>14.1f}")
+    print(f"{'Producto, 30 días p50/p95 (ms)':32}{current_product[0]:>7.1f}/{current_product[1]:<6.1f}"
+          f"{series_product[0]:>7.1f}/{series_product[1]:<6.1f}")
+    print(f"{'Supermercado, 1 día p50/p95 (ms)':32}{current_day[0]:>7.1f}/{current_day[1]:<6.1f}"
+          f"{series_day[0]:>7.1f}/{series_day[1]:<6.1f}")
+    print(f"\nBatches del writer: {writer_stats['batches']}, p50 {writer_stats['latencyMs']['p50']:.0f} ms, "
+          f"p95 {writer_stats['latencyMs']['p95']:.0f} ms")
+    if series_size:
+        print(f"Series temporales ocupan {series_size / current_size:.0%} del esquema actual.")
+
+    if not keep:
+        client.drop_database(BENCHMARK_DB)
+    client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara el historial de precios actual con series temporales")
+    parser.add_argument("--uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--change-rate", type=float, default=0.05, help="Fracción de productos que cambian de precio por día")
+    parser.add_argument("--queries", type=int, default=200, help="Consultas por producto a medir")
+    parser.add_argument("--keep", action="store_true", help=f"No borrar la base '{BENCHMARK_DB}' al terminar")
+    args = parser.parse_args()
+
+    try:
+        run_benchmark(args.uri, args.products, args.days, args.change_rate, args.queries, args.keep)
+    except ConnectionFailure:
+        print("Error: No se puede conectar a MongoDB. Asegúrate de que el servidor esté ejecutándose.")
+        sys.exit(1)
@@ -2,6 +2,32 @@ from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure
 import sys
 
+# Historial de precios como colecciones de series temporales, una por base raw de supermercado.
+# Debe coincidir con src/backend/src/scripts/scrapers/common/price_timeseries.py
+PRICE_HISTORY_TS_COLLECTION = "price_history_ts"
+PRICE_HISTORY_TS_OPTIONS = {
+    "timeField": "scrapedAt",
+    "metaField": "meta",  # {supermarketId, productId, sku}
+    "granularity": "hours"  # scrapes diarios: buckets de hasta 30 días por producto
+}
+
+def initialize_price_history_timeseries(client, supermarkets):
+    """
+    Crea la colección de series temporales del historial de precios en la base raw
+    de cada supermercado (<id>_raw), con índices secundarios sobre el metaField.
+    """
+    for supermarket in supermarkets:
+        db = client[f"{supermarket}_raw"]
+        if PRICE_HISTORY_TS_COLLECTION not in db.list_collection_names():
+            db.create_collection(PRICE_HISTORY_TS_COLLECTION, timeseries=PRICE_HISTORY_TS_OPTIONS)
+            print(f"Colección de series temporales '{PRICE_HISTORY_TS_COLLECTION}' creada en '{supermarket}_raw'.")
+        else:
+            print(f"Colección '{PRICE_HISTORY_TS_COLLECTION}' ya existe en '{supermarket}_raw'.")
+
+        collection = db[PRICE_HISTORY_TS_COLLECTION]
+        collection.create_index([("meta.productId", 1), ("scrapedAt", -1)])
+        collection.create_index([("meta.sku", 1), ("scrapedAt", -1)])
+
 def initialize_database():
     try:
         # Conectar a MongoDB
@@ -58,6 +84,9 @@ def initialize_database():
         db.products.create_index([("price", 1)])
         print("Índices creados para la colección 'products'.")
 
+        # Historial de precios (series temporales) por supermercado
+        initialize_price_history_timeseries(client, [s["_id"] for s in supermarkets_data])
+
         print("Estructura de base de datos inicializada exitosamente.")
 
         client.close()